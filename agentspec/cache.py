@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+"""
+agentspec.cache
+---------------
+Persistent caches stored under `.agentspec/cache/` in the repository root
+(`$XDG_CACHE_HOME/agentspec` for targets outside any repository).
+
+- DiscoveryCache: per-directory mtime + kept child listing recorded by the
+  filesystem walker, so unchanged directories are not re-listed or re-checked
+  against ignore rules on the next run.
+- ResultCache: lint findings and extracted specs keyed by file content hash,
+  agentspec version and options, in a size-bounded SQLite file with LRU eviction.
+  The same file holds per-definition entries (node_key) so an edited file only
+  re-validates the docstrings that changed.
+
+Set AGENTSPEC_CACHE_DIR to relocate the cache, AGENTSPEC_NO_CACHE=1 to disable
+it (same as --no-cache), and AGENTSPEC_CACHE_MAX_MB to bound the result cache.
+"""
+from __future__ import annotations
+
+import base64
+import datetime
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import sqlite3
+except ImportError:  # Python built without sqlite: the result cache is simply off
+    sqlite3 = None  # type: ignore[assignment]
+
+from agentspec import __version__
+
+CACHE_DIRNAME = ".agentspec"
+
+# Directories modified this close to the scan are not recorded: a change landing
+# in the same mtime tick as the scan would otherwise go unnoticed next run.
+RACY_WINDOW_NS = 2_000_000_000
+
+
+def cache_enabled(use_cache: bool = True) -> bool:
+    """Return False when caching is switched off by argument or AGENTSPEC_NO_CACHE."""
+    return use_cache and os.environ.get("AGENTSPEC_NO_CACHE", "") in ("", "0")
+
+
+def cache_dir(repo_root: Optional[Path]) -> Path:
+    """Return the cache directory for a repository, or the per-user one outside git."""
+    override = os.environ.get("AGENTSPEC_CACHE_DIR")
+    if override:
+        return Path(override)
+    if repo_root is None:
+        return Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "agentspec"
+    return repo_root / CACHE_DIRNAME / "cache"
+
+
+def file_signature(path: Path) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) of a file, or None if it does not exist."""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _hash_file(h: "hashlib._Hash", path: Optional[Path]) -> None:
+    h.update(str(path).encode() + b"\0")
+    if path is None:
+        return
+    try:
+        h.update(path.read_bytes())
+    except OSError:
+        h.update(b"<missing>")
+    h.update(b"\0")
+
+
+def write_json_atomic(path: Path, data: Any) -> None:
+    """Write JSON to a temp file in the same directory and rename it into place."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class DiscoveryCache:
+    """
+    Directory listing cache for one discovery target.
+
+    Each entry maps a directory (POSIX path relative to the target, "" for the
+    target itself) to its mtime, the .py files and subdirectories that survived
+    filtering, which of those are symlinks, and the signature of the directory's
+    own .gitignore. The whole file is discarded when the ignore configuration
+    outside the walked tree (.agentspecignore, ancestor .gitignore files,
+    .git/info/exclude, core.excludesFile), the ignore engine or the agentspec
+    version changes.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: Path, signature: str):
+        self.path = path
+        self.signature = signature
+        self.scan_started_ns = time.time_ns()
+        self._old: Dict[str, Dict[str, Any]] = {}
+        self._new: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    @classmethod
+    def for_target(cls, target: Path, repo_root: Optional[Path], ignore_engine: str) -> "DiscoveryCache":
+        """Open the cache for a directory target, keyed by its resolved path and ignore setup."""
+        real_target = target.resolve()
+        root = repo_root.resolve() if repo_root else None
+        h = hashlib.sha256()
+        h.update(f"{cls.VERSION}|{__version__}|{ignore_engine}|{real_target}".encode())
+        if root is not None:
+            from agentspec.gitignore import _git_dir, _global_excludes_path
+            from agentspec.utils import DEFAULT_EXCLUDE_DIRS
+
+            h.update(",".join(sorted(DEFAULT_EXCLUDE_DIRS)).encode())
+            _hash_file(h, root / ".agentspecignore")
+            _hash_file(h, _git_dir(root) / "info" / "exclude")
+            _hash_file(h, _global_excludes_path(root))
+            # .gitignore files between the repo root and the target apply to the whole walk
+            ancestor = real_target.parent
+            while ancestor != root and root in ancestor.parents:
+                _hash_file(h, ancestor / ".gitignore")
+                ancestor = ancestor.parent
+            if real_target != root:
+                _hash_file(h, root / ".gitignore")
+        key = hashlib.sha256(str(real_target).encode()).hexdigest()[:16]
+        return cls(cache_dir(root) / f"discovery-{key}.json", h.hexdigest())
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict) and data.get("signature") == self.signature:
+            dirs = data.get("dirs")
+            if isinstance(dirs, dict):
+                self._old = dirs
+
+    def lookup(self, rel_dir: str, mtime_ns: int, gitignore_sig: Optional[Tuple[int, int]]) -> Optional[Dict[str, Any]]:
+        """Return the cached entry if the directory and its .gitignore are unchanged."""
+        entry = self._old.get(rel_dir)
+        if entry is None or entry.get("mtime") != mtime_ns:
+            return None
+        cached_sig = entry.get("gitignore")
+        if (tuple(cached_sig) if cached_sig else None) != gitignore_sig:
+            return None
+        self._new[rel_dir] = entry
+        return entry
+
+    def gitignore_changed(self, rel_dir: str, gitignore_sig: Optional[Tuple[int, int]]) -> bool:
+        """True if a rescanned directory's .gitignore differs from what the cache saw."""
+        entry = self._old.get(rel_dir)
+        if entry is None:
+            return False
+        cached_sig = entry.get("gitignore")
+        return (tuple(cached_sig) if cached_sig else None) != gitignore_sig
+
+    def record(
+        self,
+        rel_dir: str,
+        mtime_ns: int,
+        gitignore_sig: Optional[Tuple[int, int]],
+        files: List[str],
+        dirs: List[str],
+        links: List[str],
+    ) -> None:
+        if mtime_ns >= self.scan_started_ns - RACY_WINDOW_NS:
+            return
+        self._new[rel_dir] = {
+            "mtime": mtime_ns,
+            "gitignore": list(gitignore_sig) if gitignore_sig else None,
+            "files": files,
+            "dirs": dirs,
+            "links": links,
+        }
+
+    def save(self) -> None:
+        try:
+            write_json_atomic(self.path, {"signature": self.signature, "dirs": self._new})
+        except OSError:
+            pass  # Read-only checkout: caching is best-effort
+
+
+DEFAULT_MAX_MB = 64
+RESULTS_FILENAME = "results.sqlite"
+
+# Modules whose behaviour is baked into cached results; editing any of them
+# (e.g. a development checkout) invalidates entries even without a version bump.
+_FINGERPRINT_MODULES = ("lint.py", "extract.py", "check.py", "parsed.py", "yamlio.py", "callgraph.py")
+_fingerprint: Optional[str] = None
+
+
+def code_fingerprint() -> str:
+    """Digest of the agentspec version and the source of the modules producing cached results."""
+    global _fingerprint
+    if _fingerprint is None:
+        h = hashlib.blake2b(__version__.encode(), digest_size=16)
+        package = Path(__file__).parent
+        for name in _FINGERPRINT_MODULES:
+            _hash_file(h, package / name)
+        _fingerprint = h.hexdigest()
+    return _fingerprint
+
+
+def result_key(content: bytes, kind: str, *options: Any) -> str:
+    """Cache key for `kind` results over a file's bytes under the given options."""
+    h = hashlib.blake2b(digest_size=20)
+    h.update(f"{kind}|{code_fingerprint()}|{options!r}|".encode())
+    h.update(content)
+    return h.hexdigest()
+
+
+def node_key(kind: str, node: Any, doc: str, *options: Any) -> str:
+    """
+    Fingerprint of one definition's docstring for `kind` results: node type, name,
+    docstring text and options. Line numbers are left out so a definition that
+    only moved keeps its entry.
+    """
+    h = hashlib.blake2b(digest_size=20)
+    h.update(f"{kind}|{code_fingerprint()}|{type(node).__name__}|{node.name}|{options!r}|".encode())
+    h.update(doc.encode("utf-8", errors="surrogatepass"))
+    return h.hexdigest()
+
+
+def to_jsonable(value: Any) -> Any:
+    """Encode YAML-derived data as JSON, tagging the types JSON lacks (dates, bytes, sets, non-str keys)."""
+    if isinstance(value, dict):
+        if all(isinstance(k, str) and not k.startswith("__") for k in value):
+            return {k: to_jsonable(v) for k, v in value.items()}
+        return {"__items__": [[to_jsonable(k), to_jsonable(v)] for k, v in value.items()]}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(v) for v in value]
+    if isinstance(value, datetime.datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {"__date__": value.isoformat()}
+    if isinstance(value, bytes):
+        return {"__bytes__": base64.b64encode(value).decode("ascii")}
+    if isinstance(value, (set, frozenset)):
+        return {"__set__": [to_jsonable(v) for v in value]}
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    raise TypeError(f"cannot cache value of type {type(value).__name__}")
+
+
+def from_jsonable(value: Any) -> Any:
+    """Inverse of to_jsonable."""
+    if isinstance(value, list):
+        return [from_jsonable(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+    if len(value) == 1:
+        (tag, inner), = value.items()
+        if tag == "__items__":
+            return {_hashable(from_jsonable(k)): from_jsonable(v) for k, v in inner}
+        if tag == "__datetime__":
+            return datetime.datetime.fromisoformat(inner)
+        if tag == "__date__":
+            return datetime.date.fromisoformat(inner)
+        if tag == "__bytes__":
+            return base64.b64decode(inner)
+        if tag == "__set__":
+            return {_hashable(from_jsonable(v)) for v in inner}
+    return {k: from_jsonable(v) for k, v in value.items()}
+
+
+def _hashable(value: Any) -> Any:
+    return tuple(_hashable(v) for v in value) if isinstance(value, list) else value
+
+
+class ResultCache:
+    """
+    Per-file results (lint findings, extracted specs) keyed by result_key().
+
+    Entries live in one SQLite file with their size and last-use time. Reads and
+    writes are buffered in memory and flushed by close(), which also evicts the
+    least recently used entries once the total size passes `max_bytes`.
+    Cumulative hit/miss counters are kept for `agentspec cache stats`.
+    """
+
+    SCHEMA = 1
+
+    def __init__(self, path: Path, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024):
+        if sqlite3 is None:
+            raise OSError("sqlite3 is not available")
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # Per-definition lookups (node_key) are counted apart from whole files
+        self.node_hits = 0
+        self.node_misses = 0
+        self._lock = threading.Lock()
+        self._touched: Dict[str, int] = {}
+        self._pending: Dict[str, Tuple[str, str]] = {}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_last_used ON entries(last_used);
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            """
+        )
+        row = self._db.execute("SELECT value FROM meta WHERE name = 'schema'").fetchone()
+        if row is None or row[0] != self.SCHEMA:
+            with self._db:
+                self._db.execute("DELETE FROM entries")
+                self._db.execute("INSERT OR REPLACE INTO meta VALUES ('schema', ?)", (self.SCHEMA,))
+
+    @classmethod
+    def open(cls, repo_root: Optional[Path], use_cache: bool = True) -> Optional["ResultCache"]:
+        """Open the result cache for a repository, or return None when caching is off or impossible."""
+        if not cache_enabled(use_cache):
+            return None
+        try:
+            max_mb = float(os.environ.get("AGENTSPEC_CACHE_MAX_MB") or DEFAULT_MAX_MB)
+        except ValueError:
+            max_mb = DEFAULT_MAX_MB
+        try:
+            return cls(cache_dir(repo_root) / RESULTS_FILENAME, max_bytes=int(max_mb * 1024 * 1024))
+        except Exception:
+            return None  # Unwritable location or unreadable database: run uncached
+
+    def get(self, key: str) -> Any:
+        """Return the cached value for `key`, or None."""
+        payload = self._read(key)
+        with self._lock:
+            if payload is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return from_jsonable(json.loads(payload))
+
+    def get_node(self, key: str) -> Any:
+        """get() for a per-definition node_key entry."""
+        payload = self._read(key)
+        with self._lock:
+            if payload is None:
+                self.node_misses += 1
+                return None
+            self.node_hits += 1
+        return from_jsonable(json.loads(payload))
+
+    def _read(self, key: str) -> Optional[str]:
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is not None:
+                payload = pending[1]
+            else:
+                row = self._db.execute("SELECT payload FROM entries WHERE key = ?", (key,)).fetchone()
+                payload = row[0] if row else None
+            if payload is not None:
+                self._touched[key] = time.time_ns()
+        return payload
+
+    def put(self, key: str, kind: str, value: Any) -> None:
+        """Buffer a result for writing; values that cannot be encoded are skipped."""
+        try:
+            payload = json.dumps(to_jsonable(value), separators=(",", ":"))
+        except (TypeError, ValueError):
+            return
+        with self._lock:
+            self._pending[key] = (kind, payload)
+            self._touched[key] = time.time_ns()
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            touched, self._touched = self._touched, {}
+            hits, misses, self.hits, self.misses = self.hits, self.misses, 0, 0
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                    [(k, kind, payload, len(payload), touched.get(k, 0)) for k, (kind, payload) in pending.items()],
+                )
+                self._db.executemany(
+                    "UPDATE entries SET last_used = ? WHERE key = ?",
+                    [(t, k) for k, t in touched.items() if k not in pending],
+                )
+                for name, delta in (("hits", hits), ("misses", misses)):
+                    self._db.execute(
+                        "INSERT INTO meta VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                        (name, delta),
+                    )
+            self._evict()
+
+    def _evict(self) -> None:
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Trim to 90% so the next few runs do not evict again immediately
+        excess = total - int(self.max_bytes * 0.9)
+        doomed: List[str] = []
+        for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY last_used"):
+            if excess <= 0:
+                break
+            doomed.append(key)
+            excess -= size
+        with self._db:
+            self._db.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k in doomed])
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        except Exception:
+            pass  # Best-effort: a locked or read-only cache must not fail the run
+        finally:
+            self._db.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry counts per kind, total size, bound and cumulative hit/miss counters."""
+        kinds = {kind: count for kind, count in self._db.execute("SELECT kind, COUNT(*) FROM entries GROUP BY kind")}
+        size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        meta = dict(self._db.execute("SELECT name, value FROM meta"))
+        return {
+            "path": str(self.path),
+            "entries": sum(kinds.values()),
+            "kinds": kinds,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": meta.get("hits", 0),
+            "misses": meta.get("misses", 0),
+        }
+
+    def clear(self) -> None:
+        with self._lock, self._db:
+            self._pending.clear()
+            self._touched.clear()
+            self._db.execute("DELETE FROM entries")
+            self._db.execute("DELETE FROM meta WHERE name IN ('hits', 'misses')")
+        self._db.execute("VACUUM")
+
+
+def open_result_cache(targets: List[Path], use_cache: bool = True) -> Optional[ResultCache]:
+    """Open the result cache of the repository holding the first target (or the cwd)."""
+    from agentspec.utils import _find_git_root
+
+    anchor = targets[0] if targets else Path.cwd()
+    return ResultCache.open(_find_git_root(anchor) if anchor.exists() else None, use_cache)
+
+
+def run(action: str) -> int:
+    """CLI entry for `agentspec cache stats|clear` on the current repository's cache."""
+    from agentspec.utils import _find_git_root
+
+    directory = cache_dir(_find_git_root(Path.cwd()))
+    discovery = sorted(directory.glob("discovery-*.json")) if directory.is_dir() else []
+    results: Optional[ResultCache] = None
+    if (directory / RESULTS_FILENAME).exists():
+        results = ResultCache.open(_find_git_root(Path.cwd()), use_cache=True)
+
+    if action == "clear":
+        for path in discovery:
+            path.unlink(missing_ok=True)
+        if results is not None:
+            results.clear()
+            results.close()
+        print(f"🧹 Cleared caches in {directory}")
+        return 0
+
+    print(f"🗄️  Cache directory: {directory}")
+    print(f"   Discovery caches: {len(discovery)}")
+    if results is None:
+        print("   Result cache: empty")
+        return 0
+    info = results.stats()
+    results.close()
+    lookups = info["hits"] + info["misses"]
+    rate = f"{100 * info['hits'] / lookups:.1f}%" if lookups else "n/a"
+    kinds = ", ".join(f"{kind}: {count}" for kind, count in sorted(info["kinds"].items())) or "none"
+    print(f"   Result cache: {info['entries']} entries ({kinds})")
+    print(f"   Size: {info['bytes'] / 1024 / 1024:.2f} MiB of {info['max_bytes'] / 1024 / 1024:.0f} MiB")
+    print(f"   Hits: {info['hits']}, misses: {info['misses']} (hit rate {rate})")
+    return 0
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+agentspec.callgraph
+-------------------
+Repository call graph, so deps.called_by is computed instead of guessed.
+
+Symbols are named `module::qualname` (`agentspec.collect::collect_metadata`,
+`pkg.mod::Class.method`, `pkg.mod::outer.<locals>.inner`). The module name
+follows the package layout: directories holding an __init__.py.
+
+Building happens in two steps:
+
+1. One AST traversal per file produces a summary: definitions, import aliases,
+   class bases, and per function the calls it makes as unresolved references.
+   Summaries are JSON data, cached in the result cache by file content.
+2. The references are resolved against the symbol table of all summaries, and
+   the graph is inverted into called_by.
+
+Resolution is best-effort and never guesses. It handles:
+
+- local, enclosing-scope and module-level names
+- imported aliases, including relative imports and package re-exports
+- `module.attr` chains
+- `self.method()` / `cls.method()` and `super().method()` through the bases
+  that resolve
+
+Calls on other objects stay unresolved. So do names shadowed at runtime and
+dynamic dispatch.
+"""
+from __future__ import annotations
+
+import ast
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from agentspec.cache import ResultCache, open_result_cache, result_key
+from agentspec.parsed import parse_file
+
+_DEFS = (ast.FunctionDef, ast.AsyncFunctionDef)
+# Re-export chains (`from .x import f` in a package __init__) followed at most this deep
+MAX_ALIAS_DEPTH = 5
+
+
+def module_name(path: Path) -> str:
+    """Dotted module name of a file: its stem plus every enclosing package directory."""
+    path = Path(path).resolve()
+    parts = [] if path.name == "__init__.py" else [path.stem]
+    directory = path.parent
+    while (directory / "__init__.py").exists():
+        parts.insert(0, directory.name)
+        directory = directory.parent
+    return ".".join(parts) or path.parent.name
+
+
+def _resolve_relative(module: str, is_package: bool, level: int, target: Optional[str]) -> str:
+    package = module.split(".") if is_package else module.split(".")[:-1]
+    if level > 1:
+        package = package[: len(package) - (level - 1)]
+    return ".".join(p for p in [*package, target or ""] if p)
+
+
+def _define(defs: Dict[str, List[Any]], qual: str, lineno: int, kind: str) -> None:
+    # The stack visits definitions out of source order; the last one is live at runtime
+    if qual not in defs or lineno > defs[qual][0]:
+        defs[qual] = [lineno, kind]
+
+
+def summarize(tree: ast.Module, module: str, is_package: bool = False) -> Dict[str, Any]:
+    """
+    One traversal of a module: definitions (qualname -> [lineno, kind] of the live
+    one), import aliases, class bases and the call references of every function.
+
+    References are lists, resolved later by CallGraph:
+    ["name", scope, base, rest] for `base.rest(...)` looked up from `scope`,
+    ["method", class, attr] for `self.attr(...)`, ["super", class, attr].
+    """
+    defs: Dict[str, List[Any]] = {}
+    aliases: Dict[str, str] = {}
+    bases: Dict[str, List[list]] = {}
+    calls: Dict[str, List[list]] = {}
+
+    def ref(expr: ast.AST, scope: str, receiver: Optional[Tuple[str, str]]) -> Optional[list]:
+        attrs: List[str] = []
+        while isinstance(expr, ast.Attribute):
+            attrs.insert(0, expr.attr)
+            expr = expr.value
+        if isinstance(expr, ast.Name):
+            if receiver is not None and expr.id == receiver[1] and len(attrs) == 1:
+                return ["method", receiver[0], attrs[0]]
+            return ["name", scope, expr.id, ".".join(attrs)]
+        if (
+            isinstance(expr, ast.Call) and isinstance(expr.func, ast.Name) and expr.func.id == "super"
+            and receiver is not None and len(attrs) == 1
+        ):
+            return ["super", receiver[0], attrs[0]]
+        return None
+
+    # (node, qualname prefix, enclosing function qualname, class qualname if node is a class body
+    #  statement, (class, receiver name) for self/cls calls)
+    stack: List[Tuple[ast.AST, str, str, Optional[str], Optional[Tuple[str, str]]]] = [
+        (statement, "", "", None, None) for statement in tree.body
+    ]
+    while stack:
+        node, prefix, func, in_class, receiver = stack.pop()
+        if isinstance(node, _DEFS):
+            qual = prefix + node.name
+            _define(defs, qual, node.lineno, "def")
+            calls.setdefault(qual, [])
+            inner_receiver = None
+            decorators = {d.id for d in node.decorator_list if isinstance(d, ast.Name)}
+            if in_class is not None and node.args.args and "staticmethod" not in decorators:
+                inner_receiver = (in_class, node.args.args[0].arg)
+            # Decorators and defaults run in the enclosing scope
+            for outer in [*node.decorator_list, *node.args.defaults, *node.args.kw_defaults]:
+                if outer is not None:
+                    stack.append((outer, prefix, func, None, receiver))
+            for statement in node.body:
+                stack.append((statement, qual + ".<locals>.", qual, None, inner_receiver))
+        elif isinstance(node, ast.ClassDef):
+            qual = prefix + node.name
+            _define(defs, qual, node.lineno, "class")
+            bases[qual] = [r for r in (ref(b, func, None) for b in node.bases) if r is not None]
+            for outer in node.decorator_list:
+                stack.append((outer, prefix, func, None, receiver))
+            for statement in node.body:
+                stack.append((statement, qual + ".", func, qual, receiver))
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.asname:
+                    aliases[alias.asname] = alias.name
+                else:
+                    top = alias.name.split(".")[0]
+                    aliases[top] = top
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ""
+            if node.level:
+                base = _resolve_relative(module, is_package, node.level, node.module)
+            for alias in node.names:
+                if alias.name != "*":
+                    aliases[alias.asname or alias.name] = f"{base}.{alias.name}" if base else alias.name
+        else:
+            if isinstance(node, ast.Call) and func:
+                found = ref(node.func, func, receiver)
+                if found is not None:
+                    calls[func].append(found)
+            # Nested statements keep the class context (e.g. methods under `if` in a class body)
+            for child in ast.iter_child_nodes(node):
+                stack.append((child, prefix, func, in_class, receiver))
+    return {"module": module, "defs": defs, "aliases": aliases, "bases": bases, "calls": calls}
+
+
+def _summary_for(path: Path, cache: Optional[ResultCache]) -> Optional[Dict[str, Any]]:
+    name = module_name(path)
+    key = None
+    if cache is not None:
+        try:
+            key = result_key(path.read_bytes(), "callgraph", name)
+        except OSError:
+            return None
+        hit = cache.get(key)
+        if hit is not None:
+            return hit
+    try:
+        tree = parse_file(path).tree
+    except (SyntaxError, ValueError, OSError, UnicodeDecodeError):
+        return None
+    summary = summarize(tree, name, is_package=path.name == "__init__.py")
+    if key is not None:
+        cache.put(key, "callgraph", summary)
+    return summary
+
+
+class CallGraph:
+    """Resolved calls between the definitions of a set of files, and their inverse."""
+
+    def __init__(self):
+        self.modules: Dict[str, Dict[str, Any]] = {}
+        # symbol -> (path, lineno, kind)
+        self.symbols: Dict[str, Tuple[str, int, str]] = {}
+        self.by_location: Dict[Tuple[str, int], str] = {}
+        self.calls: Dict[str, Set[str]] = {}
+        self.called_by: Dict[str, Set[str]] = {}
+        self._module_at: Dict[str, str] = {}
+
+    @classmethod
+    def build(cls, paths: Iterable[Path], cache: Optional[ResultCache] = None) -> "CallGraph":
+        graph = cls()
+        for path in paths:
+            summary = _summary_for(Path(path), cache)
+            if summary is not None:
+                graph.add(Path(path), summary)
+        graph.resolve()
+        return graph
+
+    def add(self, path: Path, summary: Dict[str, Any]) -> None:
+        name = summary["module"]
+        location = str(Path(path).resolve())
+        if name in self.modules:
+            # Same dotted name twice (e.g. loose scripts in separate directories): the first file wins
+            first = next(at for at, module in self._module_at.items() if module == name)
+            print(f"⚠️  Call graph: module {name} in {location} is shadowed by {first}; its calls are not tracked")
+            return
+        self.modules[name] = summary
+        self._module_at[location] = name
+        for qual, (lineno, kind) in summary["defs"].items():
+            symbol = f"{name}::{qual}"
+            self.symbols[symbol] = (location, lineno, kind)
+            self.by_location[(location, lineno)] = symbol
+
+    def resolve(self) -> None:
+        self.calls = {}
+        self.called_by = {}
+        for name, summary in self.modules.items():
+            for func, refs in summary["calls"].items():
+                caller = f"{name}::{func}"
+                targets = {t for t in (self._resolve(name, r) for r in refs) if t is not None and t != caller}
+                self.calls[caller] = targets
+                for target in targets:
+                    self.called_by.setdefault(target, set()).add(caller)
+
+    def _resolve(self, module: str, ref: list) -> Optional[str]:
+        kind = ref[0]
+        if kind == "name":
+            _, scope, base, rest = ref
+            return self._resolve_name(module, scope, base, rest)
+        if kind == "method":
+            return self._member(f"{module}::{ref[1]}", ref[2], set())
+        if kind == "super":
+            for base in self._bases(f"{module}::{ref[1]}"):
+                found = self._member(base, ref[2], set())
+                if found is not None:
+                    return found
+        return None
+
+    def _resolve_name(self, module: str, scope: str, base: str, rest: str) -> Optional[str]:
+        summary = self.modules[module]
+        defs = summary["defs"]
+        # Enclosing function scopes, innermost first, then module level; class bodies do not enclose
+        scopes = scope.split(".<locals>.") if scope else []
+        candidates = [".<locals>.".join(scopes[:i]) + ".<locals>." + base for i in range(len(scopes), 0, -1)]
+        for qual in [*candidates, base]:
+            if qual in defs:
+                symbol = f"{module}::{qual}" + (f".{rest}" if rest else "")
+                return symbol if symbol in self.symbols else None
+        target = summary["aliases"].get(base)
+        if target is None:
+            return None
+        return self._resolve_dotted(target + (f".{rest}" if rest else ""), 0)
+
+    def _resolve_dotted(self, dotted: str, depth: int) -> Optional[str]:
+        parts = dotted.split(".")
+        for i in range(len(parts) - 1, 0, -1):
+            module, qual = ".".join(parts[:i]), parts[i:]
+            summary = self.modules.get(module)
+            if summary is None:
+                continue
+            symbol = f"{module}::{'.'.join(qual)}"
+            if symbol in self.symbols:
+                return symbol
+            reexport = summary["aliases"].get(qual[0])
+            if reexport is not None and depth < MAX_ALIAS_DEPTH:
+                return self._resolve_dotted(".".join([reexport, *qual[1:]]), depth + 1)
+            return None
+        return None
+
+    def _bases(self, class_symbol: str) -> List[str]:
+        module, _, qual = class_symbol.partition("::")
+        summary = self.modules.get(module)
+        if summary is None:
+            return []
+        found = (self._resolve(module, r) for r in summary["bases"].get(qual, []))
+        return [b for b in found if b is not None and self.symbols[b][2] == "class"]
+
+    def _member(self, class_symbol: str, attr: str, seen: Set[str]) -> Optional[str]:
+        if class_symbol in seen or class_symbol not in self.symbols:
+            return None
+        seen.add(class_symbol)
+        symbol = f"{class_symbol}.{attr}"
+        if symbol in self.symbols:
+            return symbol
+        for base in self._bases(class_symbol):
+            found = self._member(base, attr, seen)
+            if found is not None:
+                return found
+        return None
+
+    def symbol_at(self, path: Path, lineno: int) -> Optional[str]:
+        """Symbol defined at a file's `def`/`class` line."""
+        return self.by_location.get((str(Path(path).resolve()), lineno))
+
+    def symbol_for(self, path: Path, qualname: str) -> Optional[str]:
+        """Symbol of a qualname in a file, if the file is part of the graph."""
+        module = self._module_at.get(str(Path(path).resolve()))
+        symbol = f"{module}::{qualname}"
+        return symbol if module is not None and symbol in self.symbols else None
+
+    def callers(self, symbol: Optional[str]) -> List[str]:
+        """Sorted callers of a symbol (deps.called_by)."""
+        return sorted(self.called_by.get(symbol, ())) if symbol else []
+
+
+def graph_scope(targets: Sequence[Path]) -> List[Path]:
+    """The repository holding the first target, or the targets themselves outside git."""
+    from agentspec.utils import _find_git_root
+
+    anchor = targets[0] if targets else Path.cwd()
+    root = _find_git_root(anchor if anchor.exists() else Path.cwd())
+    return [root] if root is not None else list(targets)
+
+
+def build_for_targets(
+    targets: Sequence[Path],
+    use_git: bool = True,
+    ignore_engine: str = "auto",
+    use_cache: bool = True,
+) -> CallGraph:
+    """Call graph over every Python file of the repository holding the targets, so callers elsewhere count."""
+    from agentspec.utils import iter_target_files
+
+    scope = graph_scope(targets)
+    cache = open_result_cache(list(targets), use_cache)
+    try:
+        return CallGraph.build(
+            iter_target_files(scope, use_git=use_git, ignore_engine=ignore_engine, use_cache=use_cache),
+            cache=cache,
+        )
+    finally:
+        if cache is not None:
+            cache.close()
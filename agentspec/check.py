@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+agentspec.check
+---------------
+`agentspec check`: lint and extract in one pass.
+
+The usual CI job runs `lint` and then `extract`, which walks the tree, reads and
+parses every file and loads every spec block twice. check() discovers files
+once, and CheckVisitor visits each module once, handing the same docstring to
+the linter and the extractor. The YAML load is shared through the
+agentspec.yamlio memo. Results go into the same result-cache entries that lint
+and extract use, so one command warms the cache for the other two.
+"""
+from __future__ import annotations
+
+import ast
+from pathlib import Path
+from typing import Any, Collection, Dict, List, Optional, Sequence, Tuple, Union
+
+from agentspec.cache import ResultCache
+from agentspec.extract import AgentSpecExtractor, ExtractJob, from_records, to_records, write_export
+from agentspec.lint import AgentSpecLinter, LintJob, print_file_report, print_summary
+from agentspec.parsed import parse_file
+from agentspec.pipeline import FileJob, FileRun
+
+Findings = List[Tuple[int, str]]
+# ((errors, warnings), (extract error, spec records without filepath))
+CheckResult = Tuple[Tuple[Findings, Findings], Tuple[Optional[str], List[Dict[str, Any]]]]
+
+
+class CheckVisitor(ast.NodeVisitor):
+    """Runs AgentSpecLinter and AgentSpecExtractor over one traversal of a module."""
+
+    def __init__(self, filepath: str, min_lines: int = 10):
+        self.linter = AgentSpecLinter(filepath, min_lines=min_lines)
+        self.extractor = AgentSpecExtractor(filepath)
+
+    def _visit_def(self, node):
+        doc = ast.get_docstring(node)
+        self.linter.check_doc(node, doc)
+        self.extractor.extract_doc(node, doc)
+        self.generic_visit(node)
+
+    visit_FunctionDef = visit_AsyncFunctionDef = visit_ClassDef = _visit_def
+
+
+def check_file(
+    filepath: Path,
+    min_lines: int = 10,
+    lines: Optional[Collection[int]] = None,
+    cache: Optional[ResultCache] = None,
+) -> CheckResult:
+    """
+    Lint findings and extract records for one file; plain data, so it can run in a worker.
+
+    With `lines`, only the definitions enclosing those lines are checked.
+    """
+    try:
+        module = parse_file(filepath)
+        visitor = CheckVisitor(str(filepath), min_lines=min_lines)
+        visitor.linter.node_cache = visitor.extractor.node_cache = cache
+        if lines is not None:
+            visitor.linter.only = visitor.extractor.only = {node.lineno for node in module.defs_touching(lines)}
+        visitor.visit(module.tree)
+    except SyntaxError as e:
+        return ([(e.lineno or 0, f"Syntax error: {e}")], []), (str(e), [])
+    except Exception as e:
+        return ([(0, f"Error parsing {filepath}: {e}")], []), (str(e), [])
+    return visitor.linter.check(), (None, to_records(visitor.extractor.specs))
+
+
+class CheckJob(FileJob):
+    """check_file as a pipeline job, cached in the same entries LintJob and ExtractJob use."""
+
+    def __init__(self, min_lines: int = 10):
+        self.lint = LintJob(min_lines)
+        self.extract = ExtractJob()
+
+    def compute(self, path, lines=None, cache=None):
+        return check_file(path, min_lines=self.lint.min_lines, lines=lines, cache=cache)
+
+    def keys(self, content, lines=None):
+        return self.lint.keys(content, lines) + self.extract.keys(content, lines)
+
+    def decode(self, hits):
+        return self.lint.decode(hits[:1]), self.extract.decode(hits[1:])
+
+    def store(self, cache, keys, result):
+        self.lint.store(cache, keys[:1], result[0])
+        self.extract.store(cache, keys[1:], result[1])
+
+
+def run(
+    target: Union[str, Sequence[str]],
+    fmt: str = "json",
+    min_lines: int = 10,
+    strict: bool = False,
+    verbose: bool = False,
+    use_git: bool = True,
+    ignore_engine: str = "auto",
+    use_cache: bool = True,
+    files: Optional[Sequence[str]] = None,
+    jobs: Optional[int] = None,
+    changed_since: Optional[str] = None,
+    staged: bool = False,
+) -> int:
+    """
+    Lint and export in one pass. Prints the lint report, then writes the export
+    exactly as `extract --format fmt` would.
+
+    Returns 1 if either half fails: lint errors (or warnings with strict), or no specs found.
+    """
+    pipeline = FileRun.open(
+        target,
+        files=files,
+        changed_since=changed_since,
+        staged=staged,
+        use_git=use_git,
+        ignore_engine=ignore_engine,
+        use_cache=use_cache,
+        jobs=jobs,
+    )
+    if pipeline is None:
+        return 1
+
+    total_errors = 0
+    total_warnings = 0
+    per_file = []
+    for file, ((errors, warnings), (_, records)) in pipeline.map(CheckJob(min_lines)):
+        total_errors += len(errors)
+        total_warnings += len(warnings)
+        # Unparseable files already show up as lint errors
+        per_file.append((file, errors, warnings, from_records(file, records)))
+    pipeline.close(verbose)
+
+    per_file.sort(key=lambda item: str(item[0]))
+    for file, errors, warnings, _ in per_file:
+        if errors or warnings:
+            print_file_report(file, errors, warnings)
+    lint_code = print_summary(pipeline.stats.files, total_errors, total_warnings, strict)
+    export_code = write_export([spec for *_, specs in per_file for spec in specs], fmt)
+    return max(lint_code, export_code)
@@ -12,7 +12,7 @@ from pathlib import Path
 
 # Import only what's needed at runtime per command to avoid importing optional deps unnecessarily
 from agentspec import lint, extract
-from agentspec.utils import load_env_from_dotenv
+from agentspec.utils import load_env_from_dotenv, read_files_from
 
 
 class FuzzyArgumentParser(argparse.ArgumentParser):
@@ -464,10 +464,34 @@ def _show_rich_help():
         "extract", 
         "Extract agentspec blocks to markdown or JSON"
     )
+    commands_table.add_row(
+        "check",
+        "Lint and extract in one pass (one parse per file)"
+    )
+    commands_table.add_row(
+        "watch",
+        "Keep lint output or an extract file up to date while editing"
+    )
+    commands_table.add_row(
+        "index",
+        "SQLite index of the specs with full-text search (build | search)"
+    )
+    commands_table.add_row(
+        "serve",
+        "Tool server for agents: get_spec, guardrails_for, search over stdio"
+    )
+    commands_table.add_row(
+        "lsp",
+        "Language server: live diagnostics and spec hovers in editors"
+    )
     commands_table.add_row(
         "generate",
         "Auto-generate verbose agentspec docstrings using Claude"
     )
+    commands_table.add_row(
+        "cache",
+        "Show or clear the discovery and result caches (stats | clear)"
+    )
     
     console.print(commands_table)
     console.print()
@@ -477,6 +501,7 @@ def _show_rich_help():
     console.print(Panel(
         "[green]agentspec lint src/ --strict[/green]\n"
         "[green]agentspec extract src/ --format json > specs.json[/green]\n"
+        "[green]agentspec check src/ --strict --format json[/green]\n"
         "[green]agentspec generate src/ --update-existing --terse[/green]\n"
         "[green]agentspec generate src/core/ --diff-summary[/green]",
         title="[bold]Examples[/bold]",
@@ -496,7 +521,7 @@ def _show_rich_help():
     flags_table.add_column("Description")
     
     flags_table.add_row("--strict", "Treat warnings as errors (lint)")
-    flags_table.add_row("--format", "Output format: markdown/json/agent-context (extract)")
+    flags_table.add_row("--format", "Output format: markdown/json/agent-context/jsonl/snapshot (extract)")
     flags_table.add_row("--terse", "Shorter output with max_tokens=500 (generate)")
     flags_table.add_row("--update-existing", "Regenerate existing docstrings (generate)")
     flags_table.add_row("--diff-summary", "Add per-function code diff summaries (generate)")
@@ -534,6 +559,47 @@ To upgrade, see: https://github.com/DMontgomery40/agentspec/blob/main/COMPATIBIL
         sys.exit(1)
 
 
+def _add_discovery_args(parser, stdin: bool = True, verbose: bool = False, jobs: bool = False):
+    """Add the file-discovery options shared by commands that take targets."""
+    parser.add_argument(
+        "--files-from",
+        metavar="FILE",
+        help=(
+            "Read additional file paths from FILE" + (" ('-' for stdin)" if stdin else "")
+            + ", NUL- or newline-delimited; listed files skip discovery"
+        )
+    )
+    parser.add_argument(
+        "--no-git",
+        action="store_true",
+        help="Discover files by walking the filesystem instead of asking `git ls-files`"
+    )
+    parser.add_argument(
+        "--ignore-engine",
+        choices=["auto", "git", "native"],
+        default="auto",
+        help="How .gitignore rules are evaluated: git check-ignore, the built-in native engine, or auto (git if installed)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not read or write the caches in .agentspec/cache/ (also: AGENTSPEC_NO_CACHE=1)"
+    )
+    if verbose:
+        parser.add_argument(
+            "-v", "--verbose",
+            action="store_true",
+            help="Print file discovery and execution statistics (strategy, files found, cache hits, workers)"
+        )
+    if jobs:
+        parser.add_argument(
+            "-j", "--jobs",
+            type=int,
+            metavar="N",
+            help="Worker processes for files not served from cache (default: CPU count; 1 = in-process). Small runs stay in-process"
+        )
+
+
 def main():
     """
     ---agentspec
@@ -752,12 +818,29 @@ def main():
             "  agentspec lint src/ --strict\n"
             "  agentspec lint src/payments.py --strict --min-lines 20\n"
             "  agentspec lint src/ --min-lines 15\n"
+            "  agentspec lint pkg_a/ pkg_b/ 'tools/**/*.py'\n"
+            "  git diff --name-only -z main | agentspec lint --files-from -\n"
+            "  agentspec lint src/ --jobs 8\n"
+            "  agentspec lint --changed-since origin/main\n"
+            "  agentspec lint --staged --strict   # pre-commit\n"
         ),
         formatter_class=RawDescriptionRichHelpFormatter,
     )
     lint_parser.add_argument(
         "target",
-        help="File or directory to lint"
+        nargs="*",
+        help="Files, directories or glob patterns to lint (quote globs; ** recurses)"
+    )
+    _add_discovery_args(lint_parser, verbose=True, jobs=True)
+    lint_parser.add_argument(
+        "--changed-since",
+        metavar="REF",
+        help="Only lint definitions changed since the merge base with REF (plus untracked files); other files are skipped"
+    )
+    lint_parser.add_argument(
+        "--staged",
+        action="store_true",
+        help="Only lint definitions changed in the index (against HEAD, or REF with --changed-since)"
     )
     lint_parser.add_argument(
         "--min-lines",
@@ -770,6 +853,11 @@ def main():
         action="store_true",
         help="Treat warnings as errors"
     )
+    lint_parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Print each file's results as soon as it is checked (discovery order) instead of sorted at the end"
+    )
     
     # Extract command
     extract_parser = subparsers.add_parser(
@@ -780,31 +868,184 @@ def main():
             "Common flows:\n"
             "  • Human-readable docs site or review bundle: (default) markdown\n"
             "  • Machine-readable output for pipelines: --format json\n"
-            "  • Agent-executable context with print() prompts: --format agent-context\n\n"
-            "Outputs:\n"
+            "  • Agent-executable context with print() prompts: --format agent-context\n"
+            "  • Streaming into other tools, one spec per line: --format jsonl\n"
+            "  • Fast lookups from tools (mmap, see agentspec.snapshot): --format snapshot\n\n"
+            "Outputs (override with --output):\n"
             "  • markdown → agent_specs.md\n"
             "  • json → agent_specs.json\n"
             "  • agent-context → AGENT_CONTEXT.md\n"
+            "  • jsonl → agent_specs.jsonl, written file by file (--output - for stdout)\n"
+            "  • agent-context --shard → agent_context/<module>.md per module + index.json\n"
+            "  • snapshot → agent_specs.snap\n"
         ),
         epilog=(
             "Examples:\n"
             "  agentspec extract src/\n"
-            "  agentspec extract src/ --format json > specs.json\n"
+            "  agentspec extract src/ --format json --output specs.json\n"
+            "  agentspec extract src/ --format jsonl --output - | jq .name\n"
             "  agentspec extract src/auth.py --format agent-context\n"
+            "  agentspec extract src/ --format agent-context --shard\n"
+            "  agentspec extract src/ --format agent-context --token-budget 50000 --focus src/auth\n"
+            "  agentspec extract src/ --format json --called-by\n"
         ),
         formatter_class=RawDescriptionRichHelpFormatter,
     )
     extract_parser.add_argument(
         "target",
-        help="File or directory to extract from"
+        nargs="*",
+        help="Files, directories or glob patterns to extract from (quote globs; ** recurses)"
+    )
+    _add_discovery_args(extract_parser, verbose=True, jobs=True)
+    extract_parser.add_argument(
+        "--changed-since",
+        metavar="REF",
+        help="Only extract definitions changed since the merge base with REF (plus untracked files); other files are skipped"
+    )
+    extract_parser.add_argument(
+        "--staged",
+        action="store_true",
+        help="Only extract definitions changed in the index (against HEAD, or REF with --changed-since)"
     )
     extract_parser.add_argument(
         "--format",
-        choices=["markdown", "json", "agent-context"],
+        choices=["markdown", "json", "agent-context", "jsonl", "snapshot"],
         default="markdown",
         help="Output format (default: markdown)"
     )
+    extract_parser.add_argument(
+        "--output",
+        metavar="PATH",
+        help="Write to PATH instead of the format's default file; '-' streams jsonl to stdout"
+    )
+    extract_parser.add_argument(
+        "--shard",
+        action="store_true",
+        help="With --format agent-context: one file per module under --output (default agent_context/) plus index.json "
+             "with content hashes; unchanged shards are not rewritten"
+    )
+    extract_parser.add_argument(
+        "--token-budget",
+        type=int,
+        metavar="N",
+        help="With --format agent-context: pack the highest-ranked specs into about N tokens "
+             "(full detail first, then compact what + guardrails)"
+    )
+    extract_parser.add_argument(
+        "--focus",
+        action="append",
+        metavar="PATH",
+        help="With --token-budget: rank specs under PATH first (repeatable)"
+    )
+    extract_parser.add_argument(
+        "--called-by",
+        action="store_true",
+        help="Fill deps.called_by from a call graph of the whole repository (overrides hand-written lists when callers are found)"
+    )
     
+    # Check command
+    check_parser = subparsers.add_parser(
+        "check",
+        help="Lint and extract in one pass",
+        description=(
+            "Run lint and extract together: files are discovered, parsed and their\n"
+            "spec blocks YAML-loaded once, then reported and exported.\n\n"
+            "Behavior:\n"
+            "  • Prints the lint report, then writes the export like extract --format\n"
+            "  • Exits non-zero if lint fails (or warns, with --strict) or no specs are found\n"
+            "  • Fills the same cache entries as lint and extract\n"
+        ),
+        epilog=(
+            "Examples:\n"
+            "  agentspec check src/ --strict\n"
+            "  agentspec check src/ --format agent-context --jobs 8\n"
+        ),
+        formatter_class=RawDescriptionRichHelpFormatter,
+    )
+    check_parser.add_argument(
+        "target",
+        nargs="*",
+        help="Files, directories or glob patterns to check (quote globs; ** recurses)"
+    )
+    _add_discovery_args(check_parser, verbose=True, jobs=True)
+    check_parser.add_argument(
+        "--changed-since",
+        metavar="REF",
+        help="Only check definitions changed since the merge base with REF (plus untracked files); other files are skipped"
+    )
+    check_parser.add_argument(
+        "--staged",
+        action="store_true",
+        help="Only check definitions changed in the index (against HEAD, or REF with --changed-since)"
+    )
+    check_parser.add_argument(
+        "--format",
+        choices=["markdown", "json", "agent-context"],
+        default="json",
+        help="Export format (default: json)"
+    )
+    check_parser.add_argument(
+        "--min-lines",
+        type=int,
+        default=10,
+        help="Minimum lines required in agentspec blocks (default: 10)"
+    )
+    check_parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="Treat warnings as errors"
+    )
+
+    # Watch command
+    watch_parser = subparsers.add_parser(
+        "watch",
+        help="Re-lint or re-extract changed files as you edit",
+        description=(
+            "Keep lint results or extracted specs in memory and refresh only the files\n"
+            "that changed, polling every --interval seconds.\n\n"
+            "Behavior:\n"
+            "  • lint: prints reports for changed files and the updated totals\n"
+            "  • extract: rewrites agent_specs.md / agent_specs.json / AGENT_CONTEXT.md in place\n"
+            "  • New and deleted files are picked up; Ctrl-C stops\n"
+        ),
+        epilog=(
+            "Examples:\n"
+            "  agentspec watch lint src/\n"
+            "  agentspec watch extract src/ --format agent-context\n"
+        ),
+        formatter_class=RawDescriptionRichHelpFormatter,
+    )
+    watch_parser.add_argument(
+        "mode",
+        choices=["lint", "extract"],
+        help="What to keep up to date"
+    )
+    watch_parser.add_argument(
+        "target",
+        nargs="*",
+        help="Files, directories or glob patterns to watch (quote globs; ** recurses)"
+    )
+    _add_discovery_args(watch_parser)
+    watch_parser.add_argument(
+        "--format",
+        choices=["markdown", "json", "agent-context"],
+        default="markdown",
+        help="Export format in extract mode (default: markdown)"
+    )
+    watch_parser.add_argument(
+        "--min-lines",
+        type=int,
+        default=10,
+        help="Minimum lines required in agentspec blocks in lint mode (default: 10)"
+    )
+    watch_parser.add_argument(
+        "--interval",
+        type=float,
+        default=1.0,
+        metavar="SECONDS",
+        help="Polling interval (default: 1.0)"
+    )
+
     # Generate command
     from rich_argparse import RawDescriptionRichHelpFormatter
     
@@ -833,8 +1074,10 @@ def main():
     )
     generate_parser.add_argument(
         "target",
-        help="File or directory to generate docstrings for"
+        nargs="*",
+        help="Files, directories or glob patterns to generate docstrings for (quote globs; ** recurses)"
     )
+    _add_discovery_args(generate_parser)
     generate_parser.add_argument(
         "--dry-run",
         action="store_true",
@@ -887,6 +1130,126 @@ def main():
         help="DIFF SUMMARY: Add LLM-generated summaries of git diffs for each commit (separate API call)"
     )
 
+    # Cache command
+    cache_parser = subparsers.add_parser(
+        "cache",
+        help="Show or clear the on-disk caches",
+        description=(
+            "Inspect the caches under .agentspec/cache/ (or $AGENTSPEC_CACHE_DIR).\n\n"
+            "  • Discovery cache: directory listings reused by the filesystem walker\n"
+            "  • Result cache: lint findings and extracted specs keyed by file content,\n"
+            "    agentspec version and options; LRU-evicted past AGENTSPEC_CACHE_MAX_MB (default 64)\n"
+        ),
+        epilog=(
+            "Examples:\n"
+            "  agentspec cache stats\n"
+            "  agentspec cache clear\n"
+        ),
+        formatter_class=RawDescriptionRichHelpFormatter,
+    )
+    cache_parser.add_argument(
+        "action",
+        choices=["stats", "clear"],
+        help="stats: entry counts, size and hit rate; clear: delete all cached data"
+    )
+
+    # Index command
+    index_parser = subparsers.add_parser(
+        "index",
+        help="Build or search a SQLite index of the extracted specs",
+        description=(
+            "Keep extracted specs in a SQLite database for indexed queries.\n\n"
+            "Tables: files (with content hashes), specs, guardrails, calls (deps.calls),\n"
+            "changelog, and the FTS5 table spec_text over name/what/why/guardrails.\n"
+            "Rebuilds only re-extract files whose content changed.\n"
+        ),
+        epilog=(
+            "Examples:\n"
+            "  agentspec index build src/\n"
+            "  agentspec index search \"retry backoff\"\n"
+            "  sqlite3 agent_specs.db \"SELECT callee, COUNT(*) FROM calls GROUP BY callee\"\n"
+        ),
+        formatter_class=RawDescriptionRichHelpFormatter,
+    )
+    index_sub = index_parser.add_subparsers(dest="action", required=True)
+    index_build = index_sub.add_parser("build", help="Create or incrementally update the index")
+    index_build.add_argument(
+        "target",
+        nargs="*",
+        help="Files, directories or glob patterns to index (quote globs; ** recurses)"
+    )
+    _add_discovery_args(index_build, verbose=True, jobs=True)
+    index_search = index_sub.add_parser("search", help="Full-text search over name, what, why and guardrails")
+    index_search.add_argument("text", help="Words to match")
+    index_search.add_argument(
+        "--limit",
+        type=int,
+        default=20,
+        help="Maximum results (default: 20)"
+    )
+    for sub in (index_build, index_search):
+        sub.add_argument(
+            "--db",
+            default="agent_specs.db",
+            metavar="PATH",
+            help="Index database (default: agent_specs.db)"
+        )
+
+    # Serve command
+    serve_parser = subparsers.add_parser(
+        "serve",
+        help="Answer spec queries for agents over stdio (MCP-style tools)",
+        description=(
+            "Long-running tool server speaking newline-delimited JSON-RPC on stdin/stdout.\n\n"
+            "Tools (via tools/list + tools/call, or called directly as methods):\n"
+            "  • get_spec(path, symbol): spec of a function/class (name or Class.method)\n"
+            "  • guardrails_for(path, line): guardrails of every definition enclosing a line\n"
+            "  • search(text, limit): specs matching all words of the query\n\n"
+            "Specs are extracted once and refreshed incrementally as files change.\n"
+        ),
+        epilog=(
+            "Examples:\n"
+            "  agentspec serve src/\n"
+            "  echo '{\"jsonrpc\":\"2.0\",\"id\":1,\"method\":\"search\",\"params\":{\"text\":\"cache\"}}' | agentspec serve src/\n"
+        ),
+        formatter_class=RawDescriptionRichHelpFormatter,
+    )
+    serve_parser.add_argument(
+        "target",
+        nargs="*",
+        help="Files, directories or glob patterns to index (quote globs; ** recurses)"
+    )
+    _add_discovery_args(serve_parser, stdin=False)
+    serve_parser.add_argument(
+        "--refresh",
+        type=float,
+        default=1.0,
+        metavar="SECONDS",
+        help="Check for changed files before a query at most this often (default: 1.0)"
+    )
+
+    # LSP command
+    lsp_parser = subparsers.add_parser(
+        "lsp",
+        help="Run the language server (stdio) for editor diagnostics",
+        description=(
+            "Language Server Protocol server on stdin/stdout.\n\n"
+            "  • Publishes lint findings as diagnostics for open Python documents\n"
+            "  • Re-validates only the docstrings an edit touched\n"
+            "  • Hover shows the parsed spec of the enclosing function or class\n"
+        ),
+        epilog=(
+            "Editor setup: run `agentspec lsp` as the server command for Python files.\n"
+        ),
+        formatter_class=RawDescriptionRichHelpFormatter,
+    )
+    lsp_parser.add_argument(
+        "--min-lines",
+        type=int,
+        default=10,
+        help="Minimum lines required in agentspec blocks (default: 10; clients may override via initializationOptions.minLines)"
+    )
+
     # Keep top-level help concise. Detailed flags remain in each subcommand's --help.
 
     # Parse args
@@ -896,17 +1259,129 @@ def main():
         parser.print_help()
         sys.exit(1)
     
+    if args.command == "cache":
+        from agentspec import cache
+        sys.exit(cache.run(args.action))
+
+    if args.command == "index" and args.action == "search":
+        from agentspec import index
+        sys.exit(index.search(args.text, db_path=args.db, limit=args.limit))
+
+    if args.command == "lsp":
+        from agentspec import lsp
+        sys.exit(lsp.run(min_lines=args.min_lines))
+
+    if args.command == "serve" and args.files_from == "-":
+        parser.error("serve: stdin carries the protocol; pass --files-from a file")
+    files = read_files_from(args.files_from) if args.files_from else []
+    if getattr(args, "jobs", None) is not None and args.jobs < 1:
+        parser.error(f"{args.command}: --jobs must be at least 1")
+    incremental = getattr(args, "changed_since", None) is not None or getattr(args, "staged", False)
+    if not args.target and not args.files_from and not incremental:
+        parser.error(f"{args.command}: give at least one target, --files-from or --changed-since/--staged")
+
     # Execute command
     if args.command == "lint":
         exit_code = lint.run(
             args.target,
             min_lines=args.min_lines,
-            strict=args.strict
+            strict=args.strict,
+            verbose=args.verbose,
+            use_git=not args.no_git,
+            ignore_engine=args.ignore_engine,
+            use_cache=not args.no_cache,
+            files=files,
+            stream=args.stream,
+            jobs=args.jobs,
+            changed_since=args.changed_since,
+            staged=args.staged,
         )
     elif args.command == "extract":
+        if args.output == "-" and args.format != "jsonl":
+            parser.error("extract: --output - requires --format jsonl")
+        if args.output == "-" and args.files_from == "-":
+            parser.error("extract: --output - cannot be combined with --files-from -")
+        if args.shard and args.format != "agent-context":
+            parser.error("extract: --shard requires --format agent-context")
+        if args.shard and (args.changed_since or args.staged):
+            # A partial export would delete the shards of every unchanged module
+            parser.error("extract: --shard cannot be combined with --changed-since/--staged")
+        if args.token_budget is not None:
+            if args.format != "agent-context" or args.shard:
+                parser.error("extract: --token-budget requires --format agent-context without --shard")
+            if args.token_budget < 1:
+                parser.error("extract: --token-budget must be positive")
+        if args.focus and args.token_budget is None:
+            parser.error("extract: --focus requires --token-budget")
         exit_code = extract.run(
             args.target,
-            fmt=args.format
+            fmt=args.format,
+            verbose=args.verbose,
+            use_git=not args.no_git,
+            ignore_engine=args.ignore_engine,
+            use_cache=not args.no_cache,
+            files=files,
+            jobs=args.jobs,
+            changed_since=args.changed_since,
+            staged=args.staged,
+            output=args.output,
+            called_by=args.called_by,
+            shard=args.shard,
+            token_budget=args.token_budget,
+            focus=args.focus or (),
+        )
+    elif args.command == "check":
+        from agentspec import check
+        exit_code = check.run(
+            args.target,
+            fmt=args.format,
+            min_lines=args.min_lines,
+            strict=args.strict,
+            verbose=args.verbose,
+            use_git=not args.no_git,
+            ignore_engine=args.ignore_engine,
+            use_cache=not args.no_cache,
+            files=files,
+            jobs=args.jobs,
+            changed_since=args.changed_since,
+            staged=args.staged,
+        )
+    elif args.command == "watch":
+        from agentspec import watch
+        if args.interval <= 0:
+            parser.error("watch: --interval must be positive")
+        exit_code = watch.run(
+            args.mode,
+            args.target,
+            fmt=args.format,
+            min_lines=args.min_lines,
+            interval=args.interval,
+            use_git=not args.no_git,
+            ignore_engine=args.ignore_engine,
+            use_cache=not args.no_cache,
+            files=files,
+        )
+    elif args.command == "index":
+        from agentspec import index
+        exit_code = index.build(
+            args.target,
+            db_path=args.db,
+            verbose=args.verbose,
+            use_git=not args.no_git,
+            ignore_engine=args.ignore_engine,
+            use_cache=not args.no_cache,
+            files=files,
+            jobs=args.jobs,
+        )
+    elif args.command == "serve":
+        from agentspec import serve
+        exit_code = serve.run(
+            args.target,
+            refresh=args.refresh,
+            use_git=not args.no_git,
+            ignore_engine=args.ignore_engine,
+            use_cache=not args.no_cache,
+            files=files,
         )
     elif args.command == "generate":
         # Lazy import to avoid requiring anthropic unless generate is used
@@ -922,6 +1397,10 @@ def main():
             update_existing=args.update_existing,
             terse=args.terse,
             diff_summary=args.diff_summary,
+            use_git=not args.no_git,
+            ignore_engine=args.ignore_engine,
+            use_cache=not args.no_cache,
+            files=files,
         )
     else:
         parser.print_help()
@@ -7,6 +7,7 @@ Deterministic metadata collectors for Agentspec generation.
 Collects facts that can be derived from code or VCS, to reduce LLM
 hallucination in docstrings:
 - deps.calls: function calls within the function body (best-effort)
+- deps.called_by: callers across the repository, when given a CallGraph
 - deps.imports: top-level imports in the module (for context)
 
 Notes
@@ -16,11 +17,17 @@ Notes
 from __future__ import annotations
 
 import ast
+import functools
 import re
 import subprocess
 from pathlib import Path
 import difflib
-from typing import Any, Dict, List
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from agentspec.parsed import ParsedModule, parse_file, parse_source
+
+if TYPE_CHECKING:
+    from agentspec.callgraph import CallGraph
 
 
 def _get_function_calls(node: ast.AST) -> List[str]:
@@ -301,40 +308,42 @@ def _extract_function_source_without_docstring(src: str, func_name: str) -> str:
 
     '''
     try:
-        tree = ast.parse(src)
-        for node in ast.walk(tree):
-            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == func_name:
-                lines = src.split('\n')
-                start = (node.lineno or 1) - 1
-                end = (node.end_lineno or node.lineno)  # end is exclusive when slicing
-                func_lines = lines[start:end]
-
-                # Remove leading docstring if present using AST body[0]
-                if getattr(node, 'body', None):
-                    first_stmt = node.body[0]
-                    is_doc = False
-                    if isinstance(first_stmt, ast.Expr):
-                        if isinstance(getattr(first_stmt, 'value', None), ast.Constant) and isinstance(first_stmt.value.value, str):
-                            is_doc = True
-                        elif hasattr(ast, 'Str') and isinstance(getattr(first_stmt, 'value', None), ast.Str):
-                            is_doc = True
-                    if is_doc:
-                        ds_start_abs = (first_stmt.lineno or node.lineno) - 1
-                        ds_end_abs = (first_stmt.end_lineno or first_stmt.lineno)
-                        # Delete docstring range from func_lines using absolute indices mapped to slice
-                        del_start = max(0, ds_start_abs - start)
-                        del_end = max(del_start, ds_end_abs - start)
-                        del func_lines[del_start:del_end]
-
-                # Also drop pure comment-only lines
-                cleaned = []
-                for ln in func_lines:
-                    stripped = ln.lstrip()
-                    if stripped.startswith('#'):
-                        continue
-                    cleaned.append(ln)
-                return '\n'.join(cleaned)
+        # Every function of a file asks for the same historical blobs; parse each once
+        module = parse_source(src)
+        node = module.find_function(func_name)
+        if node is None:
+            return ""
+        start = (node.lineno or 1) - 1
+        end = (node.end_lineno or node.lineno)  # end is exclusive when slicing
+        func_lines = module.lines[start:end]
+
+        # Remove leading docstring if present using AST body[0]
+        first_stmt = ParsedModule.docstring_node(node)
+        if first_stmt is not None:
+            ds_start_abs = (first_stmt.lineno or node.lineno) - 1
+            ds_end_abs = (first_stmt.end_lineno or first_stmt.lineno)
+            # Delete docstring range from func_lines using absolute indices mapped to slice
+            del_start = max(0, ds_start_abs - start)
+            del_end = max(del_start, ds_end_abs - start)
+            del func_lines[del_start:del_end]
+
+        # Also drop pure comment-only lines
+        cleaned = []
+        for ln in func_lines:
+            stripped = ln.lstrip()
+            if stripped.startswith('#'):
+                continue
+            cleaned.append(ln)
+        return '\n'.join(cleaned)
+    except Exception:
         return ""
+
+
+@functools.lru_cache(maxsize=256)
+def _git_show(spec: str) -> str:
+    """Contents of a `<commit>:<path>` blob, or "" if it does not exist (memoised per process)."""
+    try:
+        return subprocess.check_output(["git", "show", spec], stderr=subprocess.DEVNULL).decode("utf-8", errors="ignore")
     except Exception:
         return ""
 
@@ -394,14 +403,8 @@ def collect_function_code_diffs(filepath: Path, func_name: str, limit: int = 5)
             commit, date, message = parts[0], parts[1], parts[2]
 
             # Get file content at commit and its parent
-            try:
-                prev_src = subprocess.check_output(["git", "show", f"{commit}^:{filepath}"], stderr=subprocess.DEVNULL).decode("utf-8", errors="ignore")
-            except Exception:
-                prev_src = ""
-            try:
-                curr_src = subprocess.check_output(["git", "show", f"{commit}:{filepath}"], stderr=subprocess.DEVNULL).decode("utf-8", errors="ignore")
-            except Exception:
-                curr_src = ""
+            prev_src = _git_show(f"{commit}^:{filepath}")
+            curr_src = _git_show(f"{commit}:{filepath}")
 
             prev_func = _extract_function_source_without_docstring(prev_src, func_name)
             curr_func = _extract_function_source_without_docstring(curr_src, func_name)
@@ -446,7 +449,12 @@ def collect_function_code_diffs(filepath: Path, func_name: str, limit: int = 5)
 
     return results
 
-def collect_metadata(filepath: Path, func_name: str) -> Dict[str, Any]:
+def collect_metadata(
+    filepath: Path,
+    func_name: str,
+    module: Optional[ParsedModule] = None,
+    call_graph: Optional["CallGraph"] = None,
+) -> Dict[str, Any]:
     '''
     ```python
     """
@@ -549,19 +557,16 @@ def collect_metadata(filepath: Path, func_name: str) -> Dict[str, Any]:
 
     '''
     try:
-        src = filepath.read_text(encoding="utf-8")
-        tree = ast.parse(src, filename=str(filepath))
-
-        target = None
-        for n in ast.walk(tree):
-            if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef)) and n.name == func_name:
-                target = n
-                break
+        # Callers generating many functions pass the module they already parsed
+        if module is None:
+            module = parse_file(filepath)
+
+        target = module.find_function(func_name)
         if not target:
             return {}
 
         deps_calls = _get_function_calls(target)
-        imports = _get_module_imports(tree)
+        imports = _get_module_imports(module.tree)
 
         # Deterministic git changelog per function using `git log -L`.
         # NOTE: git log -L includes diffs, but we only want commit messages
@@ -595,10 +600,18 @@ def collect_metadata(filepath: Path, func_name: str) -> Dict[str, Any]:
             },
             "changelog": changelog,
         }
+        if call_graph is not None:
+            # Callers across the repository, from the call graph built before generation
+            # definitions, not index: a replaced definition (e.g. an overwritten method) keeps its qualname
+            qualname = next((q for q, n in module.definitions if n is target), func_name)
+            result["deps"]["called_by"] = call_graph.callers(call_graph.symbol_for(filepath, qualname))
 
         # Print deterministic metadata to stdout (forces it into agent context)
         print(f"[AGENTSPEC_METADATA] {func_name} in {filepath}")
         print(f"[AGENTSPEC_METADATA] Calls: {', '.join(deps_calls) if deps_calls else 'none'}")
+        if call_graph is not None:
+            called_by = result["deps"]["called_by"]
+            print(f"[AGENTSPEC_METADATA] Called by: {', '.join(called_by) if called_by else 'none'}")
         print(f"[AGENTSPEC_METADATA] Imports: {len(imports)} module(s)")
         print(f"[AGENTSPEC_METADATA] Changelog: {len(changelog)} commit(s)")
         for entry in changelog[:3]:  # Show first 3 commits
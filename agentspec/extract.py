@@ -2,16 +2,29 @@
 """
 agentspec.extract
 --------------------------------
-Extracts agent spec blocks from Python files into Markdown or JSON with full YAML parsing.
+Extracts agent spec blocks from Python files into Markdown, JSON, JSON Lines or a binary
+snapshot (agentspec.snapshot) with full YAML parsing.
+The agent context can also be sharded into one file per module (export_agent_context_shards).
 """
 
 import ast
+import contextlib
+import hashlib
+import io
 import json
+import os
+import sys
+import time
 import yaml
 from pathlib import Path
-from agentspec.utils import collect_python_files
+from agentspec.callgraph import CallGraph, build_for_targets
+from agentspec.cache import ResultCache, node_key, result_key
+from agentspec.parsed import parse_file
+from agentspec.pipeline import FileJob, FileRun
+from agentspec.yamlio import dump as yaml_dump, load_block
+from agentspec.utils import create_temp, write_if_changed
 from dataclasses import dataclass, asdict, field
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Collection, Optional, Sequence, Set, TextIO, Tuple, Union
 
 
 @dataclass
@@ -32,6 +45,13 @@ class AgentSpec:
     performance: Dict[str, Any] = field(default_factory=dict)
 
 
+def as_list(value: Any) -> List[Any]:
+    """Spec list fields as written by hand: a list, a single value, or empty."""
+    if isinstance(value, list):
+        return value
+    return [value] if value else []
+
+
 def _extract_block(docstring: str) -> Optional[str]:
     '''
     ---agentspec
@@ -149,7 +169,8 @@ def _parse_yaml_block(block: str) -> Optional[Dict[str, Any]]:
         ---/agentspec
     '''
     try:
-        return yaml.safe_load(block)
+        # Only success matters here, so skip the pure-Python re-parse for error wording
+        return load_block(block, exact_errors=False)
     except yaml.YAMLError:
         return None
 
@@ -213,6 +234,10 @@ class AgentSpecExtractor(ast.NodeVisitor):
         """
         self.filepath = filepath
         self.specs: List[AgentSpec] = []
+        # Line numbers of the definitions to extract (incremental runs); None extracts all
+        self.only: Optional[Set[int]] = None
+        # Per-definition records by node_key, so unchanged spec blocks are not re-parsed
+        self.node_cache: Optional[ResultCache] = None
 
     def visit_FunctionDef(self, node):
         """
@@ -453,7 +478,27 @@ class AgentSpecExtractor(ast.NodeVisitor):
               - "- 2025-10-29: Add agent spec extraction and export functionality"
             ---/agentspec
         '''
-        doc = ast.get_docstring(node)
+        self.extract_doc(node, ast.get_docstring(node))
+
+    def extract_doc(self, node, doc: Optional[str]):
+        """_extract with the docstring already looked up (shared with linting by `check`)."""
+        if self.only is not None and node.lineno not in self.only:
+            return
+        if not doc or self.node_cache is None:
+            self._build_spec(node, doc)
+            return
+        key = node_key("extract", node, doc)
+        hit = self.node_cache.get_node(key)
+        if hit is not None:
+            self.specs.extend(AgentSpec(filepath=self.filepath, lineno=node.lineno, **fields) for fields in hit)
+            return
+        first = len(self.specs)
+        self._build_spec(node, doc)
+        self.node_cache.put(key, "extract-node", [
+            {k: v for k, v in asdict(spec).items() if k not in ("filepath", "lineno")} for spec in self.specs[first:]
+        ])
+
+    def _build_spec(self, node, doc: Optional[str]):
         block = _extract_block(doc)
 
         if not block:
@@ -563,17 +608,93 @@ def extract_from_file(path: Path) -> List[AgentSpec]:
         ---/agentspec
     '''
     try:
-        src = path.read_text(encoding="utf-8")
-        tree = ast.parse(src, filename=str(path))
-        extractor = AgentSpecExtractor(str(path))
-        extractor.visit(tree)
-        return extractor.specs
+        return _extract_specs(path)
     except Exception as e:
         print(f"Warning: Could not parse {path}: {e}")
         return []
 
 
-def export_markdown(specs: List[AgentSpec], out: Path):
+def _extract_specs(
+    path: Path, lines: Optional[Collection[int]] = None, cache: Optional[ResultCache] = None
+) -> List[AgentSpec]:
+    module = parse_file(path)
+    extractor = AgentSpecExtractor(str(path))
+    extractor.node_cache = cache
+    if lines is not None:
+        extractor.only = {node.lineno for node in module.defs_touching(lines)}
+    extractor.visit(module.tree)
+    return extractor.specs
+
+
+def _extract_key(path: Path, lines: Optional[Collection[int]] = None) -> Optional[str]:
+    try:
+        return ExtractJob().keys(path.read_bytes(), lines)[0]
+    except OSError:
+        return None
+
+
+def _extract_records(
+    path: Path, lines: Optional[Collection[int]] = None, cache: Optional[ResultCache] = None
+) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+    """
+    Picklable extraction result for one file: (error, records).
+
+    Records are AgentSpec fields without `filepath`, the same shape the result
+    cache stores, so moved or copied files still hit.
+    """
+    try:
+        specs = _extract_specs(path, lines, cache)
+    except Exception as e:
+        return str(e), []
+    return None, to_records(specs)
+
+
+class ExtractJob(FileJob):
+    """_extract_records as a pipeline job, cached under one "extract" entry per file."""
+
+    def compute(self, path, lines=None, cache=None):
+        return _extract_records(path, lines, cache)
+
+    def keys(self, content, lines=None):
+        options = () if lines is None else (sorted(lines),)
+        return (result_key(content, "extract", *options),)
+
+    def decode(self, hits):
+        return None, hits[0]
+
+    def store(self, cache, keys, result):
+        error, records = result
+        if error is None:
+            cache.put(keys[0], "extract", records)
+
+
+def to_records(specs: List[AgentSpec]) -> List[Dict[str, Any]]:
+    """Specs as plain dicts without `filepath`, the shape workers return and the cache stores."""
+    return [{k: v for k, v in asdict(s).items() if k != "filepath"} for s in specs]
+
+
+def from_records(path: Path, records: List[Dict[str, Any]]) -> List[AgentSpec]:
+    """The specs of `path` rebuilt from to_records() output."""
+    return [AgentSpec(filepath=str(path), **fields) for fields in records]
+
+
+def extract_from_file_cached(path: Path, cache: Optional[ResultCache] = None) -> List[AgentSpec]:
+    """extract_from_file served from the content-hash result cache when the file is unchanged."""
+    key = _extract_key(path) if cache is not None else None
+    if key is None:
+        return extract_from_file(path)
+    hit = cache.get(key)
+    if hit is not None:
+        return from_records(path, hit)
+    error, records = _extract_records(path, cache=cache)
+    if error is not None:
+        print(f"Warning: Could not parse {path}: {error}")
+        return []
+    cache.put(key, "extract", records)
+    return from_records(path, records)
+
+
+def export_markdown(specs: List[AgentSpec], out: Path) -> bool:
     '''
     ---agentspec
     what: |
@@ -636,7 +757,7 @@ def export_markdown(specs: List[AgentSpec], out: Path):
           - "- 2025-10-29: Add agent spec extraction and export functionality"
         ---/agentspec
     '''
-    with out.open("w", encoding="utf-8") as f:
+    with io.StringIO() as f:
         f.write("# 🤖 Extracted Agent Specifications\n\n")
         f.write("**This document is auto-generated for AI agent consumption.**\n\n")
         f.write("---\n\n")
@@ -685,7 +806,7 @@ def export_markdown(specs: List[AgentSpec], out: Path):
             
             if s.testing:
                 f.write(f"### Testing\n\n")
-                f.write(f"```yaml\n{yaml.dump(s.testing, default_flow_style=False)}```\n\n")
+                f.write(f"```yaml\n{yaml_dump(s.testing, default_flow_style=False)}```\n\n")
             
             if s.performance:
                 f.write(f"### Performance Characteristics\n\n")
@@ -696,9 +817,115 @@ def export_markdown(specs: List[AgentSpec], out: Path):
             f.write(f"### Raw YAML Block\n\n")
             f.write(f"```yaml\n{s.raw_block}\n```\n\n")
             f.write("---\n\n")
+        text = f.getvalue()
+    return write_if_changed(out, text.encode("utf-8"))
+
+
+def spec_to_dict(s: AgentSpec) -> Dict[str, Any]:
+    """The exported form of one spec (agent_specs.json entries, JSON Lines records)."""
+    return {
+        'name': s.name,
+        'lineno': s.lineno,
+        'filepath': s.filepath,
+        'what': s.what,
+        'deps': s.deps,
+        'why': s.why,
+        'guardrails': s.guardrails,
+        'changelog': s.changelog,
+        'testing': s.testing,
+        'performance': s.performance,
+        'raw_block': s.raw_block
+    }
+
+
+class JsonLinesWriter:
+    """
+    Writes specs as JSON Lines (one compact spec_to_dict record per line) as they
+    arrive, flushing after each batch. A path is written through a temp file that
+    close() renames into place, so readers never see a partial export; the bytes
+    are hashed as they stream, and an existing file with the same digest is kept
+    as is. With no specs, close() removes the old file instead of leaving stale
+    records behind. A stream (stdout) is written to directly and left open.
+    """
 
-
-def export_json(specs: List[AgentSpec], out: Path):
+    def __init__(self, out: Union[Path, TextIO]):
+        self.out = out
+        self.count = 0
+        self.changed = True
+        self._f: Optional[TextIO] = None if isinstance(out, Path) else out
+        self._tmp: Optional[str] = None
+        self._hash = hashlib.blake2b(digest_size=20)
+        self._size = 0
+
+    @property
+    def label(self) -> str:
+        return str(self.out) if isinstance(self.out, Path) else "stdout"
+
+    def write(self, specs: Sequence[AgentSpec]) -> None:
+        if not specs:
+            return
+        if self._f is None:
+            self.out.parent.mkdir(parents=True, exist_ok=True)
+            fd, self._tmp = create_temp(self.out)
+            self._f = os.fdopen(fd, "wb")
+        for s in specs:
+            # default=str: a YAML date in one changelog must not abort a long stream
+            line = json.dumps(spec_to_dict(s), ensure_ascii=False, separators=(",", ":"), default=str) + "\n"
+            if self._tmp is None:
+                self._f.write(line)
+                continue
+            data = line.encode("utf-8")
+            self._f.write(data)
+            self._hash.update(data)
+            self._size += len(data)
+        self.count += len(specs)
+        self._f.flush()
+
+    def _same_as_existing(self) -> bool:
+        try:
+            if self.out.stat().st_size != self._size:
+                return False
+            h = hashlib.blake2b(digest_size=20)
+            with self.out.open("rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+        except OSError:
+            return False
+        return h.digest() == self._hash.digest()
+
+    def close(self) -> bool:
+        """Put the export in place; False when the existing file already held the same bytes."""
+        if not isinstance(self.out, Path):
+            return True
+        if self._tmp is None:
+            self.changed = self.out.exists()
+            self.out.unlink(missing_ok=True)
+            return self.changed
+        self._f.close()
+        if self._same_as_existing():
+            self.abort()
+            self.changed = False
+            return False
+        try:
+            os.chmod(self._tmp, self.out.stat().st_mode & 0o7777)
+        except FileNotFoundError:
+            pass
+        os.replace(self._tmp, self.out)
+        self._tmp = None
+        return True
+
+    def abort(self) -> None:
+        """Drop a partly written file, leaving the previous export in place."""
+        if self._tmp is not None:
+            self._f.close()
+            try:
+                os.unlink(self._tmp)
+            except OSError:
+                pass
+            self._tmp = None
+
+
+def export_json(specs: List[AgentSpec], out: Path) -> bool:
     '''
     ---agentspec
     what: |
@@ -748,28 +975,11 @@ def export_json(specs: List[AgentSpec], out: Path):
           - "- 2025-10-29: Add agent spec extraction and export functionality"
         ---/agentspec
     '''
-    data = []
-    for s in specs:
-        spec_dict = {
-            'name': s.name,
-            'lineno': s.lineno,
-            'filepath': s.filepath,
-            'what': s.what,
-            'deps': s.deps,
-            'why': s.why,
-            'guardrails': s.guardrails,
-            'changelog': s.changelog,
-            'testing': s.testing,
-            'performance': s.performance,
-            'raw_block': s.raw_block
-        }
-        data.append(spec_dict)
-    
-    with out.open("w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    data = [spec_to_dict(s) for s in specs]
+    return write_if_changed(out, json.dumps(data, indent=2).encode("utf-8"))
 
 
-def export_agent_context(specs: List[AgentSpec], out: Path):
+def export_agent_context(specs: List[AgentSpec], out: Path) -> bool:
     """
     ---agentspec
     what: |
@@ -808,7 +1018,7 @@ def export_agent_context(specs: List[AgentSpec], out: Path):
       - ALWAYS encode output as UTF-8 and enumerate guardrails starting from 1, not 0
       - ALWAYS include the triple-dash separator ("---\n\n") between specs for section demarcation
       - NOTE: Function assumes all AgentSpec objects have valid name, filepath, and lineno attributes; missing attributes will cause AttributeError
-      - NOTE: File write operations are not atomic; process crash mid-write will corrupt output file
+      - NOTE: Output is written through write_if_changed: skipped when byte-identical, otherwise temp file + rename
       - NOTE: Output file can grow large with many specs; consider pagination or splitting for >5000 specs
       - NOTE: Agents should treat print() statements as metadata instructions, not as code to execute in all contexts
 
@@ -856,36 +1066,185 @@ def export_agent_context(specs: List[AgentSpec], out: Path):
           - "- 2025-10-29: Add agent spec extraction and export functionality"
         ---/agentspec
     """
-    with out.open("w", encoding="utf-8") as f:
-        f.write("# 🤖 AGENT CONTEXT: Function Specifications\n\n")
-        f.write("**AGENTS: You MUST print() and read these specifications before modifying code.**\n\n")
-        
-        for s in specs:
-            f.write(f"## SPEC: {s.name} ({s.filepath}:{s.lineno})\n\n")
-            f.write(f"```python\n")
-            f.write(f'print("[AGENTSPEC] Reading spec for {s.name}")\n')
-            f.write(f'print("[AGENTSPEC] Location: {s.filepath}:{s.lineno}")\n')
-            
-            if s.what:
-                f.write(f'print("[AGENTSPEC] What: {s.what[:100]}...")\n')
-            
-            if s.guardrails:
-                f.write(f'print("[AGENTSPEC] GUARDRAILS ({len(s.guardrails)} items):")\n')
-                for i, guard in enumerate(s.guardrails, 1):
-                    f.write(f'print("[AGENTSPEC]   {i}. {guard}")\n')
-            
-            f.write(f"```\n\n")
-            
-            if s.parsed_data:
-                f.write(f"**Full Specification (YAML):**\n\n")
-                f.write(f"```yaml\n{s.raw_block}\n```\n\n")
-            else:
-                f.write(f"**Full Specification (Raw Docstring):**\n\n")
-                f.write(f"```\n{s.raw_block}\n```\n\n")
-            f.write("---\n\n")
+    return write_if_changed(out, render_agent_context(specs).encode("utf-8"))
+
+
+def render_agent_context(specs: List[AgentSpec], title: str = "Function Specifications") -> str:
+    """The agent-context markdown for `specs` (see export_agent_context)."""
+    parts = [
+        f"# 🤖 AGENT CONTEXT: {title}\n\n",
+        "**AGENTS: You MUST print() and read these specifications before modifying code.**\n\n",
+    ]
+    parts.extend(agent_context_section(s) for s in specs)
+    return "".join(parts)
+
+
+def agent_context_section(s: AgentSpec) -> str:
+    """One spec's agent-context section: header, print() lines, the full block and a separator."""
+    parts = [f"## SPEC: {s.name} ({s.filepath}:{s.lineno})\n\n"]
+    parts.append("```python\n")
+    parts.append(f'print("[AGENTSPEC] Reading spec for {s.name}")\n')
+    parts.append(f'print("[AGENTSPEC] Location: {s.filepath}:{s.lineno}")\n')
+
+    if s.what:
+        parts.append(f'print("[AGENTSPEC] What: {s.what[:100]}...")\n')
+
+    if s.guardrails:
+        parts.append(f'print("[AGENTSPEC] GUARDRAILS ({len(s.guardrails)} items):")\n')
+        for i, guard in enumerate(s.guardrails, 1):
+            parts.append(f'print("[AGENTSPEC]   {i}. {guard}")\n')
+
+    parts.append("```\n\n")
+
+    if s.parsed_data:
+        parts.append("**Full Specification (YAML):**\n\n")
+        parts.append(f"```yaml\n{s.raw_block}\n```\n\n")
+    else:
+        parts.append("**Full Specification (Raw Docstring):**\n\n")
+        parts.append(f"```\n{s.raw_block}\n```\n\n")
+    parts.append("---\n\n")
+    return "".join(parts)
+
+
+SHARD_INDEX = "index.json"
+SHARD_INDEX_FORMAT = 1
+
+
+@dataclass
+class ShardStats:
+    """What export_agent_context_shards did with each module's shard."""
+    written: int = 0
+    unchanged: int = 0
+    removed: int = 0
+
+
+def shard_path(filepath: str) -> Path:
+    """Shard file of a source file, relative to the shard directory: its path with .md for .py."""
+    path = Path(filepath)
+    if path.is_absolute():
+        try:
+            path = path.resolve().relative_to(Path.cwd().resolve())
+        except ValueError:
+            pass
+    # Outside the working directory: keep the path shape but stay inside the shard directory
+    parts = [part for part in path.parts if part not in (path.anchor, "..", ".")]
+    return Path(*parts).with_suffix(".md")
 
 
-def run(target: str, fmt: str = "markdown") -> int:
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=20).hexdigest()
+
+
+def _shard_paths(modules: List[str]) -> Dict[str, str]:
+    """
+    Shard path of each module. Modules whose shard_path() is their own path claim it
+    first; a module whose shard path is already taken (`../x/a.py` after `x/a.py`)
+    gets a hash of its path appended to the file name.
+    """
+    paths: Dict[str, str] = {}
+    taken: Set[str] = set()
+    plain = {module: shard_path(module) for module in modules}
+    for module in sorted(modules, key=lambda m: (plain[m] != Path(m).with_suffix(".md"), m)):
+        path = plain[module]
+        if path.as_posix() in taken:
+            path = path.with_name(f"{path.stem}.{_digest(module)[:8]}.md")
+        paths[module] = path.as_posix()
+        taken.add(paths[module])
+    return paths
+
+
+def _load_shard_index(path: Path) -> Dict[str, Dict[str, Any]]:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("format") != SHARD_INDEX_FORMAT:
+        return {}
+    shards = data.get("shards")
+    return shards if isinstance(shards, dict) else {}
+
+
+def export_agent_context_shards(specs: List[AgentSpec], out_dir: Path) -> ShardStats:
+    """
+    Agent context split into one markdown file per source module under `out_dir`,
+    plus index.json mapping each module to its shard, spec count and content hash.
+
+    Shards whose rendered content hashes the same as in the previous index (and
+    that still exist) are not rewritten, so watchers only see modules whose specs
+    changed. Shards of modules that are gone are deleted; files the index does not
+    list are left alone.
+    """
+    by_module: Dict[str, List[AgentSpec]] = {}
+    for s in specs:
+        by_module.setdefault(s.filepath, []).append(s)
+    index_path = out_dir / SHARD_INDEX
+    stats = ShardStats()
+    if not specs and not index_path.exists():
+        return stats  # Nothing to write and nothing to prune
+    previous = _load_shard_index(index_path)
+    shards: Dict[str, Dict[str, Any]] = {}
+    paths = _shard_paths(list(by_module))
+    for module in sorted(by_module):
+        module_specs = by_module[module]
+        text = render_agent_context(module_specs, title=module)
+        entry = {
+            "path": paths[module],
+            "hash": _digest(text),
+            "specs": len(module_specs),
+            "guardrails": sum(len(s.guardrails or ()) for s in module_specs),
+        }
+        shards[module] = entry
+        target = out_dir / entry["path"]
+        if previous.get(module) == entry and target.exists():
+            stats.unchanged += 1
+            continue
+        write_if_changed(target, text.encode("utf-8"))
+        stats.written += 1
+    current_paths = {entry["path"] for entry in shards.values()}
+    for module, entry in previous.items():
+        stale = entry.get("path") if isinstance(entry, dict) else None
+        if module in shards or not isinstance(stale, str) or stale in current_paths:
+            continue
+        if Path(stale).is_absolute() or ".." in Path(stale).parts:
+            continue  # Only ever delete inside the shard directory
+        target = out_dir / stale
+        try:
+            target.unlink()
+        except FileNotFoundError:
+            pass
+        else:
+            stats.removed += 1
+        # Drop directories the removal left empty, up to the shard directory
+        parent = target.parent
+        while parent != out_dir and out_dir in parent.parents:
+            try:
+                parent.rmdir()
+            except OSError:
+                break
+            parent = parent.parent
+    index = {"format": SHARD_INDEX_FORMAT, "shards": shards}
+    text = json.dumps(index, indent=2, sort_keys=True, ensure_ascii=False) + "\n"
+    write_if_changed(index_path, text.encode("utf-8"))
+    return stats
+
+
+def run(
+    target: Union[str, Sequence[str]],
+    fmt: str = "markdown",
+    verbose: bool = False,
+    use_git: bool = True,
+    ignore_engine: str = "auto",
+    use_cache: bool = True,
+    files: Optional[Sequence[str]] = None,
+    jobs: Optional[int] = None,
+    changed_since: Optional[str] = None,
+    staged: bool = False,
+    output: Optional[str] = None,
+    called_by: bool = False,
+    shard: bool = False,
+    token_budget: Optional[int] = None,
+    focus: Sequence[str] = (),
+) -> int:
     """
     ---agentspec
     what: |
@@ -963,27 +1322,193 @@ def run(target: str, fmt: str = "markdown") -> int:
           - "- 2025-10-29: Add agent spec extraction and export functionality"
         ---/agentspec
     """
-    path = Path(target)
-    files = collect_python_files(path)
-    all_specs: List[AgentSpec] = []
-
-    for file in files:
-        all_specs.extend(extract_from_file(file))
+    stdout = sys.stdout
+    # With `--output -` stdout carries the records, so progress and warnings go to stderr
+    with contextlib.redirect_stdout(sys.stderr) if output == "-" else contextlib.nullcontext():
+        try:
+            return _run(
+                target,
+                fmt=fmt,
+                verbose=verbose,
+                use_git=use_git,
+                ignore_engine=ignore_engine,
+                use_cache=use_cache,
+                files=files,
+                jobs=jobs,
+                changed_since=changed_since,
+                staged=staged,
+                output=output,
+                stdout=stdout,
+                called_by=called_by,
+                shard=shard,
+                token_budget=token_budget,
+                focus=focus,
+            )
+        except BrokenPipeError:
+            if output != "-":
+                raise
+            # The reader stopped early (`| head`): end quietly instead of failing again at exit flush
+            os.dup2(os.open(os.devnull, os.O_WRONLY), stdout.fileno())
+            return 1
+
+
+def _run(
+    target: Union[str, Sequence[str]],
+    *,
+    fmt: str,
+    verbose: bool,
+    use_git: bool,
+    ignore_engine: str,
+    use_cache: bool,
+    files: Optional[Sequence[str]],
+    jobs: Optional[int],
+    changed_since: Optional[str],
+    staged: bool,
+    output: Optional[str],
+    stdout: TextIO,
+    called_by: bool = False,
+    shard: bool = False,
+    token_budget: Optional[int] = None,
+    focus: Sequence[str] = (),
+) -> int:
+    pipeline = FileRun.open(
+        target,
+        files=files,
+        changed_since=changed_since,
+        staged=staged,
+        use_git=use_git,
+        ignore_engine=ignore_engine,
+        use_cache=use_cache,
+        jobs=jobs,
+    )
+    if pipeline is None:
+        return 1
+    graph = None
+    if called_by:
+        started = time.perf_counter()
+        graph = build_for_targets(pipeline.targets, use_git=use_git, ignore_engine=ignore_engine, use_cache=use_cache)
+        if verbose:
+            print(f"🕸️  Call graph: {len(graph.symbols)} symbols in {len(graph.modules)} modules "
+                  f"({time.perf_counter() - started:.2f}s)")
+    per_file = []
+    # JSON Lines are written as each file is extracted, in discovery order, instead of collected
+    sink = None
+    if fmt == "jsonl":
+        sink = JsonLinesWriter(stdout if output == "-" else Path(output or DEFAULT_OUTPUTS[fmt]))
+    # Extract files as discovery yields them, then restore sorted file order
+    try:
+        for file, (error, records) in pipeline.map(ExtractJob()):
+            if error is not None:
+                print(f"Warning: Could not parse {file}: {error}")
+                continue
+            specs = from_records(file, records)
+            if graph is not None:
+                fill_called_by(graph, file, specs)
+            if sink is not None:
+                sink.write(specs)
+            else:
+                per_file.append((file, specs))
+    except BaseException:
+        if sink is not None:
+            sink.abort()
+        raise
+    pipeline.close(verbose)
+    if sink is not None:
+        sink.close()
+        if not sink.count:
+            print("⚠️  No agent spec blocks or docstrings found.")
+            return 1
+        print(f"✅ Extracted {sink.count} specs → {sink.label}" + ("" if sink.changed else " (unchanged)"))
+        return 0
+    per_file.sort(key=lambda item: str(item[0]))
+    return write_export([spec for _, specs in per_file for spec in specs], fmt, output, shard=shard, token_budget=token_budget, focus=focus)
+
+
+def fill_called_by(graph: CallGraph, file: Path, specs: List[AgentSpec]) -> None:
+    """Set deps.called_by of each spec from the call graph, where it found callers."""
+    try:
+        definitions = parse_file(file).definitions
+    except (SyntaxError, ValueError, OSError, UnicodeDecodeError):
+        return
+    # The graph has one symbol per qualname; replaced definitions (redefinitions,
+    # property setters) map to it by qualname, not by their own `def` line
+    qualnames = {node.lineno: qualname for qualname, node in definitions}
+    for spec in specs:
+        qualname = qualnames.get(spec.lineno)
+        callers = graph.callers(graph.symbol_for(file, qualname) if qualname is not None else None)
+        if callers and isinstance(spec.deps, dict):
+            spec.deps["called_by"] = callers
+
+
+DEFAULT_OUTPUTS = {
+    "markdown": "agent_specs.md",
+    "json": "agent_specs.json",
+    "agent-context": "AGENT_CONTEXT.md",
+    "jsonl": "agent_specs.jsonl",
+    "snapshot": "agent_specs.snap",
+}
+DEFAULT_SHARD_DIR = "agent_context"
+
+
+def write_export(
+    all_specs: List[AgentSpec],
+    fmt: str,
+    output: Optional[str] = None,
+    shard: bool = False,
+    token_budget: Optional[int] = None,
+    focus: Sequence[str] = (),
+) -> int:
+    """
+    Write specs to `output` (default: the file named for `fmt`); returns the extract exit code.
+    Agent-context only: with `shard`, `output` is a directory of per-module shards; with
+    `token_budget`, the best-ranked specs are packed into about that many tokens.
+    """
+    if shard:
+        # Runs without specs too, so shards of modules that lost theirs are pruned
+        out_dir = Path(output or DEFAULT_SHARD_DIR)
+        shard_stats = export_agent_context_shards(all_specs, out_dir)
+        if not all_specs:
+            print(f"⚠️  No agent spec blocks or docstrings found. ({shard_stats.removed} shards removed)")
+            return 1
+        print(
+            f"✅ Extracted {len(all_specs)} specs → {out_dir}/ ({shard_stats.written} shards written, "
+            f"{shard_stats.unchanged} unchanged, {shard_stats.removed} removed)"
+        )
+        return 0
 
     if not all_specs:
         print("⚠️  No agent spec blocks or docstrings found.")
         return 1
 
     # Determine output file
+    out = Path(output or DEFAULT_OUTPUTS.get(fmt, DEFAULT_OUTPUTS["markdown"]))
+    if token_budget is not None:
+        from agentspec.pack import pack_agent_context
+
+        text, pack_stats = pack_agent_context(all_specs, token_budget, focus)
+        written = write_if_changed(out, text.encode("utf-8"))
+        print(
+            f"✅ Packed {pack_stats.full + pack_stats.compact} of {len(all_specs)} specs → {out} "
+            f"(~{pack_stats.tokens}/{token_budget} tokens; {pack_stats.full} full, "
+            f"{pack_stats.compact} compact, {pack_stats.omitted} omitted)" + ("" if written else " (unchanged)")
+        )
+        return 0
+    # Exports are rendered in memory and left alone when byte-identical (write_if_changed)
+    written = True
     if fmt == "json":
-        out = Path("agent_specs.json")
-        export_json(all_specs, out)
+        written = export_json(all_specs, out)
     elif fmt == "agent-context":
-        out = Path("AGENT_CONTEXT.md")
-        export_agent_context(all_specs, out)
+        written = export_agent_context(all_specs, out)
+    elif fmt == "snapshot":
+        from agentspec.snapshot import write_snapshot
+
+        written = write_snapshot(all_specs, out)
+    elif fmt == "jsonl":
+        writer = JsonLinesWriter(out)
+        writer.write(all_specs)
+        written = writer.close()
     else:
-        out = Path("agent_specs.md")
-        export_markdown(all_specs, out)
+        written = export_markdown(all_specs, out)
 
-    print(f"✅ Extracted {len(all_specs)} specs → {out}")
+    print(f"✅ Extracted {len(all_specs)} specs → {out}" + ("" if written else " (unchanged)"))
     return 0
@@ -3,14 +3,17 @@
 Auto-generate verbose agentspec docstrings using Claude.
 """
 import ast
+import io
 import sys
 import json
 import os
 import re
 from pathlib import Path
-from typing import Dict, Any
-from agentspec.utils import collect_python_files, load_env_from_dotenv
+from typing import Dict, Any, Sequence
+from agentspec.parsed import ParsedModule, parse_file, parse_source
+from agentspec.utils import expand_targets, iter_target_files, load_env_from_dotenv
 from agentspec.collect import collect_metadata
+from agentspec.callgraph import build_for_targets
 def _get_client():
     """
     ---agentspec
@@ -215,7 +218,7 @@ Important:
 - Be comprehensive and specific.
 """
 
-def extract_function_info(filepath: Path, require_agentspec: bool = False, update_existing: bool = False) -> list[tuple[int, str, str]]:
+def extract_function_info(filepath: Path, require_agentspec: bool = False, update_existing: bool = False, module: ParsedModule | None = None) -> list[tuple[int, str, str]]:
     '''
     ---agentspec
     what: |
@@ -332,30 +335,23 @@ def extract_function_info(filepath: Path, require_agentspec: bool = False, updat
           - "- 2025-10-29: Add auto-generator for verbose agentspec docstrings using Claude API"
         ---/agentspec
     '''
-    with open(filepath, 'r') as f:
-        source = f.read()
-    
-    tree = ast.parse(source)
+    if module is None:
+        module = parse_file(filepath)
     functions = []
     
-    for node in ast.walk(tree):
-        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-            # PROGRAMMATIC: update_existing flag bypasses skip logic
-            if update_existing:
-                needs = True  # Force processing ALL functions
+    for node in module.functions():
+        # PROGRAMMATIC: update_existing flag bypasses skip logic
+        if update_existing:
+            needs = True  # Force processing ALL functions
+        else:
+            # Normal check if needs docstring
+            existing = ast.get_docstring(node)
+            if require_agentspec:
+                needs = (not existing) or ("---agentspec" not in existing)
             else:
-                # Normal check if needs docstring
-                existing = ast.get_docstring(node)
-                if require_agentspec:
-                    needs = (not existing) or ("---agentspec" not in existing)
-                else:
-                    needs = (not existing) or (len(existing.split('\n')) < 5)
-            if needs:
-                # Get source code
-                lines = source.split('\n')
-                func_lines = lines[node.lineno - 1:node.end_lineno]
-                code = '\n'.join(func_lines)
-                functions.append((node.lineno, node.name, code))
+                needs = (not existing) or (len(existing.split('\n')) < 5)
+        if needs:
+            functions.append((node.lineno, node.name, module.segment(node)))
     
     # Sort by line number DESCENDING (bottom to top)
     # This way inserting docstrings doesn't invalidate later line numbers
@@ -447,6 +443,10 @@ def inject_deterministic_metadata(llm_output: str, metadata: Dict[str, Any], as_
             deps_yaml += "      calls:\n"
             for call in deps_data['calls']:
                 deps_yaml += f"        - {call}\n"
+        if deps_data.get('called_by'):
+            deps_yaml += "      called_by:\n"
+            for caller in deps_data['called_by']:
+                deps_yaml += f"        - {caller}\n"
         if deps_data.get('imports'):
             deps_yaml += "      imports:\n"
             for imp in deps_data['imports']:
@@ -535,6 +535,8 @@ def inject_deterministic_metadata(llm_output: str, metadata: Dict[str, Any], as_
         deps_text = "DEPENDENCIES (from code analysis):\n"
         if deps_data.get('calls'):
             deps_text += "Calls: " + ", ".join(deps_data['calls']) + "\n"
+        if deps_data.get('called_by'):
+            deps_text += "Called by: " + ", ".join(deps_data['called_by']) + "\n"
         if deps_data.get('imports'):
             deps_text += "Imports: " + ", ".join(deps_data['imports']) + "\n"
 
@@ -1164,8 +1166,16 @@ def insert_docstring_at_line(filepath: Path, lineno: int, func_name: str, docstr
     -        self.generic_visit(node)
 
     """
-    with open(filepath, 'r') as f:
-        lines = f.readlines()
+    # Parse through the shared memo: the caller usually parsed this exact text already
+    try:
+        module = parse_file(filepath)
+        # readlines splits on '\n' only, matching the AST's line numbering; str.splitlines
+        # would also break on form feeds and Unicode separators.
+        lines = io.StringIO(module.source).readlines()
+    except SyntaxError:
+        module = None
+        with open(filepath, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
 
     # Find the function definition line more robustly using the function name,
     # falling back to the provided line number if not found.
@@ -1186,16 +1196,10 @@ def insert_docstring_at_line(filepath: Path, lineno: int, func_name: str, docstr
     target = None
 
     try:
-        import ast
-        src = ''.join(lines)
-        tree = ast.parse(src)
-        candidates = []
-        for node in ast.walk(tree):
-            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == func_name:
-                candidates.append(node)
+        if module is None:
+            raise SyntaxError(f"cannot parse {filepath}")
         # Choose the closest by lineno to the provided lineno if multiple
-        if candidates:
-            target = min(candidates, key=lambda n: abs((n.lineno or 0) - lineno))
+        target = module.find_function(func_name, near_lineno=lineno)
 
         # ROBUST: Check for and delete existing docstring using AST
         if target and target.body:
@@ -1340,37 +1344,23 @@ def insert_docstring_at_line(filepath: Path, lineno: int, func_name: str, docstr
     # If requested, also add the context print after the docstring
     # (Handled above when building new_lines)
 
-    # Compile‑test the candidate to avoid leaving broken files
-    import tempfile, py_compile, os
-    tmp = None
+    # Compile‑test the candidate to avoid leaving broken files. The parse lands in
+    # the shared memo, so the next insertion into this version reuses it.
+    candidate_src = ''.join(candidate)
     try:
-        tmp_fd, tmp_path = tempfile.mkstemp(suffix='.py')
-        tmp = tmp_path
-        os.close(tmp_fd)
-        with open(tmp_path, 'w', encoding='utf-8') as tf:
-            tf.writelines(candidate)
-        py_compile.compile(tmp_path, doraise=True)
+        parsed = parse_source(candidate_src, filename=str(filepath))
+        if not parsed.compiles():
+            compile(parsed.tree, str(filepath), 'exec', dont_inherit=True)
     except Exception as e:
         print(f"⚠️  Syntax check failed inserting docstring for {func_name} in {filepath}: {e}. Skipping this function.")
-        try:
-            if tmp and os.path.exists(tmp):
-                os.remove(tmp)
-        except Exception:
-            pass
         return False
-    finally:
-        try:
-            if tmp and os.path.exists(tmp):
-                os.remove(tmp)
-        except Exception:
-            pass
 
     # Write back only after successful compile test
     with open(filepath, 'w', encoding='utf-8') as f:
-        f.writelines(candidate)
+        f.write(candidate_src)
     return True
 
-def process_file(filepath: Path, dry_run: bool = False, force_context: bool = False, model: str = "claude-haiku-4-5", as_agentspec_yaml: bool = False, base_url: str | None = None, provider: str | None = 'auto', update_existing: bool = False, terse: bool = False, diff_summary: bool = False):
+def process_file(filepath: Path, dry_run: bool = False, force_context: bool = False, model: str = "claude-haiku-4-5", as_agentspec_yaml: bool = False, base_url: str | None = None, provider: str | None = 'auto', update_existing: bool = False, terse: bool = False, diff_summary: bool = False, call_graph=None):
     '''
     ---agentspec
     what: |
@@ -1566,7 +1556,9 @@ def process_file(filepath: Path, dry_run: bool = False, force_context: bool = Fa
     print(f"\n📄 Processing {filepath}")
     
     try:
-        functions = extract_function_info(filepath, require_agentspec=as_agentspec_yaml, update_existing=update_existing)
+        # Parsed once here and shared with metadata collection for every function
+        module = parse_file(filepath)
+        functions = extract_function_info(filepath, require_agentspec=as_agentspec_yaml, update_existing=update_existing, module=module)
     except SyntaxError as e:
         print(f"  ❌ Syntax error in file: {e}")
         return
@@ -1600,7 +1592,8 @@ def process_file(filepath: Path, dry_run: bool = False, force_context: bool = Fa
             # Collect metadata privately, never passed to LLM
             try:
                 from agentspec.collect import collect_metadata
-                meta = collect_metadata(filepath, name) or {}
+                # Functions below this one were edited, but this one and the imports were not
+                meta = collect_metadata(filepath, name, module=module, call_graph=call_graph) or {}
             except Exception:
                 meta = {}
             from agentspec.insert_metadata import apply_docstring_with_metadata
@@ -1620,7 +1613,7 @@ def process_file(filepath: Path, dry_run: bool = False, force_context: bool = Fa
         except Exception as e:
             print(f"  ❌ Error processing {name}: {e}")
 
-def run(target: str, dry_run: bool = False, force_context: bool = False, model: str = "claude-haiku-4-5", as_agentspec_yaml: bool = False, provider: str | None = 'auto', base_url: str | None = None, update_existing: bool = False, terse: bool = False, diff_summary: bool = False) -> int:
+def run(target: str | Sequence[str], dry_run: bool = False, force_context: bool = False, model: str = "claude-haiku-4-5", as_agentspec_yaml: bool = False, provider: str | None = 'auto', base_url: str | None = None, update_existing: bool = False, terse: bool = False, diff_summary: bool = False, use_git: bool = True, ignore_engine: str = 'auto', use_cache: bool = True, files: Sequence[str] | None = None) -> int:
     '''
     ---agentspec
     what: |
@@ -1628,7 +1621,7 @@ def run(target: str, dry_run: bool = False, force_context: bool = False, model:
 
       Accepts a target path (file or directory). Performs provider auto-detection (Anthropic/OpenAI-compatible), validates API credentials before processing, and defaults to local Ollama (http://localhost:11434/v1) if OpenAI provider is selected without credentials.
 
-      Collects all Python files from target path using collect_python_files(), then iterates through each file, catching per-file exceptions to allow batch processing to continue despite individual failures. Dry-run mode prevents all file modifications and displays what would be processed. Returns 0 on success, 1 on credential validation failure or fatal errors.
+      Collects all Python files from the target paths (globs expanded) and any explicit `files` list via iter_target_files(), then iterates through each file, catching per-file exceptions to allow batch processing to continue despite individual failures. Dry-run mode prevents all file modifications and displays what would be processed. Returns 0 on success, 1 on credential validation failure or fatal errors.
 
       Inputs: target (str path), dry_run (bool), force_context (bool), model (str, defaults to "claude-haiku-4-5"), as_agentspec_yaml (bool), provider (str or None, defaults to 'auto'), base_url (str or None), update_existing (bool), terse (bool), diff_summary (bool).
 
@@ -1797,10 +1790,10 @@ def run(target: str, dry_run: bool = False, force_context: bool = False, model:
             # Default to local Ollama if neither is provided
             base_url = 'http://localhost:11434/v1'
     
-    path = Path(target)
+    targets = expand_targets(target)
     
-    if not path.exists():
-        print(f"❌ Error: Path does not exist: {target}")
+    for missing in (t for t in targets if not t.exists()):
+        print(f"❌ Error: Path does not exist: {missing}")
         return 1
     
     if dry_run:
@@ -1810,11 +1803,24 @@ def run(target: str, dry_run: bool = False, force_context: bool = False, model:
         print("🔄 UPDATE MODE - Regenerating existing docstrings\n")
 
     try:
-        files = collect_python_files(path)
-        for filepath in files:
+        discovered = sorted(
+            iter_target_files(
+                targets,
+                files=[Path(f) for f in files or ()],
+                use_git=use_git,
+                ignore_engine=ignore_engine,
+                use_cache=use_cache,
+            ),
+            key=str,
+        )
+        # Callers come from the whole repository, so deps.called_by is computed rather than left to the model
+        call_graph = None if dry_run else build_for_targets(
+            targets, use_git=use_git, ignore_engine=ignore_engine, use_cache=use_cache
+        )
+        for filepath in discovered:
             try:
                 # Standard mode
-                process_file(filepath, dry_run, force_context, model, as_agentspec_yaml, base_url, prov, update_existing, terse, diff_summary)
+                process_file(filepath, dry_run, force_context, model, as_agentspec_yaml, base_url, prov, update_existing, terse, diff_summary, call_graph=call_graph)
             except Exception as e:
                 print(f"❌ Error processing {filepath}: {e}")
 
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+agentspec.gitdiff
+-----------------
+Changed Python files and lines from git, for `--changed-since REF` and `--staged`.
+
+load_changes() asks git for a zero-context diff and keeps the new-side line
+numbers of every hunk. Commands then check only the definitions enclosing those
+lines (ParsedModule.defs_touching) and skip files outside the diff entirely.
+
+- --changed-since REF: working tree against the merge base of REF and HEAD (as
+  a PR diff shows it), plus untracked files, which count as changed throughout.
+- --staged: the index against HEAD, or against REF when both are given.
+"""
+from __future__ import annotations
+
+import codecs
+import os
+import re
+import subprocess
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence
+
+from agentspec.utils import _find_git_root
+
+_HUNK = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+
+
+class GitDiffError(RuntimeError):
+    """git could not produce the requested diff (not a repository, unknown ref, ...)."""
+
+
+@dataclass
+class ChangeSet:
+    """Changed .py files mapped to their changed new-side lines (None: the whole file is new)."""
+    base: str
+    lines: Dict[Path, Optional[FrozenSet[int]]] = field(default_factory=dict)
+
+    @property
+    def paths(self) -> List[Path]:
+        return list(self.lines)
+
+    def lines_for(self, path: Path) -> Optional[FrozenSet[int]]:
+        return self.lines.get(path)
+
+    def describe(self) -> str:
+        return f"Changed {self.base}: {len(self.lines)} Python files"
+
+
+def _git(repo_root: Path, *args: str) -> str:
+    try:
+        proc = subprocess.run(
+            ["git", "-C", str(repo_root), "-c", "core.quotePath=false", *args],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+    except OSError as e:
+        raise GitDiffError(f"could not run git: {e}") from e
+    if proc.returncode != 0:
+        message = proc.stderr.decode("utf-8", "replace").strip().splitlines()
+        raise GitDiffError(message[0] if message else f"git {args[0]} failed")
+    return proc.stdout.decode("utf-8", "surrogateescape")
+
+
+def _unquote(path: str) -> str:
+    """Undo git's C-style quoting of unusual paths in diff headers."""
+    if not (path.startswith('"') and path.endswith('"')):
+        return path
+    return codecs.escape_decode(path[1:-1].encode("utf-8", "surrogateescape"))[0].decode("utf-8", "surrogateescape")
+
+
+def parse_diff(text: str) -> Dict[str, FrozenSet[int]]:
+    """Map each new-side path in a `git diff -U0` to the line numbers its hunks touch."""
+    touched: Dict[str, set] = {}
+    current: Optional[str] = None
+    in_header = False  # "+++ " only names a file between "diff --git" and the first hunk
+    for line in text.splitlines():
+        if line.startswith("diff --git "):
+            in_header, current = True, None
+            continue
+        if in_header and line.startswith("+++ "):
+            target = _unquote(line[4:].rstrip("\t"))
+            current = None if target == "/dev/null" else target[2:] if target.startswith("b/") else target
+            if current is not None:
+                touched.setdefault(current, set())
+            continue
+        match = _HUNK.match(line) if current is not None else None
+        if match:
+            in_header = False
+            start, count = int(match.group(1)), int(match.group(2) or 1)
+            if count:
+                touched[current].update(range(start, start + count))
+            else:
+                # Pure deletion: git reports the line after which lines went away
+                touched[current].add(max(start, 1))
+    return {path: frozenset(lines) for path, lines in touched.items()}
+
+
+def _display_path(path: Path) -> Path:
+    """Relative to the working directory when inside it, like discovered paths are."""
+    try:
+        return Path(os.path.relpath(path)) if path.is_relative_to(Path.cwd()) else path
+    except ValueError:
+        return path
+
+
+def load_changes(
+    targets: Sequence[Path],
+    files: Iterable[Path] = (),
+    since: Optional[str] = None,
+    staged: bool = False,
+) -> ChangeSet:
+    """
+    Changed .py files (and lines) inside `targets` or `files`.
+
+    Raises GitDiffError when the targets are not in a git work tree or git rejects the ref.
+    """
+    scope = [Path(p).resolve() for p in [*targets, *files]]
+    anchor = scope[0] if scope else Path.cwd()
+    repo_root = _find_git_root(anchor if anchor.exists() else Path.cwd())
+    if repo_root is None:
+        raise GitDiffError(f"{anchor} is not inside a git repository")
+
+    base = since
+    label = "in the index" if staged else "in the working tree"
+    if since is not None:
+        try:
+            base = _git(repo_root, "merge-base", since, "HEAD").strip() or since
+        except GitDiffError:
+            try:
+                _git(repo_root, "rev-parse", "--verify", "--quiet", f"{since}^{{commit}}")
+            except GitDiffError:
+                raise GitDiffError(f"unknown revision {since!r}") from None
+        label += f" since {since}" + (f" (merge base {base[:10]})" if base != since else "")
+
+    args = ["diff", "-U0", "--no-color", "--no-ext-diff", "-M", "--diff-filter=ACMR"]
+    if staged:
+        args.append("--cached")
+    if base is not None:
+        args.append(base)
+    touched: Dict[str, Optional[FrozenSet[int]]] = dict(parse_diff(_git(repo_root, *args, "--", "*.py")))
+    if not staged:
+        others = _git(repo_root, "ls-files", "-z", "--others", "--exclude-standard", "--", "*.py")
+        touched.update((rel, None) for rel in others.split("\0") if rel)
+
+    changes = ChangeSet(base=label)
+    for rel, lines in sorted(touched.items()):
+        path = (repo_root / rel).resolve()
+        if not path.is_file():
+            continue
+        if scope and not any(path == s or s in path.parents for s in scope):
+            continue
+        changes.lines[_display_path(path)] = lines
+    return changes
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+agentspec.gitignore
+-------------------
+Pure-Python gitignore engine used when spawning `git` is slow or impossible.
+
+Reads ignore rules the way git does, without a subprocess:
+- `.gitignore` in the repo root and every nested directory (deeper files win)
+- `.git/info/exclude`
+- `core.excludesFile` from the repo/global git config (default
+  `$XDG_CONFIG_HOME/git/ignore`)
+
+Within one file the last matching rule wins, `!pattern` re-includes, a trailing
+`/` limits a rule to directories, and nothing below an ignored directory can be
+re-included.
+
+Known difference from `git check-ignore`: the index is not read, so tracked
+files that match an ignore rule are reported as ignored (git skips them).
+"""
+from __future__ import annotations
+
+import os
+import re
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from agentspec.utils import _translate_pattern
+
+IGNORE_ENGINES = ("auto", "git", "native")
+
+# (compiled regex, dir_only, negate)
+Rule = Tuple["re.Pattern[str]", bool, bool]
+
+
+def _compile_rules(lines: Iterable[str]) -> List[Rule]:
+    rules: List[Rule] = []
+    for line in lines:
+        translated = _translate_pattern(line.rstrip("\n"))
+        if translated:
+            body, dir_only, negate = translated
+            rules.append((re.compile(body + r"\Z"), dir_only, negate))
+    return rules
+
+
+def _read_rules(path: Path) -> List[Rule]:
+    try:
+        return _compile_rules(path.read_text(encoding="utf-8", errors="ignore").splitlines())
+    except OSError:
+        return []
+
+
+def _git_dir(repo_root: Path) -> Path:
+    """Return the git dir, following a `gitdir:` pointer file (worktrees, submodules)."""
+    dot_git = repo_root / ".git"
+    if dot_git.is_file():
+        try:
+            text = dot_git.read_text(encoding="utf-8").strip()
+        except OSError:
+            return dot_git
+        if text.startswith("gitdir:"):
+            target = Path(text[len("gitdir:"):].strip())
+            return target if target.is_absolute() else (repo_root / target)
+    return dot_git
+
+
+def _config_excludes_file(config_path: Path) -> Optional[str]:
+    """Extract core.excludesFile from one git config file (minimal INI parsing)."""
+    try:
+        text = config_path.read_text(encoding="utf-8", errors="ignore")
+    except OSError:
+        return None
+    section = ""
+    value: Optional[str] = None
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line or line[0] in "#;":
+            continue
+        if line.startswith("["):
+            name = line.strip("[]").strip()
+            section = name.split()[0].lower() if name else ""
+            continue
+        if section != "core" or "=" not in line:
+            continue
+        key, val = line.split("=", 1)
+        if key.strip().lower() == "excludesfile":
+            val = val.strip()
+            if len(val) >= 2 and val[0] == val[-1] == '"':
+                val = val[1:-1]
+            value = val
+    return value
+
+
+def _global_excludes_path(repo_root: Path) -> Optional[Path]:
+    """Resolve core.excludesFile with git's precedence (repo config over global over XDG default)."""
+    xdg = Path(os.environ.get("XDG_CONFIG_HOME") or Path.home() / ".config")
+    for cfg in (_git_dir(repo_root) / "config", Path.home() / ".gitconfig", xdg / "git" / "config"):
+        value = _config_excludes_file(cfg)
+        if value:
+            return Path(os.path.expanduser(value))
+    return xdg / "git" / "ignore"
+
+
+class GitignoreEngine:
+    """
+    Native replacement for `git check-ignore` over one repository.
+
+    Exposes the same query(rels) -> ignored-subset interface as
+    agentspec.utils.GitCheckIgnore. Per-directory .gitignore files are loaded
+    lazily and cached, as are the ignore decisions for parent directories, so
+    checking many files in the same tree reads each ignore file once.
+    """
+
+    def __init__(self, repo_root: Path):
+        self.repo_root = repo_root
+        self._lock = threading.Lock()
+        self._dir_rules: Dict[str, List[Rule]] = {}
+        self._dir_ignored: Dict[str, bool] = {}
+        self._global_rules: List[List[Rule]] = []
+        self._global_rules.append(_read_rules(_git_dir(repo_root) / "info" / "exclude"))
+        excludes = _global_excludes_path(repo_root)
+        if excludes is not None:
+            self._global_rules.append(_read_rules(excludes))
+
+    def _rules_for_dir(self, rel_dir: str) -> List[Rule]:
+        rules = self._dir_rules.get(rel_dir)
+        if rules is None:
+            base = self.repo_root / rel_dir if rel_dir else self.repo_root
+            rules = _read_rules(base / ".gitignore")
+            self._dir_rules[rel_dir] = rules
+        return rules
+
+    @staticmethod
+    def _last_match(rules: List[Rule], rel: str, is_dir: Optional[bool], isdir) -> Optional[bool]:
+        for regex, dir_only, negate in reversed(rules):
+            if not regex.match(rel):
+                continue
+            if dir_only:
+                if is_dir is None:
+                    is_dir = isdir()
+                if not is_dir:
+                    continue
+            return not negate
+        return None
+
+    def match(self, rel: str, is_dir: Optional[bool] = None) -> bool:
+        """Decide `rel` from the rules alone, ignoring whether a parent directory is excluded."""
+        full = self.repo_root / rel
+        isdir = lambda: full.is_dir()  # noqa: E731 - stat only when a dir-only rule matches
+        parts = rel.split("/")
+        # Deepest .gitignore first: it has the highest precedence
+        for depth in range(len(parts) - 1, -1, -1):
+            rel_dir = "/".join(parts[:depth])
+            rules = self._rules_for_dir(rel_dir)
+            if rules:
+                sub = "/".join(parts[depth:])
+                decided = self._last_match(rules, sub, is_dir, isdir)
+                if decided is not None:
+                    return decided
+        for rules in self._global_rules:
+            decided = self._last_match(rules, rel, is_dir, isdir)
+            if decided is not None:
+                return decided
+        return False
+
+    def is_ignored(self, rel: str, is_dir: Optional[bool] = None) -> bool:
+        """Return True if `rel` or any of its parent directories is ignored."""
+        with self._lock:
+            parts = rel.split("/")
+            for i in range(1, len(parts)):
+                parent = "/".join(parts[:i])
+                hit = self._dir_ignored.get(parent)
+                if hit is None:
+                    hit = self.match(parent, is_dir=True)
+                    self._dir_ignored[parent] = hit
+                if hit:
+                    return True
+            return self.match(rel, is_dir=is_dir)
+
+    def query(self, rels: List[str]) -> Set[str]:
+        """Return the subset of repo-relative `rels` that is ignored."""
+        return {rel for rel in rels if self.is_ignored(rel)}
+
+
+_ENGINES: Dict[Path, GitignoreEngine] = {}
+_ENGINES_LOCK = threading.Lock()
+
+
+def get_gitignore_engine(repo_root: Path) -> GitignoreEngine:
+    """Return the cached native engine for a repo root."""
+    with _ENGINES_LOCK:
+        engine = _ENGINES.get(repo_root)
+        if engine is None:
+            engine = GitignoreEngine(repo_root)
+            _ENGINES[repo_root] = engine
+        return engine
+
+
+def clear_gitignore_cache() -> None:
+    """Drop cached engines so edited ignore files are re-read (watch/daemon use)."""
+    with _ENGINES_LOCK:
+        _ENGINES.clear()
+
+
+def resolve_ignore_engine(engine: str) -> str:
+    """Map 'auto' to 'git' when a git executable is on PATH, else 'native'."""
+    if engine not in IGNORE_ENGINES:
+        raise ValueError(f"Unknown ignore engine: {engine!r} (expected one of {', '.join(IGNORE_ENGINES)})")
+    if engine == "auto":
+        return "git" if shutil.which("git") else "native"
+    return engine
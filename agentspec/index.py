@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+agentspec.index
+---------------
+`agentspec index build|search`: extracted specs in a SQLite database for indexed
+queries, instead of re-reading a JSON or markdown export for every question.
+
+Tables:
+
+- files(id, path, hash): one row per indexed file with its content hash
+- specs(id, file_id, name, lineno, what, why, deps, testing, performance, raw_block);
+  deps/testing/performance hold JSON
+- guardrails(spec_id, position, text), calls(spec_id, callee) from deps.calls,
+  changelog(spec_id, position, entry)
+- spec_text: FTS5 over name, what, why and guardrails (rowid = specs.id), when
+  the sqlite3 build has FTS5
+
+Rebuilds are incremental: files whose content hash matches the stored one are
+skipped, changed files have their rows replaced, and files no longer found under
+the targets are dropped. A new agentspec version (or extraction code) rebuilds
+everything. Example query, functions calling subprocess.run with a guardrail
+mentioning PII:
+
+    SELECT f.path, s.lineno, s.name FROM specs s
+    JOIN files f ON f.id = s.file_id
+    JOIN calls c ON c.spec_id = s.id AND c.callee = 'subprocess.run'
+    JOIN spec_text ON spec_text.rowid = s.id
+    WHERE spec_text MATCH 'guardrails:PII'
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+try:
+    import sqlite3
+except ImportError:  # Python built without sqlite: `index` reports it instead of failing on import
+    sqlite3 = None  # type: ignore[assignment]
+
+from agentspec.cache import code_fingerprint
+from agentspec.extract import AgentSpec, ExtractJob, as_list, from_records
+from agentspec.pipeline import FileRun
+
+DEFAULT_DB = "agent_specs.db"
+SCHEMA = 1
+NO_SQLITE = "❌ Error: this Python was built without sqlite3; `agentspec index` needs it"
+
+_TABLES = """
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS specs (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id),
+    name TEXT NOT NULL,
+    lineno INTEGER NOT NULL,
+    what TEXT NOT NULL,
+    why TEXT NOT NULL,
+    deps TEXT NOT NULL,
+    testing TEXT NOT NULL,
+    performance TEXT NOT NULL,
+    raw_block TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS specs_file ON specs(file_id);
+CREATE INDEX IF NOT EXISTS specs_name ON specs(name);
+CREATE TABLE IF NOT EXISTS guardrails (spec_id INTEGER NOT NULL, position INTEGER NOT NULL, text TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS guardrails_spec ON guardrails(spec_id);
+CREATE TABLE IF NOT EXISTS calls (spec_id INTEGER NOT NULL, callee TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS calls_spec ON calls(spec_id);
+CREATE INDEX IF NOT EXISTS calls_callee ON calls(callee);
+CREATE TABLE IF NOT EXISTS changelog (spec_id INTEGER NOT NULL, position INTEGER NOT NULL, entry TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS changelog_spec ON changelog(spec_id);
+"""
+_FTS = "CREATE VIRTUAL TABLE IF NOT EXISTS spec_text USING fts5(name, what, why, guardrails)"
+
+
+def _text(value: Any) -> str:
+    return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, default=str)
+
+
+def _json(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+
+
+def content_hash(path: Path) -> Optional[str]:
+    try:
+        return hashlib.blake2b(path.read_bytes(), digest_size=20).hexdigest()
+    except OSError:
+        return None
+
+
+class SpecDatabase:
+    """
+    Connection to an index database, with the schema created and version-checked.
+    A `readonly` connection leaves the file untouched and never creates tables.
+    """
+
+    def __init__(self, path: Path, readonly: bool = False):
+        self.path = path
+        if readonly:
+            self.db = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+            row = self.db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'spec_text'")
+            self.fts = row.fetchone() is not None
+        else:
+            self.db = sqlite3.connect(str(path))
+            self.db.executescript(_TABLES)
+            try:
+                self.db.execute(_FTS)
+                self.fts = True
+            except sqlite3.OperationalError:  # sqlite3 built without FTS5: search falls back to LIKE
+                self.fts = False
+        self.version = f"{SCHEMA}|{code_fingerprint()}"
+        row = self.db.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+        self.current = row is not None and row[0] == self.version
+
+    def reset(self) -> None:
+        """Empty every table; different extraction code may produce different specs."""
+        with self.db:
+            for table in ("files", "specs", "guardrails", "calls", "changelog"):
+                self.db.execute(f"DELETE FROM {table}")
+            if self.fts:
+                self.db.execute("DELETE FROM spec_text")
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (self.version,))
+        self.current = True
+
+    def stored_hashes(self) -> Dict[str, Tuple[int, str]]:
+        return {path: (file_id, digest) for file_id, path, digest in self.db.execute("SELECT id, path, hash FROM files")}
+
+    def drop_file(self, file_id: int) -> None:
+        spec_ids = [(row[0],) for row in self.db.execute("SELECT id FROM specs WHERE file_id = ?", (file_id,))]
+        for table in ("guardrails", "calls", "changelog"):
+            self.db.executemany(f"DELETE FROM {table} WHERE spec_id = ?", spec_ids)
+        if self.fts:
+            self.db.executemany("DELETE FROM spec_text WHERE rowid = ?", spec_ids)
+        self.db.execute("DELETE FROM specs WHERE file_id = ?", (file_id,))
+        self.db.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def add_file(self, path: str, digest: str, specs: List[AgentSpec]) -> None:
+        file_id = self.db.execute("INSERT INTO files (path, hash) VALUES (?, ?)", (path, digest)).lastrowid
+        for s in specs:
+            guardrails = as_list(s.guardrails)
+            spec_id = self.db.execute(
+                "INSERT INTO specs (file_id, name, lineno, what, why, deps, testing, performance, raw_block)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (file_id, s.name, s.lineno, s.what, s.why, _json(s.deps), _json(s.testing),
+                 _json(s.performance), s.raw_block),
+            ).lastrowid
+            self.db.executemany(
+                "INSERT INTO guardrails VALUES (?, ?, ?)", [(spec_id, i, _text(g)) for i, g in enumerate(guardrails)]
+            )
+            calls = s.deps.get("calls") if isinstance(s.deps, dict) else None
+            if isinstance(calls, list):
+                self.db.executemany("INSERT INTO calls VALUES (?, ?)", [(spec_id, _text(c)) for c in calls])
+            changelog = as_list(s.changelog)
+            self.db.executemany(
+                "INSERT INTO changelog VALUES (?, ?, ?)", [(spec_id, i, _text(e)) for i, e in enumerate(changelog)]
+            )
+            if self.fts:
+                self.db.execute(
+                    "INSERT INTO spec_text (rowid, name, what, why, guardrails) VALUES (?, ?, ?, ?, ?)",
+                    (spec_id, s.name, s.what, s.why, "\n".join(_text(g) for g in guardrails)),
+                )
+
+    def search(self, text: str, limit: int = 20) -> List[Tuple[str, int, str, str]]:
+        """(path, lineno, name, what) of specs matching `text`, best first; none for blank text."""
+        if not text.strip():
+            return []
+        if self.fts:
+            query = (
+                "SELECT f.path, s.lineno, s.name, s.what FROM spec_text"
+                " JOIN specs s ON s.id = spec_text.rowid JOIN files f ON f.id = s.file_id"
+                " WHERE spec_text MATCH ? ORDER BY bm25(spec_text, 8.0, 2.0, 1.0, 4.0) LIMIT ?"
+            )
+            # Words are matched as quoted terms so FTS5 operators in user text stay literal
+            terms = " ".join('"' + word.replace('"', '""') + '"' for word in text.split())
+            return list(self.db.execute(query, (terms, limit)))
+        pattern = f"%{text}%"
+        return list(self.db.execute(
+            "SELECT DISTINCT f.path, s.lineno, s.name, s.what FROM specs s JOIN files f ON f.id = s.file_id"
+            " LEFT JOIN guardrails g ON g.spec_id = s.id"
+            " WHERE s.name LIKE ? OR s.what LIKE ? OR s.why LIKE ? OR g.text LIKE ?"
+            " ORDER BY f.path, s.lineno LIMIT ?",
+            (pattern, pattern, pattern, pattern, limit),
+        ))
+
+    def close(self) -> None:
+        self.db.close()
+
+
+def build(
+    target: Union[str, Sequence[str]],
+    db_path: str = DEFAULT_DB,
+    verbose: bool = False,
+    use_git: bool = True,
+    ignore_engine: str = "auto",
+    use_cache: bool = True,
+    files: Optional[Sequence[str]] = None,
+    jobs: Optional[int] = None,
+) -> int:
+    """Create or incrementally update the index database for the targets."""
+    if sqlite3 is None:
+        print(NO_SQLITE)
+        return 1
+    started = time.perf_counter()
+    pipeline = FileRun.open(
+        target, files=files, use_git=use_git, ignore_engine=ignore_engine, use_cache=use_cache, jobs=jobs
+    )
+    if pipeline is None:
+        return 1
+    try:
+        database = SpecDatabase(Path(db_path))
+    except sqlite3.Error as e:
+        print(f"❌ Error: cannot open {db_path}: {e}")
+        return 1
+    if not database.current:
+        database.reset()
+    stored = database.stored_hashes()
+    seen: Dict[str, str] = {}
+    changed: List[Path] = []
+    for path in pipeline.discover():
+        digest = content_hash(path)
+        if digest is None:
+            continue
+        seen[str(path)] = digest
+        if stored.get(str(path), (None, None))[1] != digest:
+            changed.append(path)
+
+    removed = [file_id for path, (file_id, _) in stored.items() if path not in seen]
+    specs_written = 0
+    with database.db:
+        for file_id in removed:
+            database.drop_file(file_id)
+        for file, (error, records) in pipeline.map(ExtractJob(), changed):
+            if error is not None:
+                print(f"Warning: Could not parse {file}: {error}")
+                records = []
+            if str(file) in stored:
+                database.drop_file(stored[str(file)][0])
+            database.add_file(str(file), seen[str(file)], from_records(file, records))
+            specs_written += len(records)
+    total = database.db.execute("SELECT COUNT(*) FROM specs").fetchone()[0]
+    fts = database.fts
+    database.close()
+    pipeline.close(verbose)
+    if verbose and not fts:
+        print("⚠️  sqlite3 has no FTS5: full-text table skipped, search uses LIKE")
+    print(
+        f"✅ Indexed {total} specs from {len(seen)} files → {db_path} "
+        f"({len(changed)} updated, {len(removed)} removed, {len(seen) - len(changed)} unchanged; "
+        f"{time.perf_counter() - started:.2f}s)"
+    )
+    return 0
+
+
+def search(text: str, db_path: str = DEFAULT_DB, limit: int = 20) -> int:
+    """Print specs matching `text` from an index built by `agentspec index build`."""
+    if sqlite3 is None:
+        print(NO_SQLITE)
+        return 1
+    if not Path(db_path).exists():
+        print(f"❌ Error: {db_path} not found; run `agentspec index build` first")
+        return 1
+    if not text.strip():
+        print("❌ Error: Empty search text")
+        return 1
+    # Read-only: searching must not create tables in (or otherwise write to) the file
+    try:
+        database = SpecDatabase(Path(db_path), readonly=True)
+    except sqlite3.Error as e:
+        print(f"❌ Error: cannot open {db_path}: {e}")
+        return 1
+    try:
+        if not database.current:
+            print(f"⚠️  {db_path} was built by another agentspec version; rebuild it for current results")
+        rows = database.search(text, limit)
+    except sqlite3.Error as e:
+        print(f"❌ Error: cannot search {db_path}: {e}")
+        return 1
+    finally:
+        database.close()
+    if not rows:
+        print("⚠️  No matching specs")
+        return 1
+    for path, lineno, name, what in rows:
+        summary = what.strip().splitlines()[0] if what.strip() else ""
+        print(f"{path}:{lineno}  {name}  {summary}")
+    return 0
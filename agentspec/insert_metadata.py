@@ -4,7 +4,7 @@ apply deterministic metadata after LLM generation using a safe, two‑phase file
 
 This module NEVER calls an LLM. It only takes narrative docstrings and appends
 deterministic metadata (deps/changelog) programmatically, verifying syntax after
-each phase using py_compile before replacing the target file atomically.
+each phase (parse + compile) before replacing the target file atomically.
 """
 from __future__ import annotations
 
@@ -12,13 +12,14 @@ from pathlib import Path
 from typing import Dict, Any, Optional
 import os
 import tempfile
-import py_compile
+
+from agentspec.parsed import parse_file
 
 
 def _compile_ok(path: Path) -> bool:
+    # insert_docstring_at_line already parsed and compiled this exact text; the memo makes this a lookup
     try:
-        py_compile.compile(str(path), doraise=True)
-        return True
+        return parse_file(path).compiles()
     except Exception:
         return False
 
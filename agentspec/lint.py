@@ -10,8 +10,11 @@ import ast
 import sys
 import yaml
 from pathlib import Path
-from agentspec.utils import collect_python_files
-from typing import List, Tuple, Dict, Any
+from agentspec.cache import ResultCache, node_key, result_key
+from agentspec.parsed import parse_file
+from agentspec.pipeline import FileJob, FileRun
+from agentspec.yamlio import load_block
+from typing import List, Tuple, Dict, Any, Collection, Optional, Sequence, Set, Union
 
 
 REQUIRED_KEYS = ["what", "deps", "why", "guardrails"]
@@ -81,6 +84,10 @@ class AgentSpecLinter(ast.NodeVisitor):
         self.errors: List[Tuple[int, str]] = []
         self.warnings: List[Tuple[int, str]] = []
         self.min_lines = min_lines
+        # Line numbers of the definitions to check (incremental runs); None checks all
+        self.only: Optional[Set[int]] = None
+        # Per-definition results by node_key, so unchanged docstrings are not re-validated
+        self.node_cache: Optional[ResultCache] = None
 
     def visit_FunctionDef(self, node):
         """
@@ -296,7 +303,30 @@ class AgentSpecLinter(ast.NodeVisitor):
               - "- no git history available"
             ---/agentspec
         """
-        doc = ast.get_docstring(node)
+        self.check_doc(node, ast.get_docstring(node))
+
+    def check_doc(self, node, doc: Optional[str]):
+        """_check_docstring with the docstring already looked up (shared with extraction by `check`)."""
+        if self.only is not None and node.lineno not in self.only:
+            return
+        if not doc or self.node_cache is None:
+            self._validate_doc(node, doc)
+            return
+        key = node_key("lint", node, doc, self.min_lines)
+        hit = self.node_cache.get_node(key)
+        if hit is not None:
+            self.errors.extend((node.lineno, msg) for msg in hit["errors"])
+            self.warnings.extend((node.lineno, msg) for msg in hit["warnings"])
+            return
+        first_error, first_warning = len(self.errors), len(self.warnings)
+        self._validate_doc(node, doc)
+        # Every finding is reported at node.lineno, so only the messages are stored
+        self.node_cache.put(key, "lint-node", {
+            "errors": [msg for _, msg in self.errors[first_error:]],
+            "warnings": [msg for _, msg in self.warnings[first_warning:]],
+        })
+
+    def _validate_doc(self, node, doc: Optional[str]):
         if not doc:
             self.errors.append((node.lineno, f"❌ {node.name} missing docstring"))
             return
@@ -321,7 +351,7 @@ class AgentSpecLinter(ast.NodeVisitor):
 
         # Try to parse as YAML
         try:
-            spec_data = yaml.safe_load(fenced)
+            spec_data = load_block(fenced)
             if not isinstance(spec_data, dict):
                 self.errors.append(
                     (node.lineno, f"❌ {node.name} agentspec is not valid YAML dict")
@@ -426,7 +456,12 @@ class AgentSpecLinter(ast.NodeVisitor):
         return self.errors, self.warnings
 
 
-def check_file(filepath: Path, min_lines: int = 10) -> Tuple[List[Tuple[int, str]], List[Tuple[int, str]]]:
+def check_file(
+    filepath: Path,
+    min_lines: int = 10,
+    lines: Optional[Collection[int]] = None,
+    cache: Optional[ResultCache] = None,
+) -> Tuple[List[Tuple[int, str]], List[Tuple[int, str]]]:
     '''
     ---agentspec
     what: |
@@ -503,10 +538,12 @@ def check_file(filepath: Path, min_lines: int = 10) -> Tuple[List[Tuple[int, str
         ---/agentspec
     '''
     try:
-        src = filepath.read_text(encoding="utf-8")
-        tree = ast.parse(src, filename=str(filepath))
+        module = parse_file(filepath)
         checker = AgentSpecLinter(str(filepath), min_lines=min_lines)
-        checker.visit(tree)
+        checker.node_cache = cache
+        if lines is not None:
+            checker.only = {node.lineno for node in module.defs_touching(lines)}
+        checker.visit(module.tree)
         return checker.check()
     except SyntaxError as e:
         return [(e.lineno or 0, f"Syntax error: {e}")], []
@@ -514,7 +551,88 @@ def check_file(filepath: Path, min_lines: int = 10) -> Tuple[List[Tuple[int, str
         return [(0, f"Error parsing {filepath}: {e}")], []
 
 
-def run(target: str, min_lines: int = 10, strict: bool = False) -> int:
+# Findings that describe a failed read/parse rather than the file's specs are not cached
+_UNCACHEABLE = ("Syntax error:", "Error parsing ")
+
+
+def _lint_key(filepath: Path, min_lines: int, lines: Optional[Collection[int]] = None) -> Optional[str]:
+    try:
+        return LintJob(min_lines).keys(filepath.read_bytes(), lines)[0]
+    except OSError:
+        return None
+
+
+def decode_lint(hit: Dict[str, Any]) -> Tuple[List[Tuple[int, str]], List[Tuple[int, str]]]:
+    """(errors, warnings) from a cached "lint" entry."""
+    return [tuple(e) for e in hit["errors"]], [tuple(w) for w in hit["warnings"]]
+
+
+def store_lint(
+    cache: ResultCache, key: str, errors: List[Tuple[int, str]], warnings: List[Tuple[int, str]]
+) -> None:
+    """Cache a file's findings, unless they only report that it could not be read or parsed."""
+    if not any(msg.startswith(_UNCACHEABLE) for _, msg in errors):
+        cache.put(key, "lint", {"errors": errors, "warnings": warnings})
+
+
+def check_file_cached(
+    filepath: Path, min_lines: int = 10, cache: Optional[ResultCache] = None
+) -> Tuple[List[Tuple[int, str]], List[Tuple[int, str]]]:
+    """check_file served from the content-hash result cache when the file is unchanged."""
+    key = _lint_key(filepath, min_lines) if cache is not None else None
+    if key is None:
+        return check_file(filepath, min_lines=min_lines)
+    hit = cache.get(key)
+    if hit is not None:
+        return decode_lint(hit)
+    errors, warnings = check_file(filepath, min_lines=min_lines, cache=cache)
+    store_lint(cache, key, errors, warnings)
+    return errors, warnings
+
+
+class LintJob(FileJob):
+    """check_file as a pipeline job, cached under one "lint" entry per file."""
+
+    def __init__(self, min_lines: int = 10):
+        self.min_lines = min_lines
+
+    def compute(self, path, lines=None, cache=None):
+        return check_file(path, min_lines=self.min_lines, lines=lines, cache=cache)
+
+    def keys(self, content, lines=None):
+        options = (self.min_lines,) if lines is None else (self.min_lines, sorted(lines))
+        return (result_key(content, "lint", *options),)
+
+    def decode(self, hits):
+        return decode_lint(hits[0])
+
+    def store(self, cache, keys, result):
+        store_lint(cache, keys[0], *result)
+
+
+def print_file_report(file: Path, errors: List[Tuple[int, str]], warnings: List[Tuple[int, str]]) -> None:
+    """Print one file's errors then warnings in the lint report format."""
+    print(f"\n{file}:")
+    for line, msg in errors:
+        print(f"  Line {line}: {msg}")
+    for line, msg in warnings:
+        print(f"  Line {line}: {msg}")
+
+
+def run(
+    target: Union[str, Sequence[str]],
+    min_lines: int = 10,
+    strict: bool = False,
+    verbose: bool = False,
+    use_git: bool = True,
+    ignore_engine: str = "auto",
+    use_cache: bool = True,
+    stream: bool = False,
+    files: Optional[Sequence[str]] = None,
+    jobs: Optional[int] = None,
+    changed_since: Optional[str] = None,
+    staged: bool = False,
+) -> int:
     '''
     ---agentspec
     what: |
@@ -563,28 +681,45 @@ def run(target: str, min_lines: int = 10, strict: bool = False) -> int:
           - "- 2025-10-29: Add agent spec linter for Python files"
         ---/agentspec
     '''
-    path = Path(target)
-    files = collect_python_files(path)
+    pipeline = FileRun.open(
+        target,
+        files=files,
+        changed_since=changed_since,
+        staged=staged,
+        use_git=use_git,
+        ignore_engine=ignore_engine,
+        use_cache=use_cache,
+        jobs=jobs,
+    )
+    if pipeline is None:
+        return 1
 
     total_errors = 0
     total_warnings = 0
-    
-    for file in files:
-        errors, warnings = check_file(file, min_lines=min_lines)
-        
+    pending: List[Tuple[Path, List[Tuple[int, str]], List[Tuple[int, str]]]] = []
+    # Lint files as discovery yields them; only the printing waits for sorting
+    for file, (errors, warnings) in pipeline.map(LintJob(min_lines)):
+        total_errors += len(errors)
+        total_warnings += len(warnings)
         if errors or warnings:
-            print(f"\n{file}:")
-            for line, msg in errors:
-                print(f"  Line {line}: {msg}")
-                total_errors += 1
-            for line, msg in warnings:
-                print(f"  Line {line}: {msg}")
-                total_warnings += 1
+            if stream:
+                print_file_report(file, errors, warnings)
+            else:
+                pending.append((file, errors, warnings))
+    pipeline.close(verbose)
+
+    pending.sort(key=lambda item: str(item[0]))
+    for file, errors, warnings in pending:
+        print_file_report(file, errors, warnings)
+    return print_summary(pipeline.stats.files, total_errors, total_warnings, strict)
+
 
+def print_summary(files: int, total_errors: int, total_warnings: int, strict: bool = False) -> int:
+    """Print the closing lint summary and return the lint exit code."""
     print(f"\n{'='*60}")
     if total_errors == 0 and (total_warnings == 0 or not strict):
         print("✅ All files have valid agent specs.")
-        print(f"   {len(files)} files checked, {total_warnings} warnings")
+        print(f"   {files} files checked, {total_warnings} warnings")
         return 0
     else:
         if strict and total_warnings > 0:
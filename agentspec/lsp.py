@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+agentspec.lsp
+-------------
+`agentspec lsp`: a Language Server (stdio, JSON-RPC with Content-Length framing)
+publishing agentspec lint findings as diagnostics while you type.
+
+- Open documents are kept in memory and updated from incremental
+  `textDocument/didChange` edits, so nothing is read from disk.
+- Each document remembers the findings of every definition by node_key (the
+  per-definition fingerprint the result cache uses). After an edit only the
+  docstrings whose text changed are re-validated; the rest are reused.
+- `textDocument/hover` shows the parsed AgentSpec of the innermost function
+  or class enclosing the cursor.
+
+Client options (initializationOptions): {"minLines": 10}.
+"""
+from __future__ import annotations
+
+import ast
+import json
+import sys
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+from urllib.request import url2pathname
+
+from agentspec.extract import AgentSpec, AgentSpecExtractor
+from agentspec.lint import AgentSpecLinter
+from agentspec.parsed import ParsedModule, parse_source
+
+# JSON-RPC / LSP constants
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INTERNAL_ERROR = -32603
+SEVERITY_ERROR = 1
+SEVERITY_WARNING = 2
+SYNC_INCREMENTAL = 2
+
+
+def read_message(stream: BinaryIO) -> Optional[Dict[str, Any]]:
+    """Read one framed JSON-RPC message; None at end of stream."""
+    length = None
+    while True:
+        line = stream.readline()
+        if not line:
+            return None
+        line = line.strip()
+        if not line:
+            break
+        name, _, value = line.decode("ascii", "replace").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value.strip())
+    if length is None:
+        raise ValueError("message without Content-Length header")
+    body = stream.read(length)
+    if len(body) < length:
+        return None
+    return json.loads(body.decode("utf-8"))
+
+
+def write_message(stream: BinaryIO, message: Dict[str, Any]) -> None:
+    """Frame and write one JSON-RPC message."""
+    body = json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    stream.write(f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body)
+    stream.flush()
+
+
+def _utf16_index(line: str, units: int) -> int:
+    """Index into `line` of an LSP character position (UTF-16 code units)."""
+    if line.isascii():
+        return min(units, len(line))
+    seen = 0
+    for i, ch in enumerate(line):
+        if seen >= units:
+            return i
+        seen += 2 if ord(ch) > 0xFFFF else 1
+    return len(line)
+
+
+def _utf16_len(line: str) -> int:
+    return len(line) if line.isascii() else len(line.encode("utf-16-le")) // 2
+
+
+def position_to_offset(text: str, position: Dict[str, int]) -> int:
+    """Offset into `text` of an LSP {line, character} position, clamped to the text."""
+    start = 0
+    for _ in range(position["line"]):
+        newline = text.find("\n", start)
+        if newline < 0:
+            return len(text)
+        start = newline + 1
+    end = text.find("\n", start)
+    end = len(text) if end < 0 else end
+    return start + _utf16_index(text[start:end], position["character"])
+
+
+def apply_change(text: str, change: Dict[str, Any]) -> str:
+    """Apply one TextDocumentContentChangeEvent (ranged edit or full replacement)."""
+    if "range" not in change:
+        return change["text"]
+    start = position_to_offset(text, change["range"]["start"])
+    end = position_to_offset(text, change["range"]["end"])
+    return text[:start] + change["text"] + text[end:]
+
+
+def uri_to_path(uri: str) -> str:
+    parsed = urlparse(uri)
+    if parsed.scheme != "file":
+        return uri
+    return url2pathname(unquote(parsed.path))
+
+
+class _DefinitionMemo:
+    """
+    Per-document stand-in for ResultCache's per-definition entries
+    (get_node/put), kept in memory. Entries not used by the latest lint pass
+    are dropped, so the memo tracks the document rather than its history.
+    """
+
+    def __init__(self):
+        self.entries: Dict[str, Any] = {}
+        self.used: Dict[str, Any] = {}
+        self.misses = 0
+
+    def get_node(self, key: str) -> Any:
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.used[key] = value
+        return value
+
+    def put(self, key: str, kind: str, value: Any) -> None:
+        self.used[key] = value
+
+    def rotate(self) -> None:
+        self.entries, self.used = self.used, {}
+
+
+class Document:
+    """An open text document: its text, last good parse and last published diagnostics."""
+
+    def __init__(self, uri: str, text: str, version: Optional[int] = None):
+        self.uri = uri
+        self.path = uri_to_path(uri)
+        self.text = text
+        self.version = version
+        self.module: Optional[ParsedModule] = None
+        self.memo = _DefinitionMemo()
+        self.diagnostics: List[Dict[str, Any]] = []
+
+
+def _line_range(text_lines: List[str], lineno: int) -> Dict[str, Any]:
+    """Range covering the non-blank part of a 1-based line (line 1 when out of range)."""
+    index = max(lineno, 1) - 1
+    line = text_lines[index] if index < len(text_lines) else ""
+    indent = len(line) - len(line.lstrip())
+    return {
+        "start": {"line": index, "character": indent},
+        "end": {"line": index, "character": _utf16_len(line.rstrip("\r"))},
+    }
+
+
+def _strip_marker(message: str) -> str:
+    """Drop the report's ❌/⚠️ prefix; the diagnostic severity carries it."""
+    for marker in ("❌ ", "⚠️ "):
+        if message.startswith(marker):
+            return message[len(marker):].lstrip()
+    return message
+
+
+def lint_document(doc: Document, min_lines: int = 10) -> List[Dict[str, Any]]:
+    """
+    Lint the document text and return LSP diagnostics.
+
+    While the text does not parse (mid-edit), the last diagnostics are kept and a
+    syntax-error diagnostic is added, instead of clearing everything.
+    """
+    lines = doc.text.split("\n")
+    try:
+        module = parse_source(doc.text, filename=doc.path)
+    except SyntaxError as e:
+        syntax = {
+            "range": _line_range(lines, e.lineno or 1),
+            "severity": SEVERITY_ERROR,
+            "source": "agentspec",
+            "message": f"Syntax error: {e.msg}",
+        }
+        return [d for d in doc.diagnostics if not d["message"].startswith("Syntax error:")] + [syntax]
+    doc.module = module
+    linter = AgentSpecLinter(doc.path, min_lines=min_lines)
+    linter.node_cache = doc.memo
+    linter.visit(module.tree)
+    doc.memo.rotate()
+    errors, warnings = linter.check()
+    diagnostics = []
+    for severity, findings in ((SEVERITY_ERROR, errors), (SEVERITY_WARNING, warnings)):
+        for lineno, message in findings:
+            diagnostics.append({
+                "range": _line_range(lines, lineno),
+                "severity": severity,
+                "source": "agentspec",
+                "message": _strip_marker(message),
+            })
+    diagnostics.sort(key=lambda d: (d["range"]["start"]["line"], d["severity"]))
+    return diagnostics
+
+
+def spec_at(doc: Document, line: int) -> Optional[Tuple[ast.AST, Optional[AgentSpec]]]:
+    """The innermost definition enclosing 0-based `line` and its parsed AgentSpec, if any."""
+    if doc.module is None:
+        return None
+    nodes = doc.module.defs_touching([line + 1])
+    if not nodes:
+        return None
+    node = nodes[0]
+    extractor = AgentSpecExtractor(doc.path)
+    extractor._build_spec(node, ast.get_docstring(node))
+    return node, (extractor.specs[0] if extractor.specs else None)
+
+
+def render_hover(node: ast.AST, spec: Optional[AgentSpec]) -> str:
+    """Markdown hover text for a definition's spec."""
+    kind = "class" if isinstance(node, ast.ClassDef) else "def"
+    parts = [f"**{kind} {node.name}**"]
+    if spec is None:
+        parts.append("_No docstring._")
+        return "\n\n".join(parts)
+    if not spec.parsed_data:
+        parts.append("_No agentspec block._")
+    if spec.what:
+        parts.append(spec.what)
+    if spec.guardrails:
+        parts.append("**⚠️ Guardrails**\n\n" + "\n".join(f"- {g}" for g in spec.guardrails))
+    if isinstance(spec.deps, dict):
+        for key, title in (("calls", "Calls"), ("called_by", "Called by")):
+            if spec.deps.get(key):
+                parts.append(f"**{title}:** " + ", ".join(f"`{c}`" for c in spec.deps[key]))
+    if spec.why:
+        parts.append(f"**Why**\n\n{spec.why}")
+    return "\n\n".join(parts)
+
+
+class LanguageServer:
+    """Dispatch loop for one client connection over a pair of byte streams."""
+
+    def __init__(self, reader: BinaryIO, writer: BinaryIO, min_lines: int = 10):
+        self.reader = reader
+        self.writer = writer
+        self.min_lines = min_lines
+        self.documents: Dict[str, Document] = {}
+        self.shutdown_requested = False
+        self.handlers: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            "initialize": self.initialize,
+            "initialized": lambda params: None,
+            "shutdown": self.shutdown,
+            "textDocument/didOpen": self.did_open,
+            "textDocument/didChange": self.did_change,
+            "textDocument/didClose": self.did_close,
+            "textDocument/hover": self.hover,
+        }
+
+    def serve(self) -> int:
+        """Handle messages until `exit` or end of input; the exit code follows the LSP spec."""
+        while True:
+            try:
+                message = read_message(self.reader)
+            except ValueError as e:
+                self._send({"jsonrpc": "2.0", "id": None, "error": {"code": PARSE_ERROR, "message": str(e)}})
+                continue
+            if message is None:
+                return 0 if self.shutdown_requested else 1
+            if message.get("method") == "exit":
+                return 0 if self.shutdown_requested else 1
+            self._dispatch(message)
+
+    def _dispatch(self, message: Dict[str, Any]) -> None:
+        method = message.get("method")
+        request_id = message.get("id")
+        handler = self.handlers.get(method) if isinstance(method, str) else None
+        if handler is None:
+            # Unknown notifications (including $/ ones) are ignored; unknown requests are errors
+            if request_id is not None:
+                code = METHOD_NOT_FOUND if isinstance(method, str) else INVALID_REQUEST
+                self._send({"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": f"unsupported method: {method}"}})
+            return
+        try:
+            result = handler(message.get("params") or {})
+        except Exception as e:
+            if request_id is not None:
+                self._send({"jsonrpc": "2.0", "id": request_id, "error": {"code": INTERNAL_ERROR, "message": str(e)}})
+            return
+        if request_id is not None:
+            self._send({"jsonrpc": "2.0", "id": request_id, "result": result})
+
+    def _send(self, message: Dict[str, Any]) -> None:
+        write_message(self.writer, message)
+
+    def _publish(self, doc: Document) -> None:
+        doc.diagnostics = lint_document(doc, self.min_lines)
+        params: Dict[str, Any] = {"uri": doc.uri, "diagnostics": doc.diagnostics}
+        if doc.version is not None:
+            params["version"] = doc.version
+        self._send({"jsonrpc": "2.0", "method": "textDocument/publishDiagnostics", "params": params})
+
+    def initialize(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        from agentspec import __version__
+
+        options = params.get("initializationOptions") or {}
+        if isinstance(options.get("minLines"), int):
+            self.min_lines = options["minLines"]
+        return {
+            "capabilities": {
+                "textDocumentSync": {"openClose": True, "change": SYNC_INCREMENTAL},
+                "hoverProvider": True,
+            },
+            "serverInfo": {"name": "agentspec", "version": __version__},
+        }
+
+    def shutdown(self, params: Dict[str, Any]) -> None:
+        self.shutdown_requested = True
+        return None
+
+    def did_open(self, params: Dict[str, Any]) -> None:
+        item = params["textDocument"]
+        doc = Document(item["uri"], item["text"], item.get("version"))
+        self.documents[doc.uri] = doc
+        self._publish(doc)
+
+    def did_change(self, params: Dict[str, Any]) -> None:
+        identifier = params["textDocument"]
+        doc = self.documents.get(identifier["uri"])
+        if doc is None:
+            return
+        for change in params.get("contentChanges", []):
+            doc.text = apply_change(doc.text, change)
+        doc.version = identifier.get("version", doc.version)
+        self._publish(doc)
+
+    def did_close(self, params: Dict[str, Any]) -> None:
+        uri = params["textDocument"]["uri"]
+        self.documents.pop(uri, None)
+        self._send({"jsonrpc": "2.0", "method": "textDocument/publishDiagnostics", "params": {"uri": uri, "diagnostics": []}})
+
+    def hover(self, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        doc = self.documents.get(params["textDocument"]["uri"])
+        if doc is None:
+            return None
+        found = spec_at(doc, params["position"]["line"])
+        if found is None:
+            return None
+        node, spec = found
+        return {"contents": {"kind": "markdown", "value": render_hover(node, spec)}}
+
+
+def run(min_lines: int = 10) -> int:
+    """Serve one client on stdin/stdout."""
+    return LanguageServer(sys.stdin.buffer, sys.stdout.buffer, min_lines=min_lines).serve()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+agentspec.pack
+--------------
+Token-budgeted agent context: `extract --format agent-context --token-budget N`.
+
+Every spec gets a relevance score from the signals a spec already carries:
+
+- guardrails: how many it has (capped, so one long list does not win alone)
+- fan-in: callers in deps.called_by, or specs naming it in deps.calls
+- recency: newest changelog date, decaying with age relative to the newest
+  date in the export (not the clock, so the same tree packs the same way)
+- focus: specs under a `--focus` path rank above everything else
+
+Specs are taken best first. They keep the full agent-context section while
+it fits the budget. From the first spec that does not fit on, specs get a
+compact section (name, first paragraph of `what`, guardrails). Specs that do
+not fit even compact are left out and counted in the header.
+
+Token counts are an offline estimate, about 4 bytes of UTF-8 per token. That
+is close for English prose and code, and costs nothing to compute.
+"""
+from __future__ import annotations
+
+import math
+import re
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from agentspec.extract import AgentSpec, agent_context_section, as_list, render_agent_context
+
+BYTES_PER_TOKEN = 4
+WEIGHTS = {"guardrails": 1.0, "fan_in": 2.0, "recency": 3.0, "focus": 100.0}
+MAX_GUARDRAILS_SCORED = 10
+RECENCY_HALF_LIFE_DAYS = 90
+COMPACT_WHAT_CHARS = 300
+
+_DATE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of `text` (UTF-8 bytes / 4, rounded up)."""
+    return -(-len(text.encode("utf-8")) // BYTES_PER_TOKEN)
+
+
+@dataclass
+class PackStats:
+    """How a budget was spent."""
+    budget: int
+    tokens: int = 0
+    full: int = 0
+    compact: int = 0
+    omitted: int = 0
+
+
+def _latest_date(spec: AgentSpec) -> Optional[date]:
+    found = None
+    for entry in as_list(spec.changelog):
+        for match in _DATE.finditer(str(entry)):
+            try:
+                day = date(*map(int, match.groups()))
+            except ValueError:
+                continue
+            found = day if found is None or day > found else found
+    return found
+
+
+def _focused(spec: AgentSpec, focus: Sequence[Path]) -> bool:
+    path = Path(spec.filepath).resolve()
+    return any(path == f or f in path.parents for f in focus)
+
+
+def rank_specs(specs: List[AgentSpec], focus: Sequence[str] = ()) -> List[Tuple[float, AgentSpec]]:
+    """(score, spec) pairs, best first; ties keep file and line order."""
+    # Fan-in from deps.calls counts distinct calling specs by the callee's last name segment
+    named: Dict[str, int] = {}
+    for s in specs:
+        calls = s.deps.get("calls") if isinstance(s.deps, dict) else None
+        for callee in {str(c).rsplit(".", 1)[-1] for c in as_list(calls)}:
+            named[callee] = named.get(callee, 0) + 1
+    dates = {id(s): _latest_date(s) for s in specs}
+    newest = max((d for d in dates.values() if d is not None), default=None)
+    focus_paths = [Path(f).resolve() for f in focus]
+
+    ranked = []
+    for position, s in enumerate(specs):
+        called_by = s.deps.get("called_by") if isinstance(s.deps, dict) else None
+        fan_in = max(len(as_list(called_by)), named.get(s.name, 0))
+        latest = dates[id(s)]
+        recency = 0.0
+        if latest is not None and newest is not None:
+            recency = 0.5 ** ((newest - latest).days / RECENCY_HALF_LIFE_DAYS)
+        score = (
+            WEIGHTS["guardrails"] * min(len(as_list(s.guardrails)), MAX_GUARDRAILS_SCORED)
+            + WEIGHTS["fan_in"] * math.log2(1 + fan_in)
+            + WEIGHTS["recency"] * recency
+            + (WEIGHTS["focus"] if focus_paths and _focused(s, focus_paths) else 0.0)
+        )
+        ranked.append((score, position, s))
+    ranked.sort(key=lambda item: (-item[0], item[1]))
+    return [(score, s) for score, _, s in ranked]
+
+
+def compact_section(s: AgentSpec) -> str:
+    """A spec reduced to its location, the first paragraph of `what` and its guardrails."""
+    what = (s.what or "").strip().split("\n\n")[0].strip()
+    if len(what) > COMPACT_WHAT_CHARS:
+        what = what[:COMPACT_WHAT_CHARS].rstrip() + "…"
+    parts = [f"### {s.name} ({s.filepath}:{s.lineno})\n\n"]
+    if what:
+        parts.append(f"{what}\n\n")
+    guardrails = as_list(s.guardrails)
+    if guardrails:
+        parts.extend(f"- {g}\n" for g in guardrails)
+        parts.append("\n")
+    return "".join(parts)
+
+
+def pack_agent_context(specs: List[AgentSpec], budget: int, focus: Sequence[str] = ()) -> Tuple[str, PackStats]:
+    """Agent-context markdown for the highest-ranked specs within about `budget` tokens."""
+    stats = PackStats(budget=budget)
+    header = render_agent_context([], title="Function Specifications")
+    # Room for the summary line, whose numbers are only known at the end
+    summary_reserve = estimate_tokens(_summary(PackStats(budget, budget, len(specs), len(specs), len(specs))))
+    used = estimate_tokens(header) + summary_reserve
+    full: List[str] = []
+    compact: List[str] = []
+    compact_heading = "## Compact specs (what + guardrails)\n\n"
+    spilled = False
+    for _, s in rank_specs(specs, focus):
+        if not spilled:
+            section = agent_context_section(s)
+            cost = estimate_tokens(section)
+            if used + cost <= budget:
+                full.append(section)
+                used += cost
+                stats.full += 1
+                continue
+            # Everything ranked below the first spec that does not fit stays compact
+            spilled = True
+        section = compact_section(s)
+        # The heading is paid for by the first compact section that makes it in
+        cost = estimate_tokens(section) + (0 if compact else estimate_tokens(compact_heading))
+        if used + cost <= budget:
+            compact.append(section)
+            used += cost
+            stats.compact += 1
+        else:
+            stats.omitted += 1
+    stats.tokens = used
+    body = "".join(full)
+    if compact:
+        body += compact_heading + "".join(compact)
+    return header + _summary(stats) + body, stats
+
+
+def _summary(stats: PackStats) -> str:
+    return (
+        f"_Packed for a budget of {stats.budget} tokens (~{stats.tokens} used): {stats.full} full, "
+        f"{stats.compact} compact, {stats.omitted} omitted; ranked by guardrails, fan-in, recency and focus._\n\n"
+    )
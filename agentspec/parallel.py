@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+agentspec.parallel
+------------------
+Ordered process-pool map used by `lint --jobs N` and `extract --jobs N`.
+
+ordered_map() consumes items as they are discovered and yields one result per
+item in input order, so callers print and export exactly what the serial path
+would. Items a `lookup` callback can answer (result-cache hits) never leave the
+parent process. The first `threshold` misses are computed in-process as soon as
+they reach the head of the line, so small runs never start workers and results
+keep streaming while discovery is still going; past that, misses are sent to
+the pool in chunks.
+
+Worker functions must be module-level (or functools.partial of one) and return
+plain picklable data.
+"""
+from __future__ import annotations
+
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Below this many cache misses a run stays in-process
+PARALLEL_THRESHOLD = 64
+CHUNK_SIZE = 8
+
+
+def default_jobs() -> int:
+    """Worker count used when --jobs is not given: the CPUs this process may run on."""
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except (AttributeError, OSError):
+        return os.cpu_count() or 1
+
+
+@dataclass
+class ParallelStats:
+    """Counters filled in by ordered_map describing where results came from."""
+    jobs: int = 1
+    cached: int = 0
+    in_process: int = 0
+    in_workers: int = 0
+
+    def summary(self) -> str:
+        mode = f"{self.jobs} workers" if self.in_workers else "in-process"
+        return (
+            f"[{mode}] {self.in_workers} files in workers, {self.in_process} in-process, "
+            f"{self.cached} from cache"
+        )
+
+
+def _run_chunk(fn: Callable[[T], R], chunk: List[T]) -> List[R]:
+    return [fn(item) for item in chunk]
+
+
+def _mp_context():
+    # The parent has helper threads (discovery prefetch, git coprocess readers);
+    # forking it is unsafe, so start workers from a clean server process instead.
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def ordered_map(
+    fn: Callable[[T], R],
+    items: Iterable[T],
+    jobs: Optional[int] = None,
+    lookup: Optional[Callable[[T], Optional[R]]] = None,
+    stats: Optional[ParallelStats] = None,
+    threshold: Optional[int] = None,
+    local_fn: Optional[Callable[[T], R]] = None,
+) -> Iterator[Tuple[T, R, bool]]:
+    """
+    Yield (item, result, computed) for every item, in input order.
+
+    `computed` is False when the result came from `lookup`, so callers know which
+    results are new (e.g. to store them in a cache). Items computed in this
+    process go through `local_fn` when given, which may close over unpicklable
+    state such as an open cache; it must return what `fn` would.
+    """
+    local = local_fn if local_fn is not None else fn
+    stats = stats if stats is not None else ParallelStats()
+    stats.jobs = max(1, jobs if jobs is not None else default_jobs())
+    threshold = PARALLEL_THRESHOLD if threshold is None else threshold
+    if stats.jobs == 1:
+        for item in items:
+            hit = lookup(item) if lookup is not None else None
+            if hit is not None:
+                stats.cached += 1
+                yield item, hit, False
+            else:
+                stats.in_process += 1
+                yield item, local(item), True
+        return
+
+    order: Deque[Tuple[int, T]] = deque()  # items not yet yielded
+    ready: Dict[int, Tuple[R, bool]] = {}
+    owner: Dict[int, Future] = {}  # index -> future computing it
+    batches: Dict[Future, List[int]] = {}
+    chunk: List[Tuple[int, T]] = []  # misses waiting to be sent to the pool
+    pool: Optional[ProcessPoolExecutor] = None
+    misses = 0
+    limit = stats.jobs * CHUNK_SIZE * 4
+
+    def _dispatch() -> None:
+        future = pool.submit(_run_chunk, fn, [item for _, item in chunk])
+        batches[future] = [index for index, _ in chunk]
+        for index, _ in chunk:
+            owner[index] = future
+        stats.in_workers += len(chunk)
+        chunk.clear()
+
+    def _collect(future: Future) -> None:
+        for index, result in zip(batches.pop(future), future.result()):
+            ready[index] = (result, True)
+            del owner[index]
+
+    def _drain(final: bool) -> Iterator[Tuple[T, R, bool]]:
+        while order:
+            index, item = order[0]
+            if index not in ready:
+                future = owner.get(index)
+                if future is not None and (final or future.done() or len(order) > limit):
+                    _collect(future)
+                elif pool is None:
+                    # Below the threshold: compute the head miss now rather than after discovery
+                    chunk.pop(0)
+                    stats.in_process += 1
+                    ready[index] = (local(item), True)
+                elif future is None and pool is not None and chunk and len(order) > limit:
+                    _dispatch()  # a part-filled chunk is holding up the head
+                    continue
+                else:
+                    return
+            order.popleft()
+            result, computed = ready.pop(index)
+            yield item, result, computed
+
+    try:
+        for index, item in enumerate(items):
+            order.append((index, item))
+            hit = lookup(item) if lookup is not None else None
+            if hit is not None:
+                stats.cached += 1
+                ready[index] = (hit, False)
+            else:
+                misses += 1
+                chunk.append((index, item))
+                if pool is None and misses > threshold:
+                    pool = ProcessPoolExecutor(max_workers=stats.jobs, mp_context=_mp_context())
+                elif pool is not None and len(chunk) >= CHUNK_SIZE:
+                    _dispatch()
+            yield from _drain(final=False)
+        if pool is not None and chunk:
+            _dispatch()
+        yield from _drain(final=True)
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+agentspec.parsed
+----------------
+One parse per file version, shared by lint, extract, generate and collect.
+
+ParsedModule bundles the source text, its line table, the AST and a
+qualname -> node index. parse_source/parse_file memoise modules by a digest of
+the source, so the same text (a file on disk, its temp copy during generate, or
+a historical git blob) is parsed once per process no matter how many functions
+ask for it.
+
+The AST is shared between callers: treat it as read-only.
+"""
+from __future__ import annotations
+
+import ast
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+FunctionNode = Union[ast.FunctionDef, ast.AsyncFunctionDef]
+DefNode = Union[ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef]
+
+# Enough for a few large modules plus the git history blobs of the file being generated
+MEMO_SIZE = 128
+
+
+class ParsedModule:
+    """Source, line offsets, AST and qualname index for one version of a Python file."""
+
+    def __init__(self, source: str, filename: str = "<unknown>", tree: Optional[ast.Module] = None):
+        self.source = source
+        self.filename = filename
+        self.tree = tree if tree is not None else ast.parse(source, filename=filename)
+        self._lines: Optional[List[str]] = None
+        self._offsets: Optional[List[int]] = None
+        self._definitions: Optional[List[Tuple[str, DefNode]]] = None
+        self._index: Optional[Dict[str, DefNode]] = None
+        self._functions: Optional[List[FunctionNode]] = None
+        self._compiles: Optional[bool] = None
+
+    @property
+    def lines(self) -> List[str]:
+        """Source lines without line endings (`source.split("\\n")`)."""
+        if self._lines is None:
+            self._lines = self.source.split("\n")
+        return self._lines
+
+    @property
+    def line_offsets(self) -> List[int]:
+        """Character offset of the start of each line; index 0 is line 1."""
+        if self._offsets is None:
+            offsets = [0]
+            for line in self.lines[:-1]:
+                offsets.append(offsets[-1] + len(line) + 1)
+            self._offsets = offsets
+        return self._offsets
+
+    def offset(self, lineno: int, col: int = 0) -> int:
+        """Convert a 1-based line and 0-based column to an offset into `source`."""
+        return self.line_offsets[lineno - 1] + col
+
+    def segment(self, node: ast.AST) -> str:
+        """Full source lines spanned by a node (from its first to its last line)."""
+        return "\n".join(self.lines[node.lineno - 1:node.end_lineno])
+
+    def functions(self) -> List[FunctionNode]:
+        """All function and method definitions, in ast.walk order."""
+        if self._functions is None:
+            self._functions = [
+                n for n in ast.walk(self.tree) if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))
+            ]
+        return self._functions
+
+    @property
+    def definitions(self) -> List[Tuple[str, DefNode]]:
+        """
+        (qualname, node) of every function and class definition, in source order,
+        including ones a later definition of the same qualname replaces.
+        """
+        if self._definitions is None:
+            found: List[Tuple[str, DefNode]] = []
+            stack: List[Tuple[str, ast.AST]] = [("", self.tree)]
+            while stack:
+                prefix, parent = stack.pop()
+                for child in ast.iter_child_nodes(parent):
+                    if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                        qualname = prefix + child.name
+                        found.append((qualname, child))
+                        inner = qualname + ("." if isinstance(child, ast.ClassDef) else ".<locals>.")
+                        stack.append((inner, child))
+                    else:
+                        stack.append((prefix, child))
+            found.sort(key=lambda item: (item[1].lineno, item[1].col_offset))
+            self._definitions = found
+        return self._definitions
+
+    @property
+    def index(self) -> Dict[str, DefNode]:
+        """
+        Map Python-style qualnames (`Class.method`, `outer.<locals>.inner`) to definitions.
+
+        When a name is defined more than once, the last definition wins, as it would at runtime.
+        """
+        if self._index is None:
+            # Source order, so later definitions overwrite earlier ones
+            self._index = dict(self.definitions)
+        return self._index
+
+    def find_function(self, name: str, near_lineno: Optional[int] = None) -> Optional[FunctionNode]:
+        """
+        Look a function up by qualname or bare name.
+
+        With several bare-name matches, the one closest to `near_lineno` wins, or
+        the first in ast.walk order when no line is given.
+        """
+        if "." in name:
+            node = self.index.get(name)
+            return node if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) else None
+        candidates = [n for n in self.functions() if n.name == name]
+        if not candidates:
+            return None
+        if near_lineno is None:
+            return candidates[0]
+        return min(candidates, key=lambda n: abs((n.lineno or 0) - near_lineno))
+
+    def defs_touching(self, lines: Iterable[int]) -> List[DefNode]:
+        """
+        Innermost function/class definition enclosing each line, in source order.
+
+        A definition spans from its first decorator to its last line; lines outside
+        every definition (module-level code) select nothing.
+        """
+        spans = sorted(
+            (
+                (min([n.lineno] + [d.lineno for d in n.decorator_list]), n.end_lineno or n.lineno, n)
+                for n in ast.walk(self.tree)
+                if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+            ),
+            key=lambda span: (span[0], -span[1]),
+        )
+        found: Dict[int, DefNode] = {}
+        for line in set(lines):
+            inner = None
+            for start, end, node in spans:
+                if start > line:
+                    break
+                if line <= end:
+                    inner = node  # later starts are nested deeper
+            if inner is not None:
+                found[id(inner)] = inner
+        return sorted(found.values(), key=lambda n: (n.lineno, n.col_offset))
+
+    @staticmethod
+    def docstring_node(node: ast.AST) -> Optional[ast.Expr]:
+        """The leading string-literal statement of a def/class/module body, if any."""
+        body = getattr(node, "body", None)
+        if body and isinstance(body[0], ast.Expr):
+            value = body[0].value
+            if isinstance(value, ast.Constant) and isinstance(value.value, str):
+                return body[0]
+        return None
+
+    def compiles(self) -> bool:
+        """True if the module also passes bytecode compilation (catches e.g. `return` outside a def)."""
+        if self._compiles is None:
+            try:
+                compile(self.tree, self.filename, "exec", dont_inherit=True)
+                self._compiles = True
+            except (SyntaxError, ValueError):
+                self._compiles = False
+        return self._compiles
+
+
+_MEMO: "OrderedDict[str, ParsedModule]" = OrderedDict()
+_MEMO_LOCK = threading.Lock()
+
+
+def source_digest(source: str) -> str:
+    return hashlib.blake2b(source.encode("utf-8", errors="surrogatepass"), digest_size=20).hexdigest()
+
+
+def parse_source(source: str, filename: str = "<unknown>") -> ParsedModule:
+    """Return the ParsedModule for `source`, parsing it only if this text was not seen recently.
+
+    Raises SyntaxError (not memoised) for invalid source.
+    """
+    key = source_digest(source)
+    with _MEMO_LOCK:
+        module = _MEMO.get(key)
+        if module is not None:
+            _MEMO.move_to_end(key)
+            return module
+    module = ParsedModule(source, filename=filename)
+    with _MEMO_LOCK:
+        _MEMO[key] = module
+        while len(_MEMO) > MEMO_SIZE:
+            _MEMO.popitem(last=False)
+    return module
+
+
+def parse_file(path: Path) -> ParsedModule:
+    """Read a file as UTF-8 and return its (possibly memoised) ParsedModule."""
+    return parse_source(Path(path).read_text(encoding="utf-8"), filename=str(path))
+
+
+def clear_parse_memo() -> None:
+    with _MEMO_LOCK:
+        _MEMO.clear()
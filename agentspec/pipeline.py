@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+agentspec.pipeline
+------------------
+The per-file run shared by `lint`, `extract`, `check` and `index build`.
+
+FileRun validates the targets, narrows them to a git diff for --changed-since /
+--staged, streams discovery and maps a FileJob over the discovered files with
+ordered_map(). Result-cache lookups and writes stay in this process; only misses
+are computed, in workers with --jobs N. A FileJob says how one file's result is
+computed and which result-cache entries hold it.
+"""
+from __future__ import annotations
+
+import abc
+import functools
+from pathlib import Path
+from typing import Any, Collection, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from agentspec.cache import ResultCache, open_result_cache
+from agentspec.gitdiff import ChangeSet, GitDiffError, load_changes
+from agentspec.parallel import ParallelStats, ordered_map
+from agentspec.utils import DiscoveryStats, expand_targets, iter_prefetched, iter_target_files
+from agentspec.yamlio import YAML_BACKEND
+
+
+class FileJob(abc.ABC):
+    """
+    One per-file pass. Jobs are pickled into worker processes, so they hold only
+    plain options, and compute() returns plain picklable data.
+    """
+
+    @abc.abstractmethod
+    def compute(
+        self, path: Path, lines: Optional[Collection[int]] = None, cache: Optional[ResultCache] = None
+    ) -> Any:
+        """The file's result; with `lines`, only for the definitions enclosing them."""
+
+    @abc.abstractmethod
+    def keys(self, content: bytes, lines: Optional[Collection[int]] = None) -> Tuple[str, ...]:
+        """Result-cache keys of the entries that together hold the result."""
+
+    @abc.abstractmethod
+    def decode(self, hits: Sequence[Any]) -> Any:
+        """The result rebuilt from its cached entries, in keys() order."""
+
+    @abc.abstractmethod
+    def store(self, cache: ResultCache, keys: Sequence[str], result: Any) -> None:
+        """Cache a freshly computed result under keys()."""
+
+
+def _compute(
+    job: FileJob,
+    changed: Optional[Dict[Path, Optional[Collection[int]]]],
+    path: Path,
+    cache: Optional[ResultCache] = None,
+) -> Any:
+    return job.compute(path, changed.get(path) if changed is not None else None, cache)
+
+
+class FileRun:
+    """Discovery, result cache and execution state of one command run."""
+
+    def __init__(
+        self,
+        targets: List[Path],
+        files: Sequence[Path] = (),
+        changes: Optional[ChangeSet] = None,
+        use_git: bool = True,
+        ignore_engine: str = "auto",
+        use_cache: bool = True,
+        jobs: Optional[int] = None,
+    ):
+        self.targets = targets
+        self.files = list(files)
+        self.changes = changes
+        self.use_git = use_git
+        self.ignore_engine = ignore_engine
+        self.use_cache = use_cache
+        self.jobs = jobs
+        self.stats = DiscoveryStats()
+        self.pstats = ParallelStats()
+        self.cache: Optional[ResultCache] = None
+        self._cache_opened = False
+
+    @classmethod
+    def open(
+        cls,
+        target: Union[str, Sequence[str]],
+        files: Optional[Sequence[str]] = None,
+        changed_since: Optional[str] = None,
+        staged: bool = False,
+        **options: Any,
+    ) -> Optional["FileRun"]:
+        """A run over `target`, or None after printing why it cannot start (missing path, bad diff)."""
+        targets = expand_targets(target)
+        for missing in (t for t in targets if not t.exists()):
+            print(f"❌ Error: Path does not exist: {missing}")
+            return None
+        listed = [Path(f) for f in files or ()]
+        changes = None
+        if changed_since is not None or staged:
+            try:
+                changes = load_changes(targets, listed, since=changed_since, staged=staged)
+            except GitDiffError as e:
+                print(f"❌ Error: {e}")
+                return None
+            print(f"🔀 {changes.describe()}")
+        return cls(targets, listed, changes, **options)
+
+    def open_cache(self) -> Optional[ResultCache]:
+        """The result cache of the targets' repository, opened on first use."""
+        if not self._cache_opened:
+            self.cache = open_result_cache(self.targets, self.use_cache)
+            self._cache_opened = True
+        return self.cache
+
+    def discover(self) -> Iterator[Path]:
+        """Files to visit, streamed from a background thread; only changed files with a diff."""
+        if self.changes is not None:
+            walk, listed, label = [], self.changes.paths, "git diff"
+        else:
+            walk, listed, label = self.targets, self.files, "files-from"
+        return iter_prefetched(
+            iter_target_files(
+                walk,
+                files=listed,
+                stats=self.stats,
+                use_git=self.use_git,
+                ignore_engine=self.ignore_engine,
+                use_cache=self.use_cache,
+                files_label=label,
+            )
+        )
+
+    def map(self, job: FileJob, items: Optional[Iterable[Path]] = None) -> Iterator[Tuple[Path, Any]]:
+        """Yield (file, result) for `items` (default: discover()) in input order."""
+        cache = self.open_cache()
+        changed = self.changes.lines if self.changes is not None else None
+        keys: Dict[Path, Tuple[str, ...]] = {}
+
+        def _lookup(file: Path) -> Any:
+            if cache is None:
+                return None
+            try:
+                content = file.read_bytes()
+            except OSError:
+                return None
+            file_keys = job.keys(content, changed.get(file) if changed is not None else None)
+            keys[file] = file_keys
+            hits = [cache.get(key) for key in file_keys]
+            # A file is only skipped when every part of its result is cached
+            if any(hit is None for hit in hits):
+                return None
+            return job.decode(hits)
+
+        # Workers cannot share the cache connection; in-process runs also reuse per-definition entries
+        for file, result, computed in ordered_map(
+            functools.partial(_compute, job, changed),
+            self.discover() if items is None else items,
+            jobs=self.jobs,
+            lookup=_lookup,
+            stats=self.pstats,
+            local_fn=functools.partial(_compute, job, changed, cache=cache),
+        ):
+            file_keys = keys.pop(file, None)
+            if computed and file_keys is not None:
+                job.store(cache, file_keys, result)
+            yield file, result
+
+    def close(self, verbose: bool = False) -> None:
+        """Print the run statistics with `verbose`, then close the result cache."""
+        if verbose:
+            print(f"🔎 Discovery: {self.stats.summary()}")
+            print(f"🧩 YAML backend: {YAML_BACKEND}")
+            print(f"⚙️  Execution: {self.pstats.summary()}")
+            if self.cache is not None:
+                print(f"🗄️  Result cache: {self.cache.hits} hits, {self.cache.misses} misses ({self.cache.path})")
+                print(f"   Definition entries: {self.cache.node_hits} reused, {self.cache.node_misses} rebuilt")
+        if self.cache is not None:
+            self.cache.close()
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+agentspec.serve
+---------------
+`agentspec serve TARGET`: a long-running stdio tool server answering spec
+queries from memory, so an agent step reads one spec instead of the whole export.
+
+Transport is newline-delimited JSON-RPC 2.0 as MCP uses over stdio. The tools
+are listed by `tools/list` and invoked by `tools/call`, and they can also be
+called directly as methods:
+
+- get_spec(path, symbol): spec of a function/class by name or qualname (`Class.method`)
+- guardrails_for(path, line): guardrails of every definition enclosing a line, outermost first
+- search(text, limit=20): specs whose name/what/why/guardrails contain all query words
+
+Specs are extracted once through a Watcher (result cache included). Before a
+query, the index is refreshed if the last check is older than `refresh`
+seconds, and only new, modified or removed files are re-extracted.
+"""
+from __future__ import annotations
+
+import ast
+import contextlib
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+from agentspec.extract import AgentSpec, spec_to_dict
+from agentspec.parsed import parse_file
+from agentspec.utils import expand_targets
+from agentspec.watch import Watcher
+
+PROTOCOL_VERSION = "2024-11-05"
+DEFAULT_REFRESH = 1.0
+INTERNAL_ERROR = -32603
+INVALID_PARAMS = -32602
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+PARSE_ERROR = -32700
+
+# Search scores per field a query word appears in
+_FIELD_WEIGHTS = (("name", 8), ("guardrails", 4), ("what", 2), ("why", 1))
+_WORD = re.compile(r"\w+")
+
+
+class ToolError(ValueError):
+    """A tool was called with arguments it cannot answer (unknown file, symbol, ...)."""
+
+
+def spec_payload(spec: AgentSpec) -> Dict[str, Any]:
+    """The exported spec fields (spec_to_dict) without the raw YAML block."""
+    data = spec_to_dict(spec)
+    del data["raw_block"]
+    return data
+
+
+def _words(text: str) -> Set[str]:
+    return set(_WORD.findall(text.lower()))
+
+
+class SpecIndex:
+    """Extracted specs by file plus an inverted word index for search()."""
+
+    def __init__(self, watcher: Watcher, refresh: float = DEFAULT_REFRESH):
+        self.watcher = watcher
+        self.refresh = refresh
+        self.checked_at = float("-inf")
+        self.by_file: Dict[Path, List[AgentSpec]] = {}
+        # Per file, recorded when it is (re-)extracted: qualname -> def line, and the
+        # (first line, last line, def line) span of every definition
+        self.qualnames: Dict[Path, Dict[str, int]] = {}
+        self.spans: Dict[Path, List[Tuple[int, int, int]]] = {}
+        # word -> {(file, spec index): score}
+        self.postings: Dict[str, Dict[Tuple[Path, int], int]] = {}
+
+    def update(self, force: bool = False) -> Tuple[int, int]:
+        """Re-extract files changed since the last check; returns (changed, removed) counts."""
+        now = time.monotonic()
+        if not force and now - self.checked_at < self.refresh:
+            return 0, 0
+        self.checked_at = now
+        # Extraction warnings must not reach stdout, which carries the protocol
+        with contextlib.redirect_stdout(sys.stderr):
+            changed, removed = self.watcher.scan()
+        for path in removed:
+            self._drop(path.resolve())
+        for path in changed:
+            key = path.resolve()
+            self._drop(key)
+            self.by_file[key] = specs = self.watcher.state[path][1]
+            self.qualnames[key], self.spans[key] = _definitions(path)
+            for i, spec in enumerate(specs):
+                for word, score in self._scores(spec).items():
+                    self.postings.setdefault(word, {})[(key, i)] = score
+        return len(changed), len(removed)
+
+    def _drop(self, key: Path) -> None:
+        self.qualnames.pop(key, None)
+        self.spans.pop(key, None)
+        specs = self.by_file.pop(key, None)
+        for i, spec in enumerate(specs or ()):
+            for word in self._scores(spec):
+                entries = self.postings.get(word)
+                if entries is not None:
+                    entries.pop((key, i), None)
+                    if not entries:
+                        del self.postings[word]
+
+    @staticmethod
+    def _scores(spec: AgentSpec) -> Dict[str, int]:
+        scores: Dict[str, int] = {}
+        for field, weight in _FIELD_WEIGHTS:
+            value = getattr(spec, field)
+            text = " ".join(map(str, value)) if isinstance(value, list) else str(value)
+            for word in _words(text):
+                scores[word] = scores.get(word, 0) + weight
+        return scores
+
+    def _file(self, path: str) -> Tuple[Path, List[AgentSpec]]:
+        key = Path(path).resolve()
+        if key not in self.by_file:
+            raise ToolError(f"not an indexed file: {path}")
+        return key, self.by_file[key]
+
+    def get_spec(self, path: str, symbol: str) -> Dict[str, Any]:
+        key, specs = self._file(path)
+        if "." in symbol:
+            lineno = self.qualnames[key].get(symbol)
+            matches = [s for s in specs if s.lineno == lineno]
+        else:
+            matches = [s for s in specs if s.name == symbol]
+        if not matches:
+            raise ToolError(f"no spec for {symbol!r} in {path}")
+        # Bare names defined more than once: all of them, in source order
+        return {"specs": [spec_payload(s) for s in matches]}
+
+    def guardrails_for(self, path: str, line: int) -> Dict[str, Any]:
+        key, specs = self._file(path)
+        by_line = {s.lineno: s for s in specs}
+        found = []
+        for lineno in _enclosing(self.spans[key], line):
+            spec = by_line.get(lineno)
+            if spec is not None and spec.guardrails:
+                found.append({"symbol": spec.name, "lineno": spec.lineno, "guardrails": spec.guardrails})
+        return {"path": path, "line": line, "scopes": found}
+
+    def search(self, text: str, limit: int = 20) -> Dict[str, Any]:
+        words = _words(text)
+        if not words:
+            raise ToolError("empty search text")
+        hits: Optional[Dict[Tuple[Path, int], int]] = None
+        for word in sorted(words, key=lambda w: len(self.postings.get(w, ()))):
+            entries = self.postings.get(word, {})
+            if hits is None:
+                hits = dict(entries)
+            else:
+                hits = {ref: score + entries[ref] for ref, score in hits.items() if ref in entries}
+            if not hits:
+                break
+        ranked = sorted((hits or {}).items(), key=lambda item: (-item[1], str(item[0][0]), item[0][1]))
+        results = []
+        for (key, i), score in ranked[:limit]:
+            spec = self.by_file[key][i]
+            results.append({
+                "path": spec.filepath,
+                "symbol": spec.name,
+                "lineno": spec.lineno,
+                "score": score,
+                "what": spec.what,
+            })
+        return {"total": len(ranked), "results": results}
+
+
+def _definitions(path: Path) -> Tuple[Dict[str, int], List[Tuple[int, int, int]]]:
+    """
+    Qualname -> def line and (first decorator line, last line, def line) spans of a
+    file's definitions, read once when the file is extracted. Unreadable or
+    unparsable files have none (they have no specs either).
+    """
+    try:
+        module = parse_file(path)
+    except (SyntaxError, ValueError, OSError, UnicodeDecodeError):
+        return {}, []
+    qualnames = {qual: node.lineno for qual, node in module.index.items()}
+    spans = [
+        (min([node.lineno] + [d.lineno for d in node.decorator_list]), node.end_lineno or node.lineno, node.lineno)
+        for node in ast.walk(module.tree)
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+    ]
+    spans.sort(key=lambda span: (span[0], -span[1]))
+    return qualnames, spans
+
+
+def _enclosing(spans: List[Tuple[int, int, int]], line: int) -> List[int]:
+    """Def lines of the definitions whose span contains `line`, outermost first."""
+    return [lineno for start, end, lineno in spans if start <= line <= end]
+
+
+TOOLS: List[Dict[str, Any]] = [
+    {
+        "name": "get_spec",
+        "description": "Agentspec of one function or class: what, why, deps, guardrails, changelog.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "path": {"type": "string", "description": "Python file path"},
+                "symbol": {"type": "string", "description": "Function or class name, or qualname like Class.method"},
+            },
+            "required": ["path", "symbol"],
+        },
+    },
+    {
+        "name": "guardrails_for",
+        "description": "Guardrails that apply at a line: those of every enclosing function and class.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "path": {"type": "string", "description": "Python file path"},
+                "line": {"type": "integer", "description": "1-based line number"},
+            },
+            "required": ["path", "line"],
+        },
+    },
+    {
+        "name": "search",
+        "description": "Specs whose name, what, why or guardrails contain every word of the query.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "text": {"type": "string"},
+                "limit": {"type": "integer", "default": 20},
+            },
+            "required": ["text"],
+        },
+    },
+]
+
+
+class ToolServer:
+    """JSON-RPC dispatch for one stdio client."""
+
+    def __init__(self, index: SpecIndex, reader: BinaryIO, writer: BinaryIO):
+        self.index = index
+        self.reader = reader
+        self.writer = writer
+        self.tools: Dict[str, Callable[..., Dict[str, Any]]] = {
+            "get_spec": index.get_spec,
+            "guardrails_for": index.guardrails_for,
+            "search": index.search,
+        }
+
+    def serve(self) -> int:
+        for raw in self.reader:
+            if not raw.strip():
+                continue
+            try:
+                message = json.loads(raw)
+            except ValueError as e:
+                self._send({"jsonrpc": "2.0", "id": None, "error": {"code": PARSE_ERROR, "message": str(e)}})
+                continue
+            reply = self.handle(message)
+            if reply is not None:
+                self._send(reply)
+        return 0
+
+    def handle(self, message: Any) -> Optional[Dict[str, Any]]:
+        """Answer one request; None for notifications."""
+        if not isinstance(message, dict):
+            error = {"code": INVALID_REQUEST, "message": "request must be a JSON object"}
+            return {"jsonrpc": "2.0", "id": None, "error": error}
+        method, request_id = message.get("method"), message.get("id")
+        params = message.get("params") or {}
+        try:
+            handler = self._handler(method)
+        except LookupError:
+            error = {"code": METHOD_NOT_FOUND, "message": f"unsupported method: {method}"}
+            return None if request_id is None else {"jsonrpc": "2.0", "id": request_id, "error": error}
+        try:
+            if not isinstance(params, dict):
+                raise ToolError("params must be an object")
+            result = handler(params)
+        except ToolError as e:
+            error = {"code": INVALID_PARAMS, "message": str(e)}
+            return None if request_id is None else {"jsonrpc": "2.0", "id": request_id, "error": error}
+        except Exception as e:  # A failing request must not take the server down
+            error = {"code": INTERNAL_ERROR, "message": f"{method}: {e}"}
+            return None if request_id is None else {"jsonrpc": "2.0", "id": request_id, "error": error}
+        if request_id is None:
+            return None
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    def _handler(self, method: Any) -> Callable[[Dict[str, Any]], Any]:
+        """The handler of `method`; LookupError if there is none."""
+        if method == "initialize":
+            return self._initialize
+        if method == "ping" or (isinstance(method, str) and method.startswith("notifications/")):
+            return lambda params: {}
+        if method == "tools/list":
+            return lambda params: {"tools": TOOLS}
+        if method == "tools/call":
+            return self._tools_call
+        if isinstance(method, str) and method in self.tools:
+            return lambda params: self._run_tool(method, params)
+        raise LookupError(method)
+
+    @staticmethod
+    def _initialize(params: Dict[str, Any]) -> Dict[str, Any]:
+        from agentspec import __version__
+
+        return {
+            "protocolVersion": params.get("protocolVersion", PROTOCOL_VERSION),
+            "capabilities": {"tools": {}},
+            "serverInfo": {"name": "agentspec", "version": __version__},
+        }
+
+    def _tools_call(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            data = self._run_tool(params.get("name"), params.get("arguments") or {})
+        except ToolError as e:
+            return {"content": [{"type": "text", "text": str(e)}], "isError": True}
+        return {"content": [{"type": "text", "text": json.dumps(data, ensure_ascii=False, default=str)}]}
+
+    def _run_tool(self, name: Any, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        tool = self.tools.get(name) if isinstance(name, str) else None
+        if tool is None:
+            raise ToolError(f"unknown tool: {name}")
+        if not isinstance(arguments, dict):
+            raise ToolError(f"{name}: arguments must be an object")
+        self.index.update()
+        try:
+            return tool(**arguments)
+        except TypeError as e:
+            raise ToolError(f"{name}: {e}") from None
+        except (SyntaxError, OSError, UnicodeDecodeError) as e:
+            raise ToolError(f"{name}: {e}") from None
+
+    def _send(self, message: Dict[str, Any]) -> None:
+        line = json.dumps(message, ensure_ascii=False, separators=(",", ":"), default=str)
+        self.writer.write(line.encode("utf-8") + b"\n")
+        self.writer.flush()
+
+
+def run(
+    target: Union[str, Sequence[str]],
+    refresh: float = DEFAULT_REFRESH,
+    use_git: bool = True,
+    ignore_engine: str = "auto",
+    use_cache: bool = True,
+    files: Optional[Sequence[str]] = None,
+) -> int:
+    """Index the targets and serve stdin/stdout until the client closes the stream."""
+    targets = expand_targets(target)
+    for missing in (t for t in targets if not t.exists()):
+        print(f"❌ Error: Path does not exist: {missing}", file=sys.stderr)
+        return 1
+    watcher = Watcher(
+        "extract",
+        targets,
+        files=[Path(f) for f in files or ()],
+        use_git=use_git,
+        ignore_engine=ignore_engine,
+        use_cache=use_cache,
+    )
+    index = SpecIndex(watcher, refresh=refresh)
+    started = time.perf_counter()
+    index.update(force=True)
+    specs = sum(len(s) for s in index.by_file.values())
+    print(
+        f"🧩 Indexed {specs} specs from {len(index.by_file)} files ({time.perf_counter() - started:.2f}s)",
+        file=sys.stderr,
+    )
+    try:
+        return ToolServer(index, sys.stdin.buffer, sys.stdout.buffer).serve()
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        watcher.close()
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+agentspec.snapshot
+------------------
+Binary spec snapshot (`extract --format snapshot`, agent_specs.snap): a file a
+reader can mmap to decode only the specs it asks for, instead of json.load of
+the whole export.
+
+Layout, all integers little-endian:
+
+    header    magic "AGSPSNAP", version u16, header size u16, spec count u32,
+              string count u32, then u64 offsets of the entry table, the
+              string offsets and the payload section
+    entries   one per spec, sorted by (filepath, qualname) as UTF-8 bytes:
+              filepath string id u32, qualname string id u32, lineno u32,
+              payload offset u64, payload length u32
+    strings   string count + 1 u64 offsets into the string data; string i is
+              data[offset[i]:offset[i + 1]] (UTF-8)
+    payloads  one tagged value per spec, the spec_to_dict() fields
+
+Payload values are tagged: None, False, True, int (i64), float (f64), string
+(u32 id into the interned string table), list (u32 count, items) and dict
+(u32 count, key string id and value pairs). Every distinct string, keys
+included, is stored once. Other values (dates, oversized ints) are stored as
+their str(), as the JSON export does.
+
+Specs are keyed by qualname (`Class.method`, `outer.<locals>.inner`). A
+definition that a later one of the same qualname replaces is keyed
+`qualname@lineno`.
+"""
+from __future__ import annotations
+
+import mmap
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from agentspec.extract import AgentSpec, spec_to_dict
+from agentspec.parsed import parse_file
+from agentspec.utils import write_if_changed
+
+MAGIC = b"AGSPSNAP"
+VERSION = 1
+HEADER = struct.Struct("<8sHHIIQQQ")
+ENTRY = struct.Struct("<IIIQI")
+KEY = struct.Struct("<II")  # Leading (filepath, qualname) string ids of an entry
+OFFSET = struct.Struct("<Q")
+
+_NONE, _FALSE, _TRUE, _INT, _FLOAT, _STR, _LIST, _DICT = range(8)
+_U32 = struct.Struct("<I")
+_I64 = struct.Struct("<q")
+_F64 = struct.Struct("<d")
+_SPAN = struct.Struct("<QQ")  # Two consecutive string offsets: start and end
+_I64_RANGE = range(-(2**63), 2**63)
+
+
+class SnapshotError(ValueError):
+    """The file is not a snapshot this version of agentspec can read."""
+
+
+class _Strings:
+    """Interning table: each distinct string gets one id."""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+
+    def id(self, text: str) -> int:
+        found = self.ids.get(text)
+        if found is None:
+            found = self.ids[text] = len(self.ids)
+        return found
+
+
+def _utf8(text: str) -> bytes:
+    # Lone surrogates (undecodable file names) round-trip instead of failing the export
+    return text.encode("utf-8", "surrogatepass")
+
+
+def _encode(value: Any, strings: _Strings, out: bytearray) -> None:
+    if value is None:
+        out.append(_NONE)
+    elif value is True or value is False:
+        out.append(_TRUE if value else _FALSE)
+    elif isinstance(value, int) and value in _I64_RANGE:
+        out.append(_INT)
+        out += _I64.pack(value)
+    elif isinstance(value, float):
+        out.append(_FLOAT)
+        out += _F64.pack(value)
+    elif isinstance(value, (list, tuple)):
+        out.append(_LIST)
+        out += _U32.pack(len(value))
+        for item in value:
+            _encode(item, strings, out)
+    elif isinstance(value, dict):
+        out.append(_DICT)
+        out += _U32.pack(len(value))
+        for key, item in value.items():
+            out += _U32.pack(strings.id(key if isinstance(key, str) else str(key)))
+            _encode(item, strings, out)
+    else:
+        out.append(_STR)
+        out += _U32.pack(strings.id(value if isinstance(value, str) else str(value)))
+
+
+def spec_qualnames(specs: List[AgentSpec]) -> List[str]:
+    """
+    Qualname of each spec, from the parsed module of its file (memoised per file
+    version); `qualname@lineno` for a definition a later one of the same qualname replaces.
+    """
+    by_file: Dict[str, Dict[int, str]] = {}
+    names = []
+    for s in specs:
+        lines = by_file.get(s.filepath)
+        if lines is None:
+            lines = by_file[s.filepath] = {}
+            try:
+                module = parse_file(Path(s.filepath))
+            except (SyntaxError, ValueError, OSError, UnicodeDecodeError):
+                module = None
+            for qual, node in module.definitions if module is not None else ():
+                lines[node.lineno] = qual if module.index[qual] is node else f"{qual}@{node.lineno}"
+        names.append(lines.get(s.lineno) or f"{s.name}@{s.lineno}")
+    return names
+
+
+def encode_snapshot(specs: List[AgentSpec], qualnames: Optional[List[str]] = None) -> bytes:
+    """The snapshot file contents for `specs`; qualnames are looked up in the source unless given."""
+    strings = _Strings()
+    payloads = bytearray()
+    rows = []
+    for s, qualname in zip(specs, qualnames if qualnames is not None else spec_qualnames(specs)):
+        start = len(payloads)
+        _encode(spec_to_dict(s), strings, payloads)
+        rows.append((_utf8(s.filepath), _utf8(qualname), s, qualname, start, len(payloads) - start))
+    rows.sort(key=lambda row: (row[0], row[1]))
+    entries = bytearray()
+    for _, _, s, qualname, start, length in rows:
+        entries += ENTRY.pack(strings.id(s.filepath), strings.id(qualname), s.lineno, start, length)
+
+    data = bytearray()
+    offsets = bytearray(OFFSET.pack(0))
+    for text in strings.ids:  # Insertion order is id order
+        data += _utf8(text)
+        offsets += OFFSET.pack(len(data))
+    entries_at = HEADER.size
+    strings_at = entries_at + len(entries)
+    payloads_at = strings_at + len(offsets) + len(data)
+    header = HEADER.pack(
+        MAGIC, VERSION, HEADER.size, len(rows), len(strings.ids), entries_at, strings_at, payloads_at
+    )
+    return b"".join((header, entries, offsets, data, payloads))
+
+
+def write_snapshot(specs: List[AgentSpec], out: Path) -> bool:
+    """Write the snapshot of `specs` to `out`; False if the file already held it."""
+    return write_if_changed(out, encode_snapshot(specs))
+
+
+class Snapshot:
+    """
+    Read-only view of a snapshot file through mmap. Lookups binary-search the
+    entry table and decode one payload; nothing else is read.
+
+        with Snapshot("agent_specs.snap") as snap:
+            spec = snap.get("src/auth.py", "Session.refresh")
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with self.path.open("rb") as f:
+            try:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as e:  # Empty file
+                raise SnapshotError(f"{path}: not an agentspec snapshot ({e})") from None
+        self._view = memoryview(self._map)
+        if len(self._view) < HEADER.size:
+            self.close()
+            raise SnapshotError(f"{path}: not an agentspec snapshot")
+        magic, version, header_size, count, string_count, entries_at, strings_at, payloads_at = HEADER.unpack_from(
+            self._view
+        )
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise SnapshotError(f"{path}: not an agentspec snapshot (version {VERSION})")
+        self._count = count
+        self._entries_at = entries_at
+        self._string_offsets_at = strings_at
+        self._string_data_at = strings_at + (string_count + 1) * OFFSET.size
+        self._payloads_at = payloads_at
+        self._strings: Dict[int, str] = {}
+
+    def __enter__(self) -> "Snapshot":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._view.release()
+            self._map.close()
+            self._map = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _raw(self, string_id: int) -> bytes:
+        start, end = _SPAN.unpack_from(self._view, self._string_offsets_at + string_id * OFFSET.size)
+        return bytes(self._view[self._string_data_at + start:self._string_data_at + end])
+
+    def _string(self, string_id: int) -> str:
+        text = self._strings.get(string_id)
+        if text is None:
+            text = self._strings[string_id] = self._raw(string_id).decode("utf-8", "surrogatepass")
+        return text
+
+    def _entry(self, i: int) -> Tuple[int, int, int, int, int]:
+        return ENTRY.unpack_from(self._view, self._entry_at(i))
+
+    def _entry_at(self, i: int) -> int:
+        return self._entries_at + i * ENTRY.size
+
+    def _key(self, i: int) -> Tuple[bytes, bytes]:
+        filepath, qualname = KEY.unpack_from(self._view, self._entry_at(i))
+        return self._raw(filepath), self._raw(qualname)
+
+    def _lower_bound(self, key: Tuple[bytes, ...]) -> int:
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            found = self._key(middle)
+            if found[: len(key)] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _decode(self, i: int) -> Dict[str, Any]:
+        *_, offset, length = self._entry(i)
+        start = self._payloads_at + offset
+        value, _ = self._value(start)
+        return value
+
+    def _value(self, at: int) -> Tuple[Any, int]:
+        view = self._view
+        tag = view[at]
+        at += 1
+        if tag == _STR:
+            return self._string(_U32.unpack_from(view, at)[0]), at + 4
+        if tag == _DICT:
+            count = _U32.unpack_from(view, at)[0]
+            at += 4
+            result = {}
+            for _ in range(count):
+                key = self._string(_U32.unpack_from(view, at)[0])
+                result[key], at = self._value(at + 4)
+            return result, at
+        if tag == _LIST:
+            count = _U32.unpack_from(view, at)[0]
+            at += 4
+            items = []
+            for _ in range(count):
+                item, at = self._value(at)
+                items.append(item)
+            return items, at
+        if tag == _INT:
+            return _I64.unpack_from(view, at)[0], at + 8
+        if tag == _FLOAT:
+            return _F64.unpack_from(view, at)[0], at + 8
+        if tag in (_NONE, _FALSE, _TRUE):
+            return (None, False, True)[tag], at
+        raise SnapshotError(f"{self.path}: corrupt payload at byte {at - 1}")
+
+    def get(self, filepath: str, qualname: str) -> Optional[Dict[str, Any]]:
+        """The spec (spec_to_dict fields) of `qualname` in `filepath`, or None."""
+        key = (_utf8(filepath), _utf8(qualname))
+        i = self._lower_bound(key)
+        if i < self._count and self._key(i) == key:
+            return self._decode(i)
+        return None
+
+    def __getitem__(self, key: Tuple[str, str]) -> Dict[str, Any]:
+        spec = self.get(*key)
+        if spec is None:
+            raise KeyError(key)
+        return spec
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        return self.get(*key) is not None
+
+    def keys(self) -> Iterator[Tuple[str, str]]:
+        """(filepath, qualname) of every spec, in table order."""
+        for i in range(self._count):
+            filepath, qualname, *_ = self._entry(i)
+            yield self._string(filepath), self._string(qualname)
+
+    def in_file(self, filepath: str) -> Dict[str, Dict[str, Any]]:
+        """qualname -> spec for every spec of one file."""
+        prefix = (_utf8(filepath),)
+        found = {}
+        i = self._lower_bound(prefix)
+        while i < self._count:
+            entry = self._entry(i)
+            if self._raw(entry[0]) != prefix[0]:
+                break
+            found[self._string(entry[1])] = self._decode(i)
+            i += 1
+        return found
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(self._count):
+            yield self._decode(i)
+
+
+def load(path) -> List[Dict[str, Any]]:
+    """Every spec in a snapshot, in (filepath, qualname) order."""
+    with Snapshot(path) as snap:
+        return list(snap)
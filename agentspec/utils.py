@@ -17,22 +17,59 @@ GUARDRAILS:
 """
 from __future__ import annotations
 
-import fnmatch
+import atexit
+import glob
 import os
+import queue
+import re
 import subprocess
+import sys
+import threading
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List, Set, Optional
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Set, Optional, Tuple, TypeVar
 
+if TYPE_CHECKING:
+    from agentspec.cache import DiscoveryCache
+
+
+T = TypeVar("T")
 
 DEFAULT_EXCLUDE_DIRS: Set[str] = {
     ".git", ".hg", ".svn",
     ".venv", "venv", "env",
     "__pycache__", ".mypy_cache", ".pytest_cache", ".tox", ".eggs",
     "build", "dist", "site-packages", "node_modules",
-    ".idea", ".vscode",
+    ".idea", ".vscode", ".agentspec",
 }
 
 
+@dataclass
+class DiscoveryStats:
+    """Counters filled in by collect_python_files describing what a discovery pass did."""
+    strategy: str = ""
+    ignore_engine: str = ""
+    files: int = 0
+    dirs_scanned: int = 0
+    dirs_cached: int = 0
+    dirs_pruned: int = 0
+    files_ignored: int = 0
+    duplicates: int = 0
+
+    @property
+    def skipped(self) -> int:
+        """Total entries dropped without being returned (pruned dirs, ignored files, symlink dupes)."""
+        return self.dirs_pruned + self.files_ignored + self.duplicates
+
+    def summary(self) -> str:
+        return (
+            f"[{self.strategy or 'none'}, ignore engine: {self.ignore_engine or 'none'}] {self.files} files, {self.dirs_scanned} dirs scanned, "
+            f"{self.dirs_cached} dirs from cache, "
+            f"{self.skipped} entries skipped ({self.dirs_pruned} dirs pruned, "
+            f"{self.files_ignored} files ignored, {self.duplicates} duplicates)"
+        )
+
+
 def _is_excluded_by_dir(path: Path) -> bool:
     """
     ---agentspec
@@ -188,13 +225,13 @@ def _find_git_root(start: Path) -> Path | None:
     return None
 
 
-def _git_check_ignore(repo_root: Path, paths: List[Path]) -> Set[Path]:
+def _git_check_ignore(repo_root: Path, paths: List[Path], engine: str = "auto") -> Set[Path]:
     """
     ---agentspec
     what: |
       Batch-checks which file paths are ignored by Git according to .gitignore rules, returning only the ignored subset as a Set[Path].
 
-      Converts input paths to absolute form, then to relative paths anchored at repo_root to minimize stdin payload. Chunks the relative paths into groups of 1024 to prevent subprocess buffer exhaustion on large file lists. Constructs NUL-delimited input payload (each path followed by \0) and invokes `git check-ignore -z --stdin` with stderr suppressed. Parses the NUL-delimited output by splitting on \0, decodes each segment back to a path string, resolves to absolute form, and accumulates into the ignored set. Returns empty set on any exception (Git unavailable, not a Git repository, or subprocess failure), enabling graceful degradation.
+      Converts input paths to absolute form, then to relative paths anchored at repo_root to minimize stdin payload, and hands them to _git_ignored_rels, which queries the shared per-repo GitCheckIgnore coprocess (falling back to NUL-delimited `git check-ignore -z --stdin` runs in chunks of 1024). Parses the NUL-delimited output by splitting on \0, decodes each segment back to a path string, resolves to absolute form, and accumulates into the ignored set. Returns empty set on any exception (Git unavailable, not a Git repository, or subprocess failure), enabling graceful degradation.
         deps:
           calls:
             - encode
@@ -242,28 +279,198 @@ def _git_check_ignore(repo_root: Path, paths: List[Path]) -> Set[Path]:
     ignored: Set[Path] = set()
     if not paths:
         return ignored
+    try:
+        rels = [str(p.resolve().relative_to(repo_root)) for p in paths]
+        for rel_s in _git_ignored_rels(repo_root, rels, engine=engine):
+            ignored.add((repo_root / rel_s).resolve())
+    except Exception:
+        # If git is not available or fails, just return empty set
+        return set()
+    return ignored
+
+
+class GitCheckIgnore:
+    """
+    Long-lived `git check-ignore -z --stdin --non-matching -v` coprocess for one repo root.
+
+    --non-matching -v makes git answer every input path with exactly one
+    four-field record (source, linenum, pattern, path), so a batch of N paths is
+    answered by 4N NUL-terminated fields and queries can be pipelined over the same
+    process without fork/exec or git startup per call. A path counts as ignored
+    when its matching pattern is present and not a negation (`!pattern`).
+    """
+
+    # Above this many payload bytes stdin is written from a helper thread so git
+    # never blocks on a full stdout pipe while we are still writing.
+    INLINE_WRITE_LIMIT = 32 * 1024
+
+    def __init__(self, repo_root: Path):
+        self.repo_root = repo_root
+        self._lock = threading.Lock()
+        self._buf = b""
+        env = dict(os.environ, GIT_FLUSH="1")
+        self._proc = subprocess.Popen(
+            ["git", "-C", str(repo_root), "check-ignore", "-z", "--stdin", "--non-matching", "-v"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=env,
+        )
+
+    @property
+    def alive(self) -> bool:
+        return self._proc.poll() is None
+
+    def _read_field(self) -> bytes:
+        while b"\0" not in self._buf:
+            chunk = self._proc.stdout.read1(65536)
+            if not chunk:
+                raise EOFError("git check-ignore exited")
+            self._buf += chunk
+        field, _, self._buf = self._buf.partition(b"\0")
+        return field
+
+    def query(self, rels: List[str]) -> Set[str]:
+        """Return the subset of repo-relative `rels` that git ignores."""
+        ignored: Set[str] = set()
+        if not rels:
+            return ignored
+        payload = b"".join(r.encode() + b"\0" for r in rels)
+        with self._lock:
+            writer = None
+            if len(payload) > self.INLINE_WRITE_LIMIT:
+                writer = threading.Thread(target=self._write, args=(payload,), daemon=True)
+                writer.start()
+            else:
+                self._write(payload)
+            try:
+                for _ in rels:
+                    self._read_field()  # source
+                    self._read_field()  # linenum
+                    pattern = self._read_field()
+                    path = self._read_field()
+                    if pattern and not pattern.startswith(b"!"):
+                        ignored.add(path.decode())
+            finally:
+                if writer is not None:
+                    writer.join()
+        return ignored
+
+    def _write(self, payload: bytes) -> None:
+        try:
+            self._proc.stdin.write(payload)
+            self._proc.stdin.flush()
+        except (BrokenPipeError, OSError, ValueError):
+            pass  # Surfaces as EOFError on the reading side
+
+    def close(self) -> None:
+        try:
+            if self._proc.stdin:
+                self._proc.stdin.close()
+            self._proc.wait(timeout=2)
+        except Exception:
+            self._proc.kill()
+            self._proc.wait()
+        finally:
+            if self._proc.stdout:
+                self._proc.stdout.close()
+
+
+_CHECK_IGNORE_PROCS: Dict[Path, GitCheckIgnore] = {}
+_CHECK_IGNORE_LOCK = threading.Lock()
+
+
+def get_check_ignore(repo_root: Path) -> GitCheckIgnore | None:
+    """Return the shared check-ignore coprocess for repo_root, (re)starting it if needed."""
+    with _CHECK_IGNORE_LOCK:
+        proc = _CHECK_IGNORE_PROCS.get(repo_root)
+        if proc is not None and proc.alive:
+            return proc
+        if proc is not None:
+            proc.close()
+        try:
+            proc = GitCheckIgnore(repo_root)
+        except Exception:
+            _CHECK_IGNORE_PROCS.pop(repo_root, None)
+            return None
+        _CHECK_IGNORE_PROCS[repo_root] = proc
+        return proc
+
+
+def close_check_ignore_processes() -> None:
+    """Shut down every shared check-ignore coprocess (registered with atexit)."""
+    with _CHECK_IGNORE_LOCK:
+        procs = list(_CHECK_IGNORE_PROCS.values())
+        _CHECK_IGNORE_PROCS.clear()
+    for proc in procs:
+        proc.close()
+
+
+atexit.register(close_check_ignore_processes)
+
+
+def reset_ignore_state() -> None:
+    """
+    Forget the ignore rules loaded so far in this process.
+
+    Both the check-ignore coprocess and the native engine read each .gitignore
+    once, so a long-lived process must call this after ignore files change.
+    """
+    from agentspec.gitignore import clear_gitignore_cache
+
+    close_check_ignore_processes()
+    clear_gitignore_cache()
+
+
+def _git_ignored_rels(repo_root: Path, rels: List[str], engine: str = "auto") -> Set[str]:
+    """
+    Return the subset of repo-relative path strings that gitignore rules exclude.
+
+    Works on strings so callers that already know each path relative to the repo
+    (the directory walker) avoid a resolve() per entry. With engine="git" queries
+    go to the shared GitCheckIgnore coprocess, falling back to one-shot
+    `git check-ignore` runs, and an empty set if git fails. engine="native" uses
+    the subprocess-free agentspec.gitignore engine; "auto" picks git when it is
+    on PATH and switches to native if git cannot answer.
+    """
+    # Lazy import: agentspec.gitignore imports pattern helpers from this module
+    from agentspec.gitignore import get_gitignore_engine, resolve_ignore_engine
+
+    ignored: Set[str] = set()
+    if not rels:
+        return ignored
+    resolved = resolve_ignore_engine(engine)
+    if resolved == "native":
+        return get_gitignore_engine(repo_root).query(rels)
+    proc = get_check_ignore(repo_root)
+    if proc is not None:
+        try:
+            return proc.query(rels)
+        except Exception:
+            with _CHECK_IGNORE_LOCK:
+                if _CHECK_IGNORE_PROCS.get(repo_root) is proc:
+                    del _CHECK_IGNORE_PROCS[repo_root]
+            proc.close()
     try:
         # Use check-ignore with --stdin and NUL delim to handle arbitrary filenames
-        rels = [p.resolve().relative_to(repo_root) for p in paths]
         # Chunk to avoid huge stdin payloads
         CHUNK = 1024
         for i in range(0, len(rels), CHUNK):
             chunk = rels[i : i + CHUNK]
-            payload = "\0".join(str(p) for p in chunk).encode() + b"\0"
-            proc = subprocess.run(
+            payload = "\0".join(chunk).encode() + b"\0"
+            out = subprocess.run(
                 ["git", "-C", str(repo_root), "check-ignore", "-z", "--stdin"],
                 input=payload,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.DEVNULL,
-            )
-            out = proc.stdout
+            ).stdout
             if out:
                 for rel_s in out.split(b"\0"):
-                    if not rel_s:
-                        continue
-                    ignored.add((repo_root / rel_s.decode()).resolve())
+                    if rel_s:
+                        ignored.add(rel_s.decode())
     except Exception:
-        # If git is not available or fails, just return empty set
+        if engine == "auto":
+            return get_gitignore_engine(repo_root).query(rels)
         return set()
     return ignored
 
@@ -289,81 +496,459 @@ def _parse_agentspecignore(ignore_path: Path, repo_root: Path) -> List[str]:
         return []
 
 
-def _matches_pattern(path: Path, pattern: str, repo_root: Path) -> bool:
+def _translate_pattern(pattern: str) -> Tuple[str, bool, bool] | None:
     """
-    Check if a path matches a gitignore-style pattern.
-    
-    Supports:
-    - * wildcards (via fnmatch)
-    - **/ for any directory depth
-    - Leading / for absolute match from repo root
-    - Trailing / for directories only
+    Translate one gitignore-style pattern into (regex, dir_only, negate).
+
+    The regex matches a POSIX path relative to the directory holding the ignore
+    file. Supports `*`/`?`/`[...]` (not crossing `/`), leading/inner/trailing `**`,
+    a leading `/` (or any inner `/`) anchoring to the base, a trailing `/` for
+    directory-only rules and a leading `!` for negation. Returns None for blanks.
     """
-    try:
-        # Convert path to relative path from repo root
-        rel_path = path.resolve().relative_to(repo_root.resolve())
-        rel_str = str(rel_path).replace('\\', '/')  # Normalize separators
-        
-        # Handle leading / (match from root)
-        pattern = pattern.strip()
-        if pattern.startswith('/'):
-            pattern = pattern[1:]
-            # Must match from beginning
-            return fnmatch.fnmatch(rel_str, pattern) or fnmatch.fnmatch(rel_str, pattern + '/*')
-        
-        # Handle trailing / (directory only)
-        dir_only = pattern.endswith('/')
-        if dir_only:
-            pattern = pattern[:-1]
-        
-        # Handle **/ (any directory depth)
-        if pattern.startswith('**/'):
-            pattern = pattern[3:]
-        elif '**/' in pattern:
-            # Replace **/ with * for fnmatch
-            pattern = pattern.replace('**/', '*')
-        
-        # Check if any component matches
-        parts = rel_str.split('/')
-        for i in range(len(parts)):
-            test_path = '/'.join(parts[i:])
-            if fnmatch.fnmatch(test_path, pattern):
-                if dir_only:
-                    # For directory patterns, check if it's actually a directory
-                    test_full = repo_root / test_path
-                    return test_full.is_dir()
+    pat = pattern.rstrip()
+    if not pat or pat.startswith("#"):
+        return None
+    negate = pat.startswith("!")
+    if negate:
+        pat = pat[1:]
+    elif pat.startswith("\\!") or pat.startswith("\\#"):
+        pat = pat[1:]
+    dir_only = pat.endswith("/")
+    pat = pat.rstrip("/")
+    if not pat:
+        return None
+    anchored = "/" in pat
+    pat = pat.lstrip("/")
+
+    out: List[str] = []
+    i, n = 0, len(pat)
+    while i < n:
+        c = pat[i]
+        if c == "*":
+            if pat.startswith("**", i):
+                at_start = i == 0 or pat[i - 1] == "/"
+                j = i + 2
+                if at_start and (j == n or pat[j] == "/"):
+                    if j == n:
+                        out.append(".*")  # trailing /** : everything inside
+                        i = j
+                    else:
+                        out.append("(?:.*/)?")  # leading or inner **/
+                        i = j + 1
+                    continue
+                i = j
+                out.append("[^/]*")
+                continue
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            j = pat.find("]", i + 2 if pat.startswith("[!", i) or pat.startswith("[^", i) else i + 1)
+            if j == -1:
+                out.append("\\[")
+            else:
+                body = pat[i + 1:j]
+                if body[:1] in ("!", "^"):
+                    body = "^" + body[1:]
+                out.append("[" + body.replace("\\", "\\\\") + "]")
+                i = j
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(pat[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    body = "".join(out)
+    if not anchored:
+        body = "(?:.*/)?" + body
+    return body, dir_only, negate
+
+
+class IgnoreMatcher:
+    """
+    Pre-compiled matcher for a list of gitignore-style patterns.
+
+    Built once per ignore file and queried with repo-relative POSIX strings, so no
+    path resolution or filesystem access happens per query. When no pattern is
+    negated, all file rules and all directory-only rules are each folded into a
+    single alternation regex; otherwise rules are evaluated in order, last match
+    wins, as in gitignore.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.rules: List[Tuple["re.Pattern[str]", bool, bool]] = []
+        for raw in patterns:
+            translated = _translate_pattern(raw)
+            if translated:
+                body, dir_only, negate = translated
+                self.rules.append((re.compile(body + "\\Z"), dir_only, negate))
+        self._ordered = any(negate for _, _, negate in self.rules)
+        self._any_re = self._combine(r.pattern for r, d, _ in self.rules if not d)
+        self._dir_re = self._combine(r.pattern for r, d, _ in self.rules if d)
+
+    @staticmethod
+    def _combine(bodies: Iterable[str]) -> "re.Pattern[str] | None":
+        parts = [f"(?:{b})" for b in bodies]
+        return re.compile("|".join(parts)) if parts else None
+
+    @classmethod
+    def from_file(cls, ignore_path: Path) -> "IgnoreMatcher":
+        return cls(_parse_agentspecignore(ignore_path, ignore_path.parent))
+
+    def __bool__(self) -> bool:
+        return bool(self.rules)
+
+    def match(self, rel: str, is_dir: bool = False) -> bool:
+        """Return True if `rel` itself (not its parents) is matched by the rules."""
+        if not self._ordered:
+            if self._any_re is not None and self._any_re.match(rel):
                 return True
-        
-        # Also check full path
-        if fnmatch.fnmatch(rel_str, pattern):
-            if dir_only:
-                test_full = repo_root / rel_str
-                return test_full.is_dir()
-            return True
-        
-        return False
-    except Exception:
-        return False
+            return bool(is_dir and self._dir_re is not None and self._dir_re.match(rel))
+        matched = False
+        for regex, dir_only, negate in self.rules:
+            if (not dir_only or is_dir) and regex.match(rel):
+                matched = not negate
+        return matched
+
+    def is_ignored(self, rel: str, is_dir: bool = False) -> bool:
+        """Return True if `rel` or any of its parent directories is matched."""
+        parts = rel.split("/")
+        for i in range(1, len(parts)):
+            if self.match("/".join(parts[:i]), is_dir=True):
+                return True
+        return self.match(rel, is_dir=is_dir)
 
 
-def _check_agentspecignore(path: Path, repo_root: Path | None) -> bool:
-    """Check if a path is ignored by .agentspecignore. Returns True if ignored."""
+# repo root -> (ignore file stat signature, matcher); shared by lint/extract/generate
+_MATCHER_CACHE: Dict[Path, Tuple[Tuple[int, int], IgnoreMatcher]] = {}
+
+
+def get_ignore_matcher(repo_root: Path | None) -> IgnoreMatcher | None:
+    """
+    Return the compiled .agentspecignore matcher for a repo root, or None if there is none.
+
+    The matcher is cached per process and rebuilt only when the ignore file's
+    mtime or size changes, so every discovery call in a run shares one compile.
+    """
     if not repo_root:
-        return False
-    
+        return None
     ignore_file = _find_agentspecignore(repo_root)
     if not ignore_file:
+        return None
+    try:
+        st = ignore_file.stat()
+    except OSError:
+        return None
+    sig = (st.st_mtime_ns, st.st_size)
+    key = repo_root.resolve()
+    cached = _MATCHER_CACHE.get(key)
+    if cached and cached[0] == sig:
+        return cached[1]
+    matcher = IgnoreMatcher.from_file(ignore_file)
+    _MATCHER_CACHE[key] = (sig, matcher)
+    return matcher
+
+
+def _check_agentspecignore(path: Path, repo_root: Path | None) -> bool:
+    """Check if a path is ignored by .agentspecignore. Returns True if ignored."""
+    matcher = get_ignore_matcher(repo_root)
+    if not matcher:
         return False
-    
-    patterns = _parse_agentspecignore(ignore_file, repo_root)
-    for pattern in patterns:
-        if _matches_pattern(path, pattern, repo_root):
-            return True
-    
-    return False
+    try:
+        rel = path.resolve().relative_to(repo_root.resolve()).as_posix()
+    except ValueError:
+        return False
+    return matcher.is_ignored(rel, is_dir=path.is_dir())
+
+
+def _inode_key(entry: os.DirEntry) -> Tuple[int, int] | None:
+    try:
+        st = entry.stat()
+    except OSError:
+        return None
+    return (st.st_dev, st.st_ino)
+
+
+def _walk_python_files(
+    root: Path,
+    repo_root: Path | None,
+    stats: DiscoveryStats,
+    ignore_engine: str = "auto",
+    cache: "DiscoveryCache | None" = None,
+) -> Iterator[Path]:
+    """
+    Breadth-first os.scandir walk that prunes excluded and ignored directories before descending.
+
+    Yields the kept .py files of each depth level as soon as that level is filtered.
+
+    Each level is filtered with a single `git check-ignore` batch (directories and
+    .py files together) plus the .agentspecignore patterns, so ignored subtrees such
+    as node_modules, build output or gitignored data dirs are never listed. Symlinked
+    directories and files are followed but deduplicated by (st_dev, st_ino).
+
+    With a DiscoveryCache, a directory whose mtime and .gitignore are unchanged
+    since the last run reuses its recorded (already filtered) children instead of
+    being listed and checked again; a changed .gitignore forces a rescan of its
+    whole subtree. The cache is only saved when the walk runs to completion.
+    """
+    from agentspec.cache import file_signature
+
+    matcher = get_ignore_matcher(repo_root)
+    real_root = repo_root.resolve() if repo_root else None
+
+    def _rel_to_repo(real: Path) -> str | None:
+        if real_root is None:
+            return None
+        try:
+            return real.relative_to(real_root).as_posix()
+        except ValueError:
+            return None  # Reached through a symlink pointing outside the repo
+
+    seen: Set[Tuple[int, int]] = set()
+    try:
+        st = root.stat()
+        seen.add((st.st_dev, st.st_ino))
+    except OSError:
+        return
+
+    # (display path, resolved path, cache key, trusted, inode already in `seen`);
+    # display paths keep the caller's spelling, cache keys are relative to `root`
+    level: List[Tuple[Path, Path, str, bool, bool]] = [(root, root.resolve(), "", True, True)]
+    while level:
+        next_level: List[Tuple[Path, Path, str, bool, bool]] = []
+        cached_files: List[Path] = []
+        # Directories listed this round: (cache key, mtime, .gitignore signature, children trusted)
+        scanned: List[Tuple[str, int, Tuple[int, int] | None, bool]] = []
+        # Children of listed directories: (display, resolved, index into `scanned`, is symlink)
+        child_dirs: List[Tuple[Path, Path, int, bool]] = []
+        child_files: List[Tuple[Path, Path, int, bool]] = []
+        for shown, real, key, trusted, registered in level:
+            mtime = 0
+            gitignore_sig = None
+            children_trusted = trusted
+            if cache is not None:
+                try:
+                    st = os.stat(shown)
+                except OSError:
+                    continue
+                if not registered:
+                    inode = (st.st_dev, st.st_ino)
+                    if inode in seen:
+                        stats.duplicates += 1
+                        continue
+                    seen.add(inode)
+                mtime = st.st_mtime_ns
+                if repo_root:
+                    gitignore_sig = file_signature(shown / ".gitignore")
+                entry = cache.lookup(key, mtime, gitignore_sig) if trusted else None
+                if entry is not None:
+                    stats.dirs_cached += 1
+                    links = set(entry["links"])
+                    for name in entry["dirs"]:
+                        child = shown / name
+                        child_real = child.resolve() if name in links else real / name
+                        next_level.append((child, child_real, f"{key}/{name}" if key else name, True, False))
+                    cached_files.extend(shown / name for name in entry["files"])
+                    continue
+                if trusted and cache.gitignore_changed(key, gitignore_sig):
+                    children_trusted = False
+                    if repo_root:
+                        reset_ignore_state()
+            stats.dirs_scanned += 1
+            try:
+                with os.scandir(shown) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            index = len(scanned)
+            scanned.append((key, mtime, gitignore_sig, children_trusted))
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        if entry.name in DEFAULT_EXCLUDE_DIRS:
+                            stats.dirs_pruned += 1
+                            continue
+                        bucket = child_dirs
+                    elif entry.name.endswith(".py") and entry.is_file():
+                        bucket = child_files
+                    else:
+                        continue
+                    inode = _inode_key(entry)
+                    if inode is not None:
+                        if inode in seen:
+                            stats.duplicates += 1
+                            continue
+                        seen.add(inode)
+                    is_link = entry.is_symlink()
+                    child_real = Path(entry.path).resolve() if is_link else real / entry.name
+                    bucket.append((Path(entry.path), child_real, index, is_link))
+                except OSError:
+                    continue
+
+        dropped: Set[Path] = set()
+        if repo_root:
+            rel_of: Dict[str, Path] = {}
+            for children, is_dir in ((child_dirs, True), (child_files, False)):
+                for shown, real, _, _ in children:
+                    rel = _rel_to_repo(real)
+                    if rel is None:
+                        continue
+                    if matcher and matcher.match(rel, is_dir=is_dir):
+                        dropped.add(shown)
+                        continue
+                    rel_of[rel] = shown
+            for rel in _git_ignored_rels(repo_root, list(rel_of), engine=ignore_engine):
+                if rel in rel_of:
+                    dropped.add(rel_of[rel])
+
+        kept_dirs = [child for child in child_dirs if child[0] not in dropped]
+        kept_files = [child for child in child_files if child[0] not in dropped]
+        stats.dirs_pruned += len(child_dirs) - len(kept_dirs)
+        stats.files_ignored += len(child_files) - len(kept_files)
+        for shown, real, index, _ in kept_dirs:
+            key = scanned[index][0]
+            next_level.append((shown, real, f"{key}/{shown.name}" if key else shown.name, scanned[index][3], True))
+        if cache is not None:
+            listing: List[Tuple[List[str], List[str], List[str]]] = [([], [], []) for _ in scanned]
+            for children, slot in ((kept_files, 0), (kept_dirs, 1)):
+                for shown, _, index, is_link in children:
+                    listing[index][slot].append(shown.name)
+                    if is_link:
+                        listing[index][2].append(shown.name)
+            for (key, mtime, gitignore_sig, _), (files, dirs, links) in zip(scanned, listing):
+                cache.record(key, mtime, gitignore_sig, files=files, dirs=dirs, links=links)
+        level = next_level
+        yield from cached_files
+        yield from (shown for shown, _, _, _ in kept_files)
+    if cache is not None:
+        cache.save()
+
+
+def _git_ls_python_files(target: Path) -> List[str] | None:
+    """
+    List tracked and untracked-but-not-ignored .py files under a directory via one git call.
+
+    Returns paths relative to `target` (POSIX, as git prints them), or None when git
+    is unavailable or `target` is not inside a work tree so callers can fall back to
+    walking the filesystem.
+    """
+    try:
+        proc = subprocess.run(
+            ["git", "-C", str(target), "ls-files", "-z", "--cached", "--others",
+             "--exclude-standard", "--", "*.py"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+    except Exception:
+        return None
+    if proc.returncode != 0:
+        return None
+    # --cached can repeat a path once per merge stage; keep first occurrence
+    return list(dict.fromkeys(r.decode() for r in proc.stdout.split(b"\0") if r))
+
+
+def _ls_files_python_files(target: Path, repo_root: Path, stats: DiscoveryStats) -> List[Path] | None:
+    """Filter `git ls-files` output with DEFAULT_EXCLUDE_DIRS and .agentspecignore."""
+    rels = _git_ls_python_files(target)
+    if rels is None:
+        return None
+    matcher = get_ignore_matcher(repo_root)
+    prefix = ""
+    if matcher:
+        try:
+            prefix = target.resolve().relative_to(repo_root.resolve()).as_posix()
+        except ValueError:
+            return None
+        prefix = "" if prefix == "." else prefix + "/"
+
+    files: List[Path] = []
+    for rel in rels:
+        if any(part in DEFAULT_EXCLUDE_DIRS for part in rel.split("/")[:-1]):
+            stats.files_ignored += 1
+            continue
+        if matcher and matcher.is_ignored(prefix + rel):
+            stats.files_ignored += 1
+            continue
+        path = target / rel
+        # The index can still list files deleted from the work tree
+        if not os.path.isfile(path):
+            stats.files_ignored += 1
+            continue
+        files.append(path)
+    return files
 
 
-def collect_python_files(target: Path) -> List[Path]:
+def iter_python_files(
+    target: Path,
+    stats: DiscoveryStats | None = None,
+    use_git: bool = True,
+    ignore_engine: str = "auto",
+    use_cache: bool = True,
+) -> Iterator[Path]:
+    """
+    Yield Python files under `target` as they are discovered, in discovery order.
+
+    Same filtering as collect_python_files (which is this generator, materialised
+    and sorted). Consumers can start parsing files while the walk is still running;
+    `stats` is complete once the generator is exhausted.
+
+    When the filesystem walker is used, directory listings are cached under
+    `.agentspec/cache/` (see agentspec.cache.DiscoveryCache) unless `use_cache`
+    is False or AGENTSPEC_NO_CACHE is set. The `git ls-files` path needs no cache:
+    git keeps its own index.
+    """
+    # Lazy import: agentspec.gitignore imports pattern helpers from this module
+    from agentspec.gitignore import resolve_ignore_engine
+
+    if stats is None:
+        stats = DiscoveryStats()
+    engine = resolve_ignore_engine(ignore_engine)
+    stats.ignore_engine = engine
+    if target.is_file():
+        stats.strategy = "single-file"
+        if target.suffix != ".py" or _is_excluded_by_dir(target):
+            stats.files_ignored += 1
+            return
+        repo_root = _find_git_root(target)
+        if repo_root:
+            # Check .gitignore
+            ignored = _git_check_ignore(repo_root, [target], engine=ignore_engine)
+            # Check .agentspecignore
+            if target.resolve() in ignored or _check_agentspecignore(target, repo_root):
+                stats.files_ignored += 1
+                return
+        stats.files += 1
+        yield target
+        return
+
+    # Directory: a target that itself lives under an excluded dir yields nothing
+    if not target.is_dir() or _is_excluded_by_dir(target):
+        return
+
+    repo_root = _find_git_root(target)
+    files: Iterable[Path] | None = None
+    if repo_root and use_git and engine == "git":
+        files = _ls_files_python_files(target, repo_root, stats)
+        if files is not None:
+            stats.strategy = "git-ls-files"
+    if files is None:
+        from agentspec.cache import DiscoveryCache, cache_enabled
+
+        cache = DiscoveryCache.for_target(target, repo_root, engine) if cache_enabled(use_cache) else None
+        stats.strategy = "scandir+cache" if cache is not None else "scandir"
+        files = _walk_python_files(target, repo_root, stats, ignore_engine=ignore_engine, cache=cache)
+    for path in files:
+        stats.files += 1
+        yield path
+
+
+def collect_python_files(
+    target: Path,
+    stats: DiscoveryStats | None = None,
+    use_git: bool = True,
+    ignore_engine: str = "auto",
+    use_cache: bool = True,
+) -> List[Path]:
     """
     ---agentspec
     what: |
@@ -371,7 +956,17 @@ def collect_python_files(target: Path) -> List[Path]:
 
       For file input: validates .py extension and checks if the file is in an excluded directory or gitignored; returns a single-element list containing the file, or an empty list if validation fails.
 
-      For directory input: recursively globs all .py files using rglob("*.py"), filters out files in excluded directories (.venv, __pycache__, .git, build, dist, and similar), then applies .gitignore filtering if a git repository root is found.
+      For directory input: walks the tree breadth-first with os.scandir via _walk_python_files, pruning excluded directories (.venv, __pycache__, .git, build, dist, and similar) and directories matched by .gitignore/.agentspecignore before descending into them, so ignored subtrees are never listed. Symlinked files and directories are deduplicated by inode.
+
+      Inside a git work tree (and unless use_git=False) the candidate set comes from a single `git ls-files -z --cached --others --exclude-standard -- '*.py'` call instead; the walker is the fallback outside git or when that call fails. DiscoveryStats.strategy records which path was taken.
+
+      ignore_engine selects how .gitignore rules are evaluated: "git" (check-ignore coprocess), "native" (agentspec.gitignore, no subprocess; also skips the ls-files fast path) or "auto" (git when available, native otherwise).
+
+      When the walker is used, per-directory listings are cached under .agentspec/cache/ and reused for directories whose mtime (and .gitignore) did not change; use_cache=False or AGENTSPEC_NO_CACHE=1 disables this.
+
+      This is iter_python_files materialised and sorted; callers that want to start work before discovery finishes should iterate that generator instead.
+
+      An optional DiscoveryStats is filled in with the number of files found and entries skipped (pruned directories, ignored files, symlink duplicates).
 
       Returns a sorted list of absolute Path objects representing all discovered Python files that pass all filters. Returns an empty list if the target is a non-.py file, is in an excluded directory, or is gitignored.
 
@@ -423,7 +1018,7 @@ def collect_python_files(target: Path) -> List[Path]:
       - ALWAYS ensure that returned paths are absolute for consistency with downstream consumers
       - ALWAYS maintain the order of operations: suffix check → excluded dir check → gitignore check, to fail fast on obvious non-matches
       - NOTE: This function depends on external git availability; if git is not installed or the target is not in a git repository, gitignore filtering is silently skipped (not an error condition)
-      - NOTE: Performance scales with the number of .py files in the target tree; for very large codebases, gitignore queries may be slow; consider caching results if called repeatedly on the same tree
+      - NOTE: git check-ignore is invoked once per directory depth level (batched), not once per file; do not move ignore checks back to after the walk or ignored subtrees will be traversed again
 
         changelog:
           - "- 2025-10-30: feat: enhance docstring generation with optional dependencies and new CLI features"
@@ -460,35 +1055,235 @@ def collect_python_files(target: Path) -> List[Path]:
           - "- 2025-10-29: feat: honor .gitignore and .venv; add agentspec YAML generation; fix quoting; lazy-load generate"
         ---/agentspec
     """
-    if target.is_file():
-        if target.suffix != ".py" or _is_excluded_by_dir(target):
-            return []
-        repo_root = _find_git_root(target)
-        if repo_root:
-            # Check .gitignore
-            ignored = _git_check_ignore(repo_root, [target])
-            if target.resolve() in ignored:
-                return []
-            # Check .agentspecignore
-            if _check_agentspecignore(target, repo_root):
-                return []
-        return [target]
+    files = list(iter_python_files(target, stats=stats, use_git=use_git, ignore_engine=ignore_engine, use_cache=use_cache))
+    files.sort(key=lambda p: str(p))
+    return files
 
-    # Directory
-    all_files = [p for p in target.rglob("*.py") if p.is_file() and not _is_excluded_by_dir(p)]
 
-    repo_root = _find_git_root(target)
-    if repo_root:
-        # Check .gitignore
-        ignored = _git_check_ignore(repo_root, all_files)
-        files = [p for p in all_files if p.resolve() not in ignored]
-        # Check .agentspecignore
-        files = [p for p in files if not _check_agentspecignore(p, repo_root)]
+def expand_targets(targets: str | Path | Iterable[str | Path]) -> List[Path]:
+    """
+    Expand glob patterns (`*`, `?`, `[...]`, recursive `**`) in CLI targets.
+
+    Accepts a single target or an iterable of them.
+
+    Plain paths are kept as given, even if missing, so callers can report them.
+    A pattern that matches nothing is also kept literally. Duplicates (by
+    resolved path) are dropped, keeping first-seen order.
+    """
+    if isinstance(targets, (str, Path)):
+        targets = [targets]
+    expanded: List[Path] = []
+    seen: Set[Path] = set()
+    for target in map(str, targets):
+        if glob.has_magic(target):
+            matches = sorted(glob.glob(target, recursive=True)) or [target]
+        else:
+            matches = [target]
+        for match in matches:
+            path = Path(match)
+            key = path.resolve()
+            if key not in seen:
+                seen.add(key)
+                expanded.append(path)
+    return expanded
+
+
+def read_files_from(source: str) -> List[str]:
+    """
+    Read a list of paths from a file, or from stdin when `source` is "-".
+
+    The list is NUL-delimited if it contains any NUL byte (`git diff --name-only
+    -z`, `find -print0`), otherwise newline-delimited. Blank entries are skipped.
+    """
+    if source == "-":
+        data = sys.stdin.buffer.read()
     else:
-        files = all_files
+        data = Path(source).read_bytes()
+    text = data.decode("utf-8", errors="surrogateescape")
+    entries = text.split("\0") if "\0" in text else text.splitlines()
+    return [entry.rstrip("\r") for entry in entries if entry.strip()]
 
-    files.sort(key=lambda p: str(p))
-    return files
+
+def _iter_listed_files(files: Iterable[Path], stats: DiscoveryStats, ignore_engine: str) -> Iterator[Path]:
+    """
+    Filter an explicit file list without walking any directory.
+
+    Non-.py, missing and excluded-dir entries are dropped; the rest go through
+    .agentspecignore and one gitignore batch per repository.
+    """
+    roots: Dict[Path, Path | None] = {}
+    by_root: Dict[Path | None, List[Path]] = {}
+    for path in files:
+        if path.suffix != ".py" or _is_excluded_by_dir(path) or not path.is_file():
+            stats.files_ignored += 1
+            continue
+        parent = path.resolve().parent
+        if parent not in roots:
+            roots[parent] = _find_git_root(parent)
+        by_root.setdefault(roots[parent], []).append(path)
+
+    for repo_root, paths in by_root.items():
+        if repo_root is None:
+            yield from paths
+            continue
+        matcher = get_ignore_matcher(repo_root)
+        rel_of: Dict[str, Path] = {}
+        for path in paths:
+            rel = path.resolve().relative_to(repo_root).as_posix()
+            if matcher and matcher.is_ignored(rel):
+                stats.files_ignored += 1
+                continue
+            rel_of[rel] = path
+        ignored = _git_ignored_rels(repo_root, list(rel_of), engine=ignore_engine)
+        stats.files_ignored += len(ignored)
+        for rel, path in rel_of.items():
+            if rel not in ignored:
+                yield path
+
+
+def iter_target_files(
+    targets: Iterable[Path],
+    files: Iterable[Path] = (),
+    stats: DiscoveryStats | None = None,
+    use_git: bool = True,
+    ignore_engine: str = "auto",
+    use_cache: bool = True,
+    files_label: str = "files-from",
+) -> Iterator[Path]:
+    """
+    Yield Python files for several targets plus an explicit file list in one pass.
+
+    Each target is discovered with iter_python_files; `files` (e.g. from
+    --files-from, reported as `files_label`) skip discovery and are only filtered. A file reachable from more
+    than one input is yielded once and counted in `stats.duplicates`. All inputs
+    share the process-wide ignore matchers, check-ignore coprocesses and caches.
+    """
+    from agentspec.gitignore import resolve_ignore_engine
+
+    if stats is None:
+        stats = DiscoveryStats()
+    strategies: List[str] = []
+    seen: Set[Path] = set()
+
+    def _sources() -> Iterator[Path]:
+        for target in targets:
+            stats.strategy = ""
+            yield from iter_python_files(
+                target, stats=stats, use_git=use_git, ignore_engine=ignore_engine, use_cache=use_cache
+            )
+            if stats.strategy and stats.strategy not in strategies:
+                strategies.append(stats.strategy)
+        listed = list(files)
+        if listed:
+            stats.ignore_engine = resolve_ignore_engine(ignore_engine)
+            if files_label not in strategies:
+                strategies.append(files_label)
+            for path in _iter_listed_files(listed, stats, ignore_engine):
+                stats.files += 1
+                yield path
+
+    for path in _sources():
+        key = path.resolve()
+        if key in seen:
+            stats.files -= 1
+            stats.duplicates += 1
+            continue
+        seen.add(key)
+        yield path
+    stats.strategy = ", ".join(strategies)
+
+
+def iter_prefetched(items: Iterable[T], maxsize: int = 256) -> Iterator[T]:
+    """
+    Drain `items` on a background thread, handing them over through a bounded queue.
+
+    Lets the consumer (parsing, linting) overlap with a producer that mostly waits
+    on the filesystem or git. Exceptions raised by the producer are re-raised in
+    the consumer; abandoning the generator stops the producer at its next put.
+    """
+    q: "queue.Queue[Tuple[int, object]]" = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+    ITEM, ERROR, DONE = 0, 1, 2
+
+    def _put(kind: int, value: object) -> bool:
+        while not stop.is_set():
+            try:
+                q.put((kind, value), timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce() -> None:
+        try:
+            for item in items:
+                if not _put(ITEM, item):
+                    return
+        except BaseException as e:  # noqa: BLE001 - re-raised on the consumer side
+            _put(ERROR, e)
+            return
+        _put(DONE, None)
+
+    producer = threading.Thread(target=_produce, name="agentspec-prefetch", daemon=True)
+    producer.start()
+    try:
+        while True:
+            kind, value = q.get()
+            if kind == ITEM:
+                yield value  # type: ignore[misc]
+            elif kind == ERROR:
+                raise value  # type: ignore[misc]
+            else:
+                return
+    finally:
+        stop.set()
+
+
+def create_temp(path: Path) -> Tuple[int, str]:
+    """Open a new temp file next to `path` with the mode open() would give it (0666 less the umask)."""
+    for _ in range(100):
+        tmp = str(path.parent / f"{path.name}.{os.urandom(6).hex()}.tmp")
+        try:
+            return os.open(tmp, os.O_CREAT | os.O_EXCL | os.O_WRONLY | getattr(os, "O_BINARY", 0), 0o666), tmp
+        except FileExistsError:
+            continue
+    raise FileExistsError(f"no free temp file name next to {path}")
+
+
+def write_if_changed(path: Path, data: bytes) -> bool:
+    """
+    Write `data` to `path` unless the file already holds exactly these bytes.
+
+    Returns False when nothing was written, so mtimes (and anything watching them)
+    only move on real changes. Writes go to a temp file in the same directory that
+    is renamed into place: readers see the old or the new file, never a partial one.
+    An existing file keeps its permission bits.
+    """
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        st = None
+    if st is not None and st.st_size == len(data):
+        try:
+            if path.read_bytes() == data:
+                return False
+        except OSError:
+            pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = create_temp(path)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        if st is not None:
+            os.chmod(tmp, st.st_mode & 0o7777)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return True
 
 
 def load_env_from_dotenv(env_path: Optional[Path] = None, override: bool = False) -> Optional[Path]:
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+agentspec.watch
+---------------
+`agentspec watch lint|extract TARGET`: keep results in memory and redo only what changed.
+
+Every `interval` seconds the targets are rediscovered (cheap with the discovery
+cache) and each file's (mtime, size) is compared with the last pass. Only new
+or modified files are re-linted / re-extracted. Those go through the result
+cache and its per-definition entries, so an edited file only re-validates the
+docstrings that changed. Lint mode prints the reports of changed files and
+updated totals. Extract mode rewrites the export file (agent_specs.json,
+agent_specs.md or AGENT_CONTEXT.md) from the in-memory specs.
+
+Edits to .gitignore / .agentspecignore files are picked up on the next pass:
+the ignore rules are reloaded and newly ignored files count as removed.
+
+Polling needs no extra dependency and behaves the same on every platform and
+filesystem (network mounts, containers) where inotify-style events may not.
+"""
+from __future__ import annotations
+
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+from agentspec.cache import file_signature, open_result_cache
+from agentspec.extract import extract_from_file_cached, write_export
+from agentspec.lint import check_file_cached, print_file_report
+from agentspec.gitignore import _git_dir, _global_excludes_path
+from agentspec.utils import DiscoveryStats, _find_git_root, expand_targets, iter_target_files, reset_ignore_state
+
+DEFAULT_INTERVAL = 1.0
+
+
+class Watcher:
+    """In-memory results for one set of targets, refreshed file by file."""
+
+    def __init__(
+        self,
+        mode: str,
+        targets: Sequence[Path],
+        files: Sequence[Path] = (),
+        fmt: str = "markdown",
+        min_lines: int = 10,
+        use_git: bool = True,
+        ignore_engine: str = "auto",
+        use_cache: bool = True,
+    ):
+        if mode not in ("lint", "extract"):
+            raise ValueError(f"unknown watch mode: {mode}")
+        self.mode = mode
+        self.targets = list(targets)
+        self.files = list(files)
+        self.fmt = fmt
+        self.min_lines = min_lines
+        self.use_git = use_git
+        self.ignore_engine = ignore_engine
+        self.use_cache = use_cache
+        self.cache = open_result_cache(self.targets, use_cache)
+        # path -> ((mtime_ns, size), lint (errors, warnings) or extracted specs)
+        self.state: Dict[Path, Tuple[Tuple[int, int], Any]] = {}
+        # ignore file -> signature (None while it does not exist) at the last pass
+        self.ignore_files: Dict[Path, Optional[Tuple[int, int]]] = {}
+        # directory as discovered -> (resolved directory, repository root), kept between passes
+        self._dir_roots: Dict[Path, Tuple[Path, Optional[Path]]] = {}
+
+    def _ignore_paths(self, discovered: Iterable[Path]) -> Set[Path]:
+        """
+        Ignore files that can affect discovery: per repository .agentspecignore,
+        .git/info/exclude and core.excludesFile, plus a .gitignore (existing or
+        not) in every directory from a discovered file up to its repository root.
+        """
+        paths: Set[Path] = set()
+        roots: Set[Path] = set()
+        seen: Set[Path] = set()
+        starts = [t if t.is_dir() else t.parent for t in self.targets]
+        starts.extend(path.parent for path in discovered)
+        # resolve() and the upward repository search run once per directory, not per
+        # file and poll; directories no longer discovered are dropped
+        known, self._dir_roots = self._dir_roots, {}
+        for start in starts:
+            if start in self._dir_roots:
+                continue
+            entry = known.get(start)
+            if entry is None:
+                resolved = start.resolve()
+                entry = (resolved, _find_git_root(resolved))
+            self._dir_roots[start] = entry
+            directory, root = entry
+            if root is None:
+                continue
+            if root not in roots:
+                roots.add(root)
+                paths.add(root / ".agentspecignore")
+                paths.add(_git_dir(root) / "info" / "exclude")
+                excludes = _global_excludes_path(root)
+                if excludes is not None:
+                    paths.add(excludes)
+            while directory not in seen:
+                seen.add(directory)
+                paths.add(directory / ".gitignore")
+                if directory == root or root not in directory.parents:
+                    break
+                directory = directory.parent
+        return paths
+
+    def scan(self) -> Tuple[List[Path], List[Path]]:
+        """Rediscover files; return (new or modified, removed) relative to the last pass."""
+        # Ignore rules are loaded once per process; reload them when an ignore file changed
+        if any(file_signature(path) != sig for path, sig in self.ignore_files.items()):
+            reset_ignore_state()
+        current: Dict[Path, Tuple[int, int]] = {}
+        for path in iter_target_files(
+            self.targets,
+            files=self.files,
+            stats=DiscoveryStats(),
+            use_git=self.use_git,
+            ignore_engine=self.ignore_engine,
+            use_cache=self.use_cache,
+        ):
+            signature = file_signature(path)
+            if signature is not None:
+                current[path] = signature
+        changed = sorted((p for p, sig in current.items() if p not in self.state or self.state[p][0] != sig), key=str)
+        removed = sorted((p for p in self.state if p not in current), key=str)
+        self.ignore_files = {path: file_signature(path) for path in self._ignore_paths(current)}
+        for path in removed:
+            del self.state[path]
+        for path in changed:
+            self.state[path] = (current[path], self._process(path))
+        if self.cache is not None and (changed or removed):
+            self.cache.flush()
+        return changed, removed
+
+    def _process(self, path: Path) -> Any:
+        if self.mode == "lint":
+            return check_file_cached(path, min_lines=self.min_lines, cache=self.cache)
+        return extract_from_file_cached(path, cache=self.cache)
+
+    def report(self, changed: List[Path]) -> None:
+        """Print lint reports for `changed` plus totals, or rewrite the export."""
+        if self.mode == "extract":
+            specs = [spec for path in sorted(self.state, key=str) for spec in self.state[path][1]]
+            write_export(specs, self.fmt)
+            return
+        errors = warnings = 0
+        for path in sorted(self.state, key=str):
+            file_errors, file_warnings = self.state[path][1]
+            errors += len(file_errors)
+            warnings += len(file_warnings)
+            if path in changed and (file_errors or file_warnings):
+                print_file_report(path, file_errors, file_warnings)
+        status = "✅" if errors == 0 else "❌"
+        print(f"{status} {len(self.state)} files: {errors} errors, {warnings} warnings")
+
+    def close(self) -> None:
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+
+
+def run(
+    mode: str,
+    target: Union[str, Sequence[str]],
+    fmt: str = "markdown",
+    min_lines: int = 10,
+    interval: float = DEFAULT_INTERVAL,
+    use_git: bool = True,
+    ignore_engine: str = "auto",
+    use_cache: bool = True,
+    files: Optional[Sequence[str]] = None,
+    max_passes: Optional[int] = None,
+) -> int:
+    """
+    Watch until interrupted (Ctrl-C). The first pass processes everything; later
+    passes only files whose mtime or size changed, plus removals.
+
+    `max_passes` stops after that many polls; used by tests.
+    """
+    targets = expand_targets(target)
+    for missing in (t for t in targets if not t.exists()):
+        print(f"❌ Error: Path does not exist: {missing}")
+        return 1
+    watcher = Watcher(
+        mode,
+        targets,
+        files=[Path(f) for f in files or ()],
+        fmt=fmt,
+        min_lines=min_lines,
+        use_git=use_git,
+        ignore_engine=ignore_engine,
+        use_cache=use_cache,
+    )
+    passes = 0
+    try:
+        started = time.perf_counter()
+        changed, _ = watcher.scan()
+        watcher.report(changed)
+        print(f"👀 Watching {len(watcher.state)} files ({time.perf_counter() - started:.2f}s); Ctrl-C to stop")
+        while max_passes is None or passes < max_passes:
+            time.sleep(interval)
+            passes += 1
+            started = time.perf_counter()
+            changed, removed = watcher.scan()
+            if not changed and not removed:
+                continue
+            print(
+                f"\n🔁 {len(changed)} changed, {len(removed)} removed "
+                f"({time.perf_counter() - started:.2f}s)"
+            )
+            watcher.report(changed)
+    except KeyboardInterrupt:
+        print("\n👋 Stopped watching")
+    finally:
+        watcher.close()
+    return 0
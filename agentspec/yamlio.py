@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+agentspec.yamlio
+----------------
+YAML loading and dumping for spec blocks, on libyaml when PyYAML was built with it.
+
+- load_block(): yaml.safe_load semantics via CSafeLoader (pure-Python SafeLoader
+  fallback), memoised by a hash of the block text. Lint and extract read the same
+  blocks, so each distinct block is parsed once per process.
+- dump(): yaml.dump via CSafeDumper / SafeDumper.
+- YAML_BACKEND: "libyaml" or "pure-python", shown by `lint -v` / `extract -v`.
+
+Set AGENTSPEC_YAML_BACKEND=pure-python to force the fallback (e.g. to compare).
+Error messages come from the pure-Python loader (see load_block) so lint output
+does not depend on the backend. Every call gets its own copy of the memoised
+containers, so callers may change what they are given.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Tuple
+
+import yaml
+
+try:
+    from yaml import CSafeDumper as _CDumper, CSafeLoader as _CLoader
+except ImportError:  # PyYAML built without libyaml
+    _CLoader = _CDumper = None  # type: ignore[assignment,misc]
+
+if _CLoader is not None and os.environ.get("AGENTSPEC_YAML_BACKEND", "") != "pure-python":
+    SafeLoader, SafeDumper = _CLoader, _CDumper
+    YAML_BACKEND = "libyaml"
+else:
+    SafeLoader, SafeDumper = yaml.SafeLoader, yaml.SafeDumper
+    YAML_BACKEND = "pure-python"
+
+MEMO_SIZE = 4096
+
+# digest -> (ok, value or YAMLError, error text is the pure-Python wording)
+_MEMO: "OrderedDict[bytes, Tuple[bool, Any, bool]]" = OrderedDict()
+_MEMO_LOCK = threading.Lock()
+
+
+def _parse(text: str) -> Tuple[bool, Any, bool]:
+    try:
+        return True, yaml.load(text, Loader=SafeLoader), True
+    except yaml.YAMLError as e:
+        return False, e, SafeLoader is yaml.SafeLoader
+
+
+def _copy(value: Any) -> Any:
+    """Fresh containers around the (immutable) scalars of a parsed block."""
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    if isinstance(value, set):
+        return set(value)
+    return value
+
+
+def load_block(text: str, exact_errors: bool = True) -> Any:
+    """
+    yaml.safe_load(text), memoised; raises yaml.YAMLError for invalid YAML.
+
+    libyaml words its errors differently, so with exact_errors (the default) a
+    failing block is re-parsed once by the pure-Python loader for its message.
+    Callers that only need to know parsing failed pass exact_errors=False.
+    """
+    key = hashlib.blake2b(text.encode("utf-8", errors="surrogatepass"), digest_size=16).digest()
+    with _MEMO_LOCK:
+        hit = _MEMO.get(key)
+        if hit is not None:
+            _MEMO.move_to_end(key)
+    if hit is None or (exact_errors and not hit[2]):
+        hit = _parse(text) if hit is None else hit
+        if not hit[0] and exact_errors and not hit[2]:
+            try:
+                hit = (True, yaml.load(text, Loader=yaml.SafeLoader), True)  # backends disagree: trust pure Python
+            except yaml.YAMLError as e:
+                hit = (False, e, True)
+        with _MEMO_LOCK:
+            _MEMO[key] = hit
+            while len(_MEMO) > MEMO_SIZE:
+                _MEMO.popitem(last=False)
+    ok, value, _ = hit
+    if not ok:
+        raise value
+    return _copy(value)
+
+
+def dump(data: Any, **kwargs: Any) -> str:
+    """yaml.dump with the fastest available safe dumper."""
+    return yaml.dump(data, Dumper=SafeDumper, **kwargs)
+
+
+def clear_yaml_memo() -> None:
+    with _MEMO_LOCK:
+        _MEMO.clear()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Snapshot vs JSON load benchmark for agentspec
+
+Extracts the specs of a target once, multiplies them to the requested count
+(distinct file paths, same content), writes agent_specs.json and
+agent_specs.snap to a temp directory, then times a consumer that needs one
+spec:
+
+- JSON: json.load of the whole file, then a scan for the spec
+- snapshot: Snapshot() open (mmap + header) and a keyed get()
+
+and a consumer that needs every spec (json.load vs snapshot.load).
+
+Usage:
+    python scripts/bench_snapshot.py [TARGET] [--specs N] [--repeat R]
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agentspec.extract import export_json, extract_from_file  # noqa: E402
+from agentspec.snapshot import Snapshot, spec_qualnames, encode_snapshot, load  # noqa: E402
+from agentspec.utils import iter_target_files  # noqa: E402
+
+
+def best_of(repeat, fn):
+    """Best and median of `repeat` runs, in milliseconds."""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return min(times), statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("target", nargs="?", default="agentspec")
+    parser.add_argument("--specs", type=int, default=50_000, help="Specs in the benchmark files (default: 50000)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    base = [s for f in iter_target_files([Path(args.target)]) for s in extract_from_file(f)]
+    if not base:
+        print(f"No specs found under {args.target}")
+        return 1
+    # Qualnames come from the real source files; copies reuse them under new paths
+    names = spec_qualnames(base)
+    specs, qualnames = [], []
+    for i in range(args.specs):
+        spec = base[i % len(base)]
+        specs.append(replace(spec, filepath=f"copy{i // len(base)}/{spec.filepath}"))
+        qualnames.append(names[i % len(base)])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path, snap_path = Path(tmp) / "agent_specs.json", Path(tmp) / "agent_specs.snap"
+        export_json(specs, json_path)
+        snap_path.write_bytes(encode_snapshot(specs, qualnames))
+        target, qualname = specs[len(specs) // 2], qualnames[len(specs) // 2]
+
+        def json_one():
+            with json_path.open(encoding="utf-8") as f:
+                data = json.load(f)
+            return next(s for s in data if s["filepath"] == target.filepath and s["lineno"] == target.lineno)
+
+        def snap_one():
+            with Snapshot(snap_path) as snap:
+                return snap.get(target.filepath, qualname)
+
+        assert json_one() == snap_one()
+
+        def json_all():
+            with json_path.open(encoding="utf-8") as f:
+                return json.load(f)
+
+        print(f"{len(specs)} specs: JSON {json_path.stat().st_size / 1e6:.1f} MB, "
+              f"snapshot {snap_path.stat().st_size / 1e6:.1f} MB")
+        for label, fn in (
+            ("JSON, one spec", json_one),
+            ("snapshot, one spec", snap_one),
+            ("JSON, all specs", json_all),
+            ("snapshot, all specs", lambda: load(snap_path)),
+        ):
+            best, median = best_of(args.repeat, fn)
+            print(f"  {label:<22} best {best:9.2f} ms   median {median:9.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
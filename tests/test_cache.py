@@ -0,0 +1,93 @@
+"""Result cache: content-keyed hits, YAML type round-trips and LRU eviction."""
+import datetime
+
+from agentspec.cache import ResultCache, from_jsonable, result_key, to_jsonable
+from agentspec.extract import extract_from_file, extract_from_file_cached
+from agentspec.lint import check_file, check_file_cached
+
+SPEC = '''
+def f():
+    """
+    ---agentspec
+    what: |
+      Does a thing.
+    deps:
+      calls: []
+    why: Because.
+    guardrails:
+      - DO NOT break it
+    changelog:
+      - 2025-10-29: first
+    ---/agentspec
+    """
+'''
+
+
+def test_yaml_types_round_trip():
+    """Dates, bytes, sets and non-string keys from yaml.safe_load survive the JSON encoding."""
+    value = {"d": datetime.date(2025, 10, 29), 1: [b"\x00", {"a", "b"}], "__x": None}
+    assert from_jsonable(to_jsonable(value)) == value
+
+
+def test_unchanged_files_are_served_from_cache(tmp_path):
+    """Second lookups hit, including a copy of the file at another path; options are part of the key."""
+    src = tmp_path / "m.py"
+    src.write_text(SPEC)
+    cache = ResultCache(tmp_path / "results.sqlite")
+    assert check_file_cached(src, min_lines=3, cache=cache) == check_file(src, min_lines=3)
+    assert extract_from_file_cached(src, cache=cache) == extract_from_file(src)
+    cache.close()
+
+    copy = tmp_path / "copy.py"
+    copy.write_text(SPEC)
+    cache = ResultCache(tmp_path / "results.sqlite")
+    assert check_file_cached(copy, min_lines=3, cache=cache) == check_file(copy, min_lines=3)
+    specs = extract_from_file_cached(copy, cache=cache)
+    assert specs == extract_from_file(copy)
+    assert specs[0].filepath == str(copy)
+    assert specs[0].changelog == extract_from_file(copy)[0].changelog
+    assert (cache.hits, cache.misses) == (2, 0)
+    check_file_cached(copy, min_lines=50, cache=cache)
+    assert cache.misses == 1
+    cache.close()
+
+
+def test_edited_file_only_revalidates_changed_definitions(tmp_path):
+    """Per-definition entries survive edits elsewhere in the file, including shifted line numbers."""
+    def source(g_what, prefix=""):
+        return prefix + SPEC + SPEC.replace("def f():", "def g():").replace("Does a thing.", g_what)
+
+    src = tmp_path / "m.py"
+    src.write_text(source("Does a thing."))
+    cache = ResultCache(tmp_path / "results.sqlite")
+    check_file_cached(src, min_lines=3, cache=cache)
+    extract_from_file_cached(src, cache=cache)
+    assert (cache.node_hits, cache.node_misses) == (0, 4)
+    cache.close()
+
+    # Push both definitions down two lines and reword g's spec: only g is re-validated
+    src.write_text(source("Does another thing.", prefix="\n\n"))
+    cache = ResultCache(tmp_path / "results.sqlite")
+    assert check_file_cached(src, min_lines=3, cache=cache) == check_file(src, min_lines=3)
+    assert extract_from_file_cached(src, cache=cache) == extract_from_file(src)
+    assert (cache.node_hits, cache.node_misses) == (2, 2)
+    cache.close()
+
+
+def test_lru_eviction_keeps_recent_entries(tmp_path):
+    """Past the size bound the least recently used entries go first."""
+    cache = ResultCache(tmp_path / "results.sqlite", max_bytes=4000)
+    keys = [result_key(str(i).encode(), "lint") for i in range(10)]
+    for key in keys[:5]:
+        cache.put(key, "lint", {"errors": [], "warnings": [[1, "x" * 500]]})
+    cache.flush()
+    assert cache.get(keys[0]) is not None  # refresh the oldest entry
+    for key in keys[5:]:
+        cache.put(key, "lint", {"errors": [], "warnings": [[1, "x" * 500]]})
+    cache.flush()
+    info = cache.stats()
+    assert info["bytes"] <= 4000
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[9]) is not None
+    cache.close()
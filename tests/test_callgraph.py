@@ -0,0 +1,140 @@
+"""Repository call graph: name resolution across modules and the called_by inversion."""
+import json
+
+from agentspec import extract
+from agentspec.callgraph import CallGraph
+
+HELPERS = '''def helper():
+    return 1
+
+
+def unused():
+    return 2
+'''
+
+INIT = "from .helpers import helper\n"
+
+SERVICE = '''import pkg.helpers as h
+from . import helper as direct
+
+
+class Base:
+    def save(self):
+        return helper_free()
+
+
+class Service(Base):
+    def run(self):
+        self.check()
+        return direct()
+
+    def check(self):
+        def inner():
+            return h.helper()
+        return inner()
+
+    def save(self):
+        return super().save()
+
+
+def helper_free():
+    """
+    ---agentspec
+    what: |
+      Module-level function.
+    deps:
+      called_by:
+        - written.by.hand
+    ---/agentspec
+    """
+    return Service().run()
+'''
+
+
+def _package(root):
+    pkg = root / "pkg"
+    pkg.mkdir()
+    (pkg / "__init__.py").write_text(INIT)
+    (pkg / "helpers.py").write_text(HELPERS)
+    (pkg / "service.py").write_text(SERVICE)
+    return pkg
+
+
+def test_callers_resolve_aliases_methods_and_super(tmp_path):
+    pkg = _package(tmp_path)
+    graph = CallGraph.build(sorted(pkg.glob("*.py")))
+
+    assert graph.callers("pkg.helpers::helper") == [
+        "pkg.service::Service.check.<locals>.inner",
+        "pkg.service::Service.run",
+    ]
+    assert graph.callers("pkg.service::Service.check") == ["pkg.service::Service.run"]
+    assert graph.callers("pkg.service::Service.check.<locals>.inner") == ["pkg.service::Service.check"]
+    assert graph.callers("pkg.service::Base.save") == ["pkg.service::Service.save"]
+    assert graph.callers("pkg.service::helper_free") == ["pkg.service::Base.save"]
+    # A class call is a call of the class, not of its methods
+    assert graph.callers("pkg.service::Service") == ["pkg.service::helper_free"]
+    assert graph.callers("pkg.service::Service.run") == []
+    assert graph.callers("pkg.helpers::unused") == []
+    assert graph.symbol_for(pkg / "service.py", "Service.run") == "pkg.service::Service.run"
+    assert graph.symbol_at(pkg / "helpers.py", 1) == "pkg.helpers::helper"
+
+
+def test_extract_fills_called_by(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("AGENTSPEC_NO_CACHE", "1")
+    monkeypatch.chdir(tmp_path)
+    _package(tmp_path)
+
+    assert extract.run(str(tmp_path), fmt="json", use_git=False, called_by=True) == 0
+    specs = {s["name"]: s for s in json.loads((tmp_path / "agent_specs.json").read_text())}
+    # Computed callers replace the hand-written list
+    assert specs["helper_free"]["deps"]["called_by"] == ["pkg.service::Base.save"]
+
+    assert extract.run(str(tmp_path), fmt="json", use_git=False) == 0
+    specs = {s["name"]: s for s in json.loads((tmp_path / "agent_specs.json").read_text())}
+    assert specs["helper_free"]["deps"]["called_by"] == ["written.by.hand"]
+
+
+def test_collect_metadata_keeps_qualname_of_replaced_method(tmp_path, capsys):
+    """A method overwritten later in its class still looks up callers as Class.method."""
+    from agentspec.collect import collect_metadata
+
+    mod = tmp_path / "mod.py"
+    mod.write_text(
+        "class C:\n"
+        "    def f(self):\n        return 1\n\n"
+        "    def f(self):\n        return 2\n\n"
+        "    def g(self):\n        return self.f()\n"
+    )
+    graph = CallGraph.build([mod])
+    meta = collect_metadata(mod, "f", call_graph=graph)
+    assert meta["deps"]["called_by"] == ["mod::C.g"]
+
+
+def test_extract_fills_called_by_of_redefined_function(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("AGENTSPEC_NO_CACHE", "1")
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "m.py").write_text(
+        'def f():\n    """Replaced."""\n    return 1\n\n'
+        'def f():\n    """Live."""\n    return 2\n\n'
+        'def g():\n    """Caller."""\n    return f()\n'
+    )
+    graph = CallGraph.build([tmp_path / "m.py"])
+    assert graph.symbol_at(tmp_path / "m.py", 5) == "m::f"
+
+    assert extract.run(str(tmp_path), fmt="json", use_git=False, called_by=True) == 0
+    specs = json.loads((tmp_path / "agent_specs.json").read_text())
+    called_by = {s["lineno"]: s["deps"].get("called_by") for s in specs if s["name"] == "f"}
+    assert called_by == {1: ["m::g"], 5: ["m::g"]}
+
+
+def test_duplicate_module_name_warns(tmp_path, capsys):
+    for directory in ("a", "b"):
+        (tmp_path / directory).mkdir()
+        (tmp_path / directory / "tool.py").write_text("def run():\n    return 1\n")
+    graph = CallGraph.build([tmp_path / "a" / "tool.py", tmp_path / "b" / "tool.py"])
+
+    assert graph.symbol_for(tmp_path / "a" / "tool.py", "run") == "tool::run"
+    assert graph.symbol_for(tmp_path / "b" / "tool.py", "run") is None
+    out = capsys.readouterr().out
+    assert "module tool" in out and str(tmp_path / "b" / "tool.py") in out
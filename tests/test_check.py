@@ -0,0 +1,65 @@
+"""`agentspec check` matches `lint` followed by `extract`, in one pass."""
+from agentspec import check, extract, lint
+
+GOOD = '''
+def documented():
+    """
+    ---agentspec
+    what: |
+      Returns the answer to the question that nobody remembers asking anymore.
+    deps:
+      calls: []
+    why: Because.
+    guardrails:
+      - DO NOT change the answer
+    changelog:
+      - "2025-10-29: first"
+    ---/agentspec
+    """
+    return 42
+
+
+def plain():
+    """Just a docstring."""
+
+
+def missing():
+    pass
+'''
+
+
+def test_check_matches_lint_then_extract(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("AGENTSPEC_NO_CACHE", "1")
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "mod.py").write_text(GOOD)
+    (tmp_path / "bad.py").write_text("def broken(:\n")
+
+    # extract prints its own parse warning, which check folds into the lint report
+    extract_code = extract.run(str(tmp_path), fmt="json", use_git=False)
+    extracted = (tmp_path / "agent_specs.json").read_text()
+    capsys.readouterr()
+    lint_code = lint.run(str(tmp_path), use_git=False)
+    separate = capsys.readouterr().out
+    (tmp_path / "agent_specs.json").unlink()
+
+    code = check.run(str(tmp_path), fmt="json", use_git=False)
+    combined = capsys.readouterr().out
+    assert code == max(lint_code, extract_code) == 1
+    assert combined.startswith(separate)
+    assert "Extracted 2 specs" in combined
+    assert (tmp_path / "agent_specs.json").read_text() == extracted
+
+
+def test_check_fills_lint_and_extract_cache_entries(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("AGENTSPEC_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.chdir(tmp_path)
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "mod.py").write_text(GOOD)
+
+    check.run(str(src), use_git=False, verbose=True)
+    assert "0 hits, 2 misses" in capsys.readouterr().out
+    lint.run(str(src), use_git=False, verbose=True)
+    extract.run(str(src), use_git=False, verbose=True)
+    out = capsys.readouterr().out
+    assert out.count("1 hits, 0 misses") == 2
@@ -0,0 +1,152 @@
+"""JSON Lines export: one compact record per spec, matching the JSON export's entries."""
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from agentspec import extract
+
+SOURCE = '''def alpha():
+    """
+    ---agentspec
+    what: |
+      Returns one.
+    changelog:
+      - 2025-01-02
+    ---/agentspec
+    """
+    return 1
+
+
+def beta():
+    """Plain docstring."""
+'''
+
+
+def test_jsonl_streams_records_to_stdout(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("AGENTSPEC_NO_CACHE", "1")
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "mod.py").write_text(SOURCE)
+    (tmp_path / "empty.py").write_text("x = 1\n")
+
+    assert extract.run(str(tmp_path), fmt="jsonl", use_git=False, output="-") == 0
+    captured = capsys.readouterr()
+    lines = captured.out.splitlines()
+    assert len(lines) == 2 and ", " not in lines[1]
+    records = [json.loads(line) for line in lines]
+    assert [r["name"] for r in records] == ["alpha", "beta"]
+    # A bare YAML date would make json.dump fail; the stream writes it as text
+    assert records[0]["changelog"] == ["2025-01-02"]
+    assert "✅ Extracted 2 specs → stdout" in captured.err
+    assert not (tmp_path / "agent_specs.jsonl").exists()
+
+
+def test_jsonl_file_matches_json_export(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("AGENTSPEC_NO_CACHE", "1")
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "mod.py").write_text(SOURCE.replace("- 2025-01-02", "- '2025-01-02'"))
+
+    assert extract.run(str(tmp_path), fmt="jsonl", use_git=False) == 0
+    assert extract.run(str(tmp_path), fmt="json", use_git=False, output="out.json") == 0
+    streamed = [json.loads(line) for line in (tmp_path / "agent_specs.jsonl").read_text().splitlines()]
+    assert streamed == json.loads((tmp_path / "out.json").read_text())
+
+    # An interrupted run leaves the previous export whole and no temp file behind
+    before = (tmp_path / "agent_specs.jsonl").read_text()
+    with monkeypatch.context() as patch, pytest.raises(KeyboardInterrupt):
+        patch.setattr(extract, "spec_to_dict", lambda s: (_ for _ in ()).throw(KeyboardInterrupt))
+        extract.run(str(tmp_path), fmt="jsonl", use_git=False)
+    assert (tmp_path / "agent_specs.jsonl").read_text() == before
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["agent_specs.jsonl", "mod.py", "out.json"]
+
+    # No specs: the stale export is removed rather than left for readers
+    (tmp_path / "mod.py").write_text("x = 1\n")
+    assert extract.run(str(tmp_path), fmt="jsonl", use_git=False) == 1
+    assert not (tmp_path / "agent_specs.jsonl").exists()
+
+
+def test_agent_context_shards_rewrite_only_changed_modules(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("AGENTSPEC_NO_CACHE", "1")
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "mod.py").write_text(SOURCE)
+    (tmp_path / "other.py").write_text('def gamma():\n    """Other docstring."""\n')
+
+    assert extract.run(".", fmt="agent-context", use_git=False, shard=True) == 0
+    assert "(2 shards written, 0 unchanged, 0 removed)" in capsys.readouterr().out
+    out = tmp_path / "agent_context"
+    index = json.loads((out / "index.json").read_text())["shards"]
+    assert {module: entry["path"] for module, entry in index.items()} == {
+        "other.py": "other.md",
+        "pkg/mod.py": "pkg/mod.md",
+    }
+    assert index["pkg/mod.py"]["specs"] == 2
+    shard = (out / "pkg" / "mod.md").read_text()
+    assert "# 🤖 AGENT CONTEXT: pkg/mod.py" in shard and "SPEC: alpha" in shard and "gamma" not in shard
+
+    untouched = (out / "other.md").stat().st_mtime_ns
+    index_mtime = (out / "index.json").stat().st_mtime_ns
+    assert extract.run(".", fmt="agent-context", use_git=False, shard=True) == 0
+    assert "(0 shards written, 2 unchanged, 0 removed)" in capsys.readouterr().out
+    assert (out / "index.json").stat().st_mtime_ns == index_mtime
+
+    (tmp_path / "pkg" / "mod.py").write_text(SOURCE.replace("Returns one.", "Returns two."))
+    assert extract.run(".", fmt="agent-context", use_git=False, shard=True) == 0
+    assert "(1 shards written, 1 unchanged, 0 removed)" in capsys.readouterr().out
+    assert "Returns two." in (out / "pkg" / "mod.md").read_text()
+    assert (out / "other.md").stat().st_mtime_ns == untouched
+
+    (tmp_path / "pkg" / "mod.py").unlink()
+    assert extract.run(".", fmt="agent-context", use_git=False, shard=True) == 0
+    assert "(0 shards written, 1 unchanged, 1 removed)" in capsys.readouterr().out
+    assert not (out / "pkg").exists()
+    assert list(json.loads((out / "index.json").read_text())["shards"]) == ["other.py"]
+
+    # The last module losing its specs still prunes its shard; a shard already gone is not counted
+    (tmp_path / "other.py").write_text("def gamma():\n    pass\n")
+    (out / "other.md").unlink()
+    assert extract.run(".", fmt="agent-context", use_git=False, shard=True) == 1
+    assert "(0 shards removed)" in capsys.readouterr().out
+    assert json.loads((out / "index.json").read_text())["shards"] == {}
+
+
+def test_agent_context_shard_paths_do_not_collide(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert extract.shard_path("../x/a.py") == extract.shard_path("x/a.py")
+    paths = extract._shard_paths(["../x/a.py", "x/a.py", "x/b.py"])
+    assert paths["x/a.py"] == "x/a.md" and paths["x/b.py"] == "x/b.md"
+    assert paths["../x/a.py"].startswith("x/a.") and paths["../x/a.py"] != "x/a.md"
+
+
+def test_exports_report_unchanged_and_keep_mtime(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("AGENTSPEC_NO_CACHE", "1")
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "mod.py").write_text(SOURCE.replace("- 2025-01-02", "- '2025-01-02'"))
+
+    outputs = (
+        ("markdown", "agent_specs.md"),
+        ("json", "agent_specs.json"),
+        ("agent-context", "AGENT_CONTEXT.md"),
+        ("jsonl", "agent_specs.jsonl"),
+    )
+    for fmt, name in outputs:
+        assert extract.run(".", fmt=fmt, use_git=False) == 0
+        assert "(unchanged)" not in capsys.readouterr().out
+        out = tmp_path / name
+        os.utime(out, ns=(1_000_000_000, 1_000_000_000))
+        assert extract.run(".", fmt=fmt, use_git=False) == 0
+        assert f"→ {name} (unchanged)" in capsys.readouterr().out
+        assert out.stat().st_mtime_ns == 1_000_000_000
+
+    # The collected (non-streaming) JSON Lines path compares too, and drops its temp file
+    specs = extract.extract_from_file(Path("mod.py"))
+    assert extract.write_export(specs, "jsonl") == 0
+    assert "→ agent_specs.jsonl (unchanged)" in capsys.readouterr().out
+    assert (tmp_path / "agent_specs.jsonl").stat().st_mtime_ns == 1_000_000_000
+    assert not list(tmp_path.glob("*.tmp"))
+
+    (tmp_path / "mod.py").write_text(SOURCE.replace("Returns one.", "Returns two."))
+    assert extract.run(".", fmt="markdown", use_git=False) == 0
+    assert "(unchanged)" not in capsys.readouterr().out
+    assert "Returns two." in (tmp_path / "agent_specs.md").read_text()
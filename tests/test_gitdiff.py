@@ -0,0 +1,82 @@
+"""Incremental mode: diff hunks map to enclosing definitions; other files are skipped."""
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from agentspec import lint
+from agentspec.gitdiff import GitDiffError, load_changes, parse_diff
+from agentspec.parsed import parse_source
+
+SOURCE = '''import os
+
+
+def one():
+    """Doc."""
+    return 1
+
+
+class K:
+    """K doc."""
+
+    @staticmethod
+    def meth():
+        return 2
+
+
+def three():
+    return 3
+'''
+
+
+def _git(root: Path, *args: str) -> None:
+    subprocess.run(["git", "-C", str(root), *args], check=True, stdout=subprocess.DEVNULL)
+
+
+def test_parse_diff_keeps_new_side_lines():
+    diff = (
+        "diff --git a/x.py b/y.py\n--- a/x.py\n+++ b/y.py\n"
+        "@@ -3,0 +4,2 @@ def f():\n+++ content, not a header\n+b\n"
+        "@@ -10,2 +11,0 @@\n"
+        "@@ -20 +20 @@\n-old\n+new\n"
+        "diff --git a/gone.py b/gone.py\n--- a/gone.py\n+++ /dev/null\n@@ -1 +0,0 @@\n-x\n"
+    )
+    assert parse_diff(diff) == {"y.py": frozenset({4, 5, 11, 20})}
+
+
+def test_defs_touching_picks_innermost_definition():
+    module = parse_source(SOURCE)
+    names = lambda lines: [n.name for n in module.defs_touching(lines)]  # noqa: E731
+    assert names([1]) == []  # module-level import
+    assert names([12, 14]) == ["meth"]  # decorator line and body
+    assert names([10, 18, 19]) == ["K", "three"]
+
+
+@pytest.mark.skipif(subprocess.run(["git", "--version"], capture_output=True).returncode != 0, reason="git missing")
+def test_lint_changed_since_only_reports_changed_definitions(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("AGENTSPEC_NO_CACHE", "1")
+    monkeypatch.chdir(tmp_path)
+    _git(tmp_path, "init", "-q")
+    _git(tmp_path, "config", "user.email", "dev@example.com")
+    _git(tmp_path, "config", "user.name", "dev")
+    (tmp_path / "a.py").write_text(SOURCE)
+    (tmp_path / "b.py").write_text("def untouched():\n    return 0\n")
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "-qm", "init")
+    _git(tmp_path, "branch", "base")
+
+    (tmp_path / "a.py").write_text(SOURCE.replace("return 2", "return 22"))
+    (tmp_path / "c.py").write_text("def fresh():\n    pass\n")
+
+    changes = load_changes([tmp_path], since="base")
+    assert changes.lines == {Path("a.py"): frozenset({14}), Path("c.py"): None}
+
+    assert lint.run(str(tmp_path), use_git=False, changed_since="base") == 1
+    out = capsys.readouterr().out
+    assert "meth missing docstring" in out and "fresh missing docstring" in out
+    assert "three" not in out and "untouched" not in out and "one" not in out
+
+    _git(tmp_path, "add", "a.py")
+    assert load_changes([tmp_path], staged=True).lines == {Path("a.py"): frozenset({14})}
+    with pytest.raises(GitDiffError):
+        load_changes([tmp_path], since="no-such-ref")
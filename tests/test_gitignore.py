@@ -0,0 +1,91 @@
+"""Parity tests: agentspec.gitignore.GitignoreEngine vs `git check-ignore` on generated trees."""
+import random
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from agentspec.gitignore import GitignoreEngine
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+
+NAMES = ["src", "lib", "build", "data", "docs", "a", "b", "tmp", "gen"]
+FILES = ["x.py", "y.py", "x_pb2.py", "test_x.py", "keep.py", "notes.txt", "a.log", "build.py"]
+PATTERNS = [
+    "*.log", "build/", "/data", "tmp", "*_pb2.py", "!keep.py", "docs/**/x.py", "**/gen",
+    "a/b", "test_?.py", "[xy].py", "!y.py", "lib/**", "src/*.txt", "b/", "!/data", "#comment",
+    "\\#notcomment", "*.py", "!src/", "gen/**/*.py",
+]
+
+
+def _git(cwd: Path, *args: str, **kwargs):
+    kwargs.setdefault("check", True)
+    return subprocess.run(["git", "-C", str(cwd), *args], **kwargs)
+
+
+def _make_tree(root: Path, rng: random.Random) -> list:
+    paths = []
+    for _ in range(40):
+        depth = rng.randint(0, 3)
+        parts = [rng.choice(NAMES) for _ in range(depth)]
+        rel = "/".join(parts + [rng.choice(FILES)])
+        target = root / rel
+        if any((root / "/".join(parts[:i + 1])).is_file() for i in range(depth)) or target.is_dir():
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text("x\n")
+    for p in root.rglob("*"):
+        if ".git" in p.relative_to(root).parts:
+            continue
+        paths.append(p.relative_to(root).as_posix())
+    dirs = sorted({str(Path(p).parent) for p in paths if "/" in p} | {""})
+    for d in rng.sample(dirs, k=min(len(dirs), 4)):
+        rules = rng.sample(PATTERNS, k=rng.randint(1, 6))
+        (root / d / ".gitignore").write_text("\n".join(rules) + "\n")
+    return sorted(set(paths))
+
+
+@pytest.fixture
+def isolated_git(tmp_path, monkeypatch):
+    """Keep the developer's global git config and excludes out of the comparison."""
+    home = tmp_path / "home"
+    home.mkdir()
+    monkeypatch.setenv("HOME", str(home))
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(home / ".config"))
+    monkeypatch.setenv("GIT_CONFIG_NOSYSTEM", "1")
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _git(repo, "init", "-q")
+    return repo
+
+
+def _git_ignored(repo: Path, rels: list) -> set:
+    out = _git(repo, "check-ignore", "-z", "--stdin", input="\0".join(rels).encode() + b"\0",
+               stdout=subprocess.PIPE, check=False).stdout
+    return {r.decode() for r in out.split(b"\0") if r}
+
+
+@pytest.mark.parametrize("seed", range(12))
+def test_native_engine_matches_git(isolated_git, seed):
+    """Generated trees with nested .gitignore files classify identically."""
+    repo = isolated_git
+    rng = random.Random(seed)
+    rels = _make_tree(repo, rng)
+    (repo / ".git" / "info").mkdir(exist_ok=True)
+    (repo / ".git" / "info" / "exclude").write_text(rng.choice(PATTERNS) + "\n")
+    rels = [r for r in rels if not r.endswith(".gitignore")]
+    assert GitignoreEngine(repo).query(rels) == _git_ignored(repo, rels)
+
+
+def test_core_excludes_file_is_honoured(isolated_git):
+    """core.excludesFile from the repo config is read without running git."""
+    repo = isolated_git
+    excludes = repo.parent / "global_ignore"
+    excludes.write_text("*.secret.py\n")
+    _git(repo, "config", "core.excludesFile", str(excludes))
+    (repo / "pkg").mkdir()
+    (repo / "pkg" / "a.secret.py").write_text("")
+    (repo / "pkg" / "a.py").write_text("")
+    rels = ["pkg/a.secret.py", "pkg/a.py"]
+    assert GitignoreEngine(repo).query(rels) == _git_ignored(repo, rels) == {"pkg/a.secret.py"}
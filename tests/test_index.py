@@ -0,0 +1,111 @@
+"""SQLite spec index: relational tables, FTS queries and incremental rebuilds."""
+import sqlite3
+from pathlib import Path
+
+from agentspec import index
+
+SOURCE = '''import subprocess
+
+
+def export_users():
+    """
+    ---agentspec
+    what: |
+      Dumps the user table through pg_dump.
+    deps:
+      calls:
+        - subprocess.run
+    guardrails:
+      - DO NOT write PII to logs
+    changelog:
+      - "2025-01-02: first version"
+    ---/agentspec
+    """
+    subprocess.run(["pg_dump"])
+
+
+def ping():
+    """
+    ---agentspec
+    what: |
+      Health check.
+    deps:
+      calls:
+        - subprocess.run
+    guardrails:
+      - DO NOT block
+    ---/agentspec
+    """
+'''
+
+PII_CALLERS = """
+    SELECT s.name FROM specs s
+    JOIN calls c ON c.spec_id = s.id AND c.callee = 'subprocess.run'
+    JOIN spec_text ON spec_text.rowid = s.id
+    WHERE spec_text MATCH 'guardrails:PII'
+"""
+
+
+def test_build_query_and_incremental_update(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("AGENTSPEC_NO_CACHE", "1")
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "ops.py").write_text(SOURCE)
+    (tmp_path / "other.py").write_text('def noop():\n    """Does nothing."""\n')
+
+    assert index.build(str(tmp_path), use_git=False) == 0
+    assert "(2 updated, 0 removed, 0 unchanged" in capsys.readouterr().out
+    db = sqlite3.connect("agent_specs.db")
+    assert db.execute(PII_CALLERS).fetchall() == [("export_users",)]
+    assert db.execute("SELECT entry FROM changelog").fetchall() == [("2025-01-02: first version",)]
+    assert db.execute("SELECT COUNT(*) FROM specs").fetchone() == (3,)
+    db.close()
+
+    assert index.build(str(tmp_path), use_git=False) == 0
+    assert "(0 updated, 0 removed, 2 unchanged" in capsys.readouterr().out
+
+    (tmp_path / "ops.py").write_text(SOURCE.replace("DO NOT block", "DO NOT log PII either"))
+    (tmp_path / "other.py").unlink()
+    assert index.build(str(tmp_path), use_git=False) == 0
+    assert "(1 updated, 1 removed, 0 unchanged" in capsys.readouterr().out
+    db = sqlite3.connect("agent_specs.db")
+    assert sorted(db.execute(PII_CALLERS).fetchall()) == [("export_users",), ("ping",)]
+    assert db.execute("SELECT COUNT(*) FROM specs").fetchone() == (2,)
+    assert db.execute("SELECT COUNT(*) FROM spec_text").fetchone() == (2,)
+    db.close()
+
+    assert index.search("pii", limit=5) == 0
+    assert "ops.py" in capsys.readouterr().out
+    assert index.search("nothing-like-this") == 1
+    capsys.readouterr()
+    for blank in ("", "   "):
+        assert index.search(blank) == 1
+        assert "Empty search text" in capsys.readouterr().out
+    database = index.SpecDatabase(Path("agent_specs.db"))
+    assert database.search(" \t") == []
+    database.close()
+
+
+def test_search_is_read_only_and_rejects_non_databases(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("AGENTSPEC_NO_CACHE", "1")
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "ops.py").write_text(SOURCE)
+    assert index.build(str(tmp_path), use_git=False) == 0
+    before = (tmp_path / "agent_specs.db").read_bytes()
+    assert index.search("pii") == 0
+    assert (tmp_path / "agent_specs.db").read_bytes() == before
+
+    (tmp_path / "notes.txt").write_text("not a database\n" * 100)
+    capsys.readouterr()
+    assert index.search("pii", db_path="notes.txt") == 1
+    assert "cannot open notes.txt" in capsys.readouterr().out
+    assert (tmp_path / "notes.txt").read_text() == "not a database\n" * 100
+
+
+def test_index_reports_missing_sqlite(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "ops.py").write_text(SOURCE)
+    monkeypatch.setattr(index, "sqlite3", None)
+    assert index.build(str(tmp_path), use_git=False) == 1
+    assert index.search("pii") == 1
+    assert capsys.readouterr().out.count("built without sqlite3") == 2
+    assert not (tmp_path / "agent_specs.db").exists()
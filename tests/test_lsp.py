@@ -0,0 +1,106 @@
+"""Language server: framing, incremental edits, per-definition re-validation and hover."""
+import io
+
+from agentspec import lint
+from agentspec.lsp import LanguageServer, apply_change, read_message, write_message
+
+SOURCE = '''def alpha():
+    """
+    ---agentspec
+    what: |
+      Returns one, which the rest of the module relies on as the unit value.
+    guardrails:
+      - DO NOT return zero
+    ---/agentspec
+    """
+    return 1
+
+
+def beta():
+    return 2
+'''
+URI = "file:///tmp/project/mod.py"
+
+
+def _frame(*messages):
+    stream = io.BytesIO()
+    for message in messages:
+        write_message(stream, {"jsonrpc": "2.0", **message})
+    stream.seek(0)
+    return stream
+
+
+def _run(*messages):
+    out = io.BytesIO()
+    code = LanguageServer(_frame(*messages), out).serve()
+    out.seek(0)
+    replies = []
+    while True:
+        message = read_message(out)
+        if message is None:
+            return code, replies
+        replies.append(message)
+
+
+def _diagnostics(replies):
+    return [m["params"]["diagnostics"] for m in replies if m.get("method") == "textDocument/publishDiagnostics"]
+
+
+def test_apply_change_uses_utf16_columns():
+    text = "a = '😀x'\nb = 2\n"
+    edit = {"range": {"start": {"line": 0, "character": 7}, "end": {"line": 0, "character": 8}}, "text": "y"}
+    assert apply_change(text, edit) == "a = '😀y'\nb = 2\n"
+    assert apply_change(text, {"text": "whole"}) == "whole"
+
+
+def test_session_publishes_diagnostics_and_hover(monkeypatch):
+    validated = []
+    real = lint.AgentSpecLinter._validate_doc
+    monkeypatch.setattr(
+        lint.AgentSpecLinter, "_validate_doc", lambda self, node, doc: validated.append(node.name) or real(self, node, doc)
+    )
+    # Add a docstring to beta: lines 13-14 become three lines
+    edit = {
+        "range": {"start": {"line": 13, "character": 0}, "end": {"line": 13, "character": 0}},
+        "text": '    """Plain docstring."""\n',
+    }
+    code, replies = _run(
+        {"id": 1, "method": "initialize", "params": {"initializationOptions": {"minLines": 2}}},
+        {"method": "initialized", "params": {}},
+        {"method": "textDocument/didOpen", "params": {"textDocument": {"uri": URI, "languageId": "python", "version": 1, "text": SOURCE}}},
+        {"method": "textDocument/didChange", "params": {"textDocument": {"uri": URI, "version": 2}, "contentChanges": [edit]}},
+        {"id": 2, "method": "textDocument/hover", "params": {"textDocument": {"uri": URI}, "position": {"line": 9, "character": 4}}},
+        {"id": 3, "method": "workspace/symbol", "params": {"query": ""}},
+        {"method": "$/cancelRequest", "params": {"id": 99}},
+        {"id": 4, "method": "shutdown"},
+        {"method": "exit"},
+    )
+    assert code == 0
+    init = replies[0]["result"]
+    assert init["capabilities"]["textDocumentSync"]["change"] == 2 and init["capabilities"]["hoverProvider"]
+
+    opened, changed = _diagnostics(replies)
+    assert (12, 1, "beta missing docstring") in [(d["range"]["start"]["line"], d["severity"], d["message"]) for d in opened]
+    assert [d for d in changed if "alpha" in d["message"]] == [d for d in opened if "alpha" in d["message"]]
+    assert [d["message"] for d in changed if "beta" in d["message"]] == ["beta missing agentspec fenced block"]
+    # alpha's docstring was validated once; the edit only re-validated beta
+    assert validated == ["alpha", "beta", "beta"]
+
+    hover = next(m for m in replies if m.get("id") == 2)["result"]["contents"]["value"]
+    assert "**def alpha**" in hover and "Returns one" in hover and "- DO NOT return zero" in hover
+    assert next(m for m in replies if m.get("id") == 3)["error"]["code"] == -32601
+    assert not any(m.get("id") == 99 for m in replies)
+
+
+def test_syntax_error_keeps_previous_diagnostics():
+    broken = {"range": {"start": {"line": 13, "character": 0}, "end": {"line": 14, "character": 0}}, "text": "    return (\n"}
+    code, replies = _run(
+        {"method": "textDocument/didOpen", "params": {"textDocument": {"uri": URI, "version": 1, "text": SOURCE}}},
+        {"method": "textDocument/didChange", "params": {"textDocument": {"uri": URI, "version": 2}, "contentChanges": [broken]}},
+        {"method": "textDocument/didClose", "params": {"textDocument": {"uri": URI}}},
+    )
+    assert code == 1  # input ended without shutdown/exit
+    opened, broken_diags, closed = _diagnostics(replies)
+    assert [d["message"] for d in broken_diags[:-1]] == [d["message"] for d in opened]
+    assert broken_diags[-1]["message"].startswith("Syntax error:")
+    assert closed == []
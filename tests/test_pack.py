@@ -0,0 +1,69 @@
+"""Token-budgeted agent context: ranking signals and full/compact packing."""
+from agentspec import extract
+from agentspec.extract import AgentSpec, agent_context_section
+from agentspec.pack import compact_section, estimate_tokens, pack_agent_context, rank_specs
+
+
+def _spec(name, filepath="mod.py", guardrails=(), calls=(), changelog=(), what="Does a thing.\n\nMore detail."):
+    return AgentSpec(
+        name=name,
+        lineno=1,
+        filepath=filepath,
+        raw_block="x" * 400,
+        parsed_data={"what": what},
+        what=what,
+        deps={"calls": list(calls)},
+        guardrails=list(guardrails),
+        changelog=list(changelog),
+    )
+
+
+def test_rank_uses_guardrails_fan_in_recency_and_focus(tmp_path):
+    guarded = _spec("guarded", guardrails=["DO NOT a", "DO NOT b", "DO NOT c", "DO NOT d"])
+    popular = _spec("popular")
+    callers = [_spec(f"caller{i}", calls=["pkg.popular", "len"]) for i in range(7)]
+    recent = _spec("recent", changelog=["- 2025-06-01: touched (abc1234)"])
+    stale = _spec("stale", changelog=["- 2023-01-01: touched (abc1234)"])
+    focused = _spec("focused", filepath=str(tmp_path / "focus" / "mod.py"))
+
+    order = [s.name for _, s in rank_specs([stale, recent, popular, guarded, *callers])]
+    # 2 * log2(8) = 6 > 4 guardrails > recency 3.0 (newest) > decayed recency
+    assert order[:4] == ["popular", "guarded", "recent", "stale"]
+    order = [s.name for _, s in rank_specs([guarded, focused], focus=[str(tmp_path / "focus")])]
+    assert order == ["focused", "guarded"]
+
+
+def test_pack_keeps_full_then_compact_within_budget():
+    specs = [_spec(f"f{i}", guardrails=["DO NOT x"] * (5 - i)) for i in range(5)]
+    # Header and summary line, then room for two full sections, the compact heading and two compact ones
+    overhead = estimate_tokens(pack_agent_context([], 10**6)[0]) + estimate_tokens("## Compact specs (what + guardrails)\n\n")
+    budget = (
+        overhead
+        + sum(estimate_tokens(agent_context_section(s)) for s in specs[:2])
+        + sum(estimate_tokens(compact_section(s)) for s in specs[2:4])
+    )
+    text, stats = pack_agent_context(specs, budget)
+    assert (stats.full, stats.compact, stats.omitted) == (2, 2, 1)
+    assert estimate_tokens(text) <= budget
+    assert text.index("## SPEC: f0") < text.index("## SPEC: f1") < text.index("### f2")
+    assert "### f3" in text and "f4" not in text
+    assert "More detail." not in text.split("## Compact specs")[1]
+    assert "2 full, 2 compact, 1 omitted" in text
+
+
+def test_extract_token_budget(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("AGENTSPEC_NO_CACHE", "1")
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "mod.py").write_text('def alpha():\n    """Alpha."""\n\n\ndef beta():\n    """Beta."""\n')
+    assert extract.run(".", fmt="agent-context", use_git=False, token_budget=10_000) == 0
+    assert "Packed 2 of 2 specs" in capsys.readouterr().out
+    assert "## SPEC: alpha" in (tmp_path / "AGENT_CONTEXT.md").read_text()
+
+
+def test_compact_heading_is_only_charged_when_a_compact_spec_fits():
+    small = _spec("small", guardrails=["DO NOT a", "DO NOT b"])
+    huge = _spec("huge", guardrails=["DO NOT " + "x" * 50_000])
+    _, alone = pack_agent_context([small], 10_000)
+    _, stats = pack_agent_context([small, huge], 10_000)
+    assert (stats.full, stats.compact, stats.omitted) == (1, 0, 1)
+    assert stats.tokens == alone.tokens
@@ -0,0 +1,69 @@
+"""Ordered process-pool map: input order, lookups kept in-process, small-run fallback."""
+from agentspec import extract, lint, parallel
+from agentspec.parallel import ParallelStats, ordered_map
+
+
+def test_ordered_map_keeps_input_order_across_workers_and_lookups():
+    """Pool results and lookup hits interleave back into exactly the input order."""
+    items = list(range(-100, 0))
+    stats = ParallelStats()
+    lookup = lambda n: "hit" if n % 3 == 0 else None  # noqa: E731 - runs in the parent only
+    out = list(ordered_map(abs, items, jobs=2, lookup=lookup, stats=stats, threshold=10))
+    assert [item for item, _, _ in out] == items
+    assert all(r == ("hit" if n % 3 == 0 else -n) for n, r, _ in out)
+    assert all(computed == (n % 3 != 0) for n, _, computed in out)
+    # The first `threshold` misses are computed in-process before the pool starts
+    assert stats.cached == 33 and stats.in_workers == 57 and stats.in_process == 10
+
+
+def test_small_runs_stay_in_process():
+    stats = ParallelStats()
+    out = list(ordered_map(abs, [-3, -2, -1], jobs=8, stats=stats))
+    assert [r for _, r, _ in out] == [3, 2, 1]
+    assert stats.in_workers == 0 and stats.in_process == 3
+
+
+def test_results_stream_before_the_pool_starts():
+    """With few misses among many hits, nothing waits for the input to run out."""
+    consumed = []
+
+    def items():
+        for n in range(1, 200):
+            consumed.append(n)
+            yield n
+
+    lookup = lambda n: None if n % 50 == 0 else "hit"  # noqa: E731
+    out = ordered_map(abs, items(), jobs=4, lookup=lookup)
+    first = [next(out) for _ in range(60)]
+    assert [item for item, _, _ in first] == list(range(1, 61))
+    assert first[49] == (50, 50, True)
+    assert len(consumed) == 60
+    list(out)
+
+
+def test_lint_and_extract_match_serial_with_jobs(tmp_path, monkeypatch, capsys):
+    """Forcing the pool on a small tree prints and exports the same as --jobs 1."""
+    monkeypatch.setenv("AGENTSPEC_NO_CACHE", "1")
+    monkeypatch.chdir(tmp_path)
+    for i in range(12):
+        (tmp_path / f"m{i:02}.py").write_text(f'def f{i}():\n    """Doc {i}."""\n    return {i}\n')
+    (tmp_path / "bad.py").write_text("def broken(:\n")
+    monkeypatch.setattr(parallel, "PARALLEL_THRESHOLD", 2)
+    pools = []
+
+    class RecordingPool(parallel.ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            pools.append(self)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(parallel, "ProcessPoolExecutor", RecordingPool)
+
+    outputs = []
+    for jobs in (1, 2):
+        lint.run(str(tmp_path), use_git=False, jobs=jobs)
+        extract.run(str(tmp_path), fmt="json", use_git=False, jobs=jobs)
+        outputs.append((capsys.readouterr().out, (tmp_path / "agent_specs.json").read_text()))
+        # Otherwise the second run reports the identical export as unchanged
+        (tmp_path / "agent_specs.json").unlink()
+    assert len(pools) == 2  # one per command at --jobs 2, none at --jobs 1
+    assert outputs[0] == outputs[1]
@@ -0,0 +1,81 @@
+"""ParsedModule indexing and the shared parse memo."""
+import ast
+
+from agentspec import parsed
+from agentspec.parsed import ParsedModule, parse_file, parse_source
+
+SOURCE = '''\
+import os
+
+
+class Store:
+    """Doc."""
+
+    def get(self, key):
+        def helper():
+            return key
+        return helper()
+
+
+async def get(x):
+    return x
+'''
+
+
+def test_index_uses_python_qualnames():
+    """Methods, nested functions and redefinitions map to the definition Python would bind."""
+    module = ParsedModule(SOURCE)
+    assert list(module.index) == ["Store", "Store.get", "Store.get.<locals>.helper", "get"]
+    assert isinstance(module.index["get"], ast.AsyncFunctionDef)
+    assert module.find_function("Store.get").lineno == 7
+    assert module.find_function("get", near_lineno=12).lineno == 13
+    assert module.segment(module.index["get"]) == "async def get(x):\n    return x"
+    assert module.source[module.offset(4, 6):].startswith("Store")
+    assert ParsedModule.docstring_node(module.index["Store"]) is not None
+
+
+def test_same_text_is_parsed_once(tmp_path, monkeypatch):
+    """A file, its copy and a historical blob with identical text share one parse."""
+    parsed.clear_parse_memo()
+    calls = []
+    real_parse = ast.parse
+    monkeypatch.setattr(ast, "parse", lambda *a, **k: calls.append(1) or real_parse(*a, **k))
+
+    a = tmp_path / "a.py"
+    b = tmp_path / "b.py"
+    a.write_text(SOURCE)
+    b.write_text(SOURCE)
+    assert parse_file(a) is parse_file(b) is parse_source(SOURCE)
+    assert len(calls) == 1
+
+
+def test_metadata_and_function_info_share_one_parse(tmp_path, monkeypatch):
+    """generate's per-function helpers reuse the module parsed by process_file."""
+    from agentspec.collect import collect_metadata
+    from agentspec.generate import extract_function_info
+
+    parsed.clear_parse_memo()
+    path = tmp_path / "m.py"
+    path.write_text(SOURCE)
+    module = parse_file(path)
+    monkeypatch.setattr(ast, "parse", lambda *a, **k: (_ for _ in ()).throw(AssertionError("re-parsed")))
+
+    names = [name for _, name, _ in extract_function_info(path, module=module)]
+    assert sorted(names) == ["get", "get", "helper"]
+    meta = collect_metadata(path, "helper", module=module)
+    assert meta["deps"]["imports"] == ["os"]
+
+
+def test_docstring_insert_survives_form_feed(tmp_path):
+    """A page break above the target def does not shift the insertion line."""
+    from agentspec.generate import insert_docstring_at_line
+
+    path = tmp_path / "ff.py"
+    path.write_text("import os\n\x0c\n# section\nx = 1  # \x0c inline\n\ndef f():\n    return 1\n")
+    module = parse_file(path)
+    lineno = module.find_function("f").lineno
+    assert insert_docstring_at_line(path, lineno, "f", "Doc line.")
+
+    text = path.read_text()
+    assert "\x0c\n# section\nx = 1  # \x0c inline\n" in text
+    assert ast.get_docstring(ast.parse(text).body[-1]) == "Doc line."
@@ -0,0 +1,112 @@
+"""Tool server: spec lookups, enclosing guardrails, search and incremental refresh."""
+import io
+import json
+
+from agentspec.serve import SpecIndex, ToolServer
+from agentspec.watch import Watcher
+
+SOURCE = '''class Store:
+    """
+    ---agentspec
+    what: |
+      Key-value store backed by a cache file.
+    guardrails:
+      - DO NOT share between processes
+    ---/agentspec
+    """
+
+    def put(self, key):
+        """
+        ---agentspec
+        what: |
+          Writes one key to the cache.
+        guardrails:
+          - DO NOT log key contents (PII)
+        ---/agentspec
+        """
+        return key
+'''
+
+
+def _index(tmp_path, monkeypatch):
+    monkeypatch.setenv("AGENTSPEC_NO_CACHE", "1")
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "store.py").write_text(SOURCE)
+    index = SpecIndex(Watcher("extract", [tmp_path], use_git=False, use_cache=False), refresh=0)
+    index.update(force=True)
+    return index
+
+
+def test_queries(tmp_path, monkeypatch):
+    index = _index(tmp_path, monkeypatch)
+    assert [s["name"] for s in index.get_spec("store.py", "Store.put")["specs"]] == ["put"]
+    assert "raw_block" not in index.get_spec("store.py", "Store")["specs"][0]
+
+    scopes = index.guardrails_for(str(tmp_path / "store.py"), 20)["scopes"]
+    assert [(s["symbol"], s["guardrails"]) for s in scopes] == [
+        ("Store", ["DO NOT share between processes"]),
+        ("put", ["DO NOT log key contents (PII)"]),
+    ]
+    assert [s["symbol"] for s in index.guardrails_for("store.py", 3)["scopes"]] == ["Store"]
+
+    found = index.search("cache key")
+    assert [r["symbol"] for r in found["results"]] == ["put", "Store"]
+    assert index.search("pii")["results"][0]["symbol"] == "put"
+    assert index.search("nothing matches this")["total"] == 0
+
+
+def test_stdio_session_refreshes_changed_files(tmp_path, monkeypatch):
+    index = _index(tmp_path, monkeypatch)
+
+    def ask(*requests):
+        reader = io.BytesIO(b"".join(json.dumps({"jsonrpc": "2.0", **r}).encode() + b"\n" for r in requests))
+        writer = io.BytesIO()
+        ToolServer(index, reader, writer).serve()
+        return [json.loads(line) for line in writer.getvalue().splitlines()]
+
+    replies = ask(
+        {"id": 1, "method": "tools/list"},
+        {"method": "notifications/initialized"},
+        {"id": 2, "method": "tools/call", "params": {"name": "get_spec", "arguments": {"path": "store.py", "symbol": "put"}}},
+        {"id": 3, "method": "get_spec", "params": {"path": "missing.py", "symbol": "x"}},
+        {"id": 4, "method": "tools/call", "params": {"name": "search", "arguments": {}}},
+        {"id": 5, "method": "resources/list"},
+    )
+    assert [r["id"] for r in replies] == [1, 2, 3, 4, 5]
+    assert {t["name"] for t in replies[0]["result"]["tools"]} == {"get_spec", "guardrails_for", "search"}
+    assert json.loads(replies[1]["result"]["content"][0]["text"])["specs"][0]["what"] == "Writes one key to the cache."
+    assert replies[2]["error"]["code"] == -32602
+    assert replies[3]["result"]["isError"] is True
+    assert replies[4]["error"]["code"] == -32601
+
+    (tmp_path / "store.py").write_text(SOURCE.replace("Writes one key", "Persists one key"))
+    (tmp_path / "other.py").write_text('def helper():\n    """Persists nothing."""\n')
+    replies = ask({"id": 6, "method": "search", "params": {"text": "persists"}})
+    # Equal scores rank by path
+    assert [r["symbol"] for r in replies[0]["result"]["results"]] == ["helper", "put"]
+    assert index.search("writes")["total"] == 0
+
+
+def test_stdio_session_survives_bad_requests_and_broken_files(tmp_path, monkeypatch):
+    index = _index(tmp_path, monkeypatch)
+
+    def broken(text, limit=20):
+        raise KeyError(text)
+
+    monkeypatch.setattr(index, "search", broken)
+    (tmp_path / "store.py").write_text("def f(:\n")
+    lines = [
+        b"[1, 2]",
+        json.dumps({"jsonrpc": "2.0", "id": 1, "method": "get_spec", "params": {"path": "store.py", "symbol": "x.f"}}).encode(),
+        json.dumps({"jsonrpc": "2.0", "id": 2, "method": "search", "params": {"text": "cache"}}).encode(),
+        json.dumps({"jsonrpc": "2.0", "id": 3, "method": "ping"}).encode(),
+    ]
+    writer = io.BytesIO()
+    ToolServer(index, io.BytesIO(b"\n".join(lines) + b"\n"), writer).serve()
+    replies = [json.loads(line) for line in writer.getvalue().splitlines()]
+    assert [(r["id"], r.get("error", {}).get("code")) for r in replies] == [
+        (None, -32600),
+        (1, -32602),
+        (2, -32603),
+        (3, None),
+    ]
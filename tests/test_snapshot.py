@@ -0,0 +1,81 @@
+"""Binary spec snapshot: round trip against the JSON export, keyed lookups and bad files."""
+import json
+
+import pytest
+
+from agentspec import extract
+from agentspec.snapshot import Snapshot, SnapshotError, load
+
+SOURCE = '''class Session:
+    def refresh(self):
+        """
+        ---agentspec
+        what: |
+          Refreshes the token.
+        deps:
+          calls:
+            - http.post
+        guardrails:
+          - DO NOT log tokens
+        changelog:
+          - '2025-01-02'
+        ---/agentspec
+        """
+
+    def close(self):
+        """Replaced below."""
+
+    def close(self):
+        """Closes it. ✓"""
+
+
+def helper():
+    """First."""
+
+
+def helper():
+    """Second."""
+'''
+
+
+def test_snapshot_round_trips_json_export(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("AGENTSPEC_NO_CACHE", "1")
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "auth.py").write_text(SOURCE)
+    (tmp_path / "other.py").write_text('def noop():\n    """Does nothing."""\n')
+
+    assert extract.run(".", fmt="snapshot", use_git=False) == 0
+    assert extract.run(".", fmt="json", use_git=False) == 0
+    exported = json.loads((tmp_path / "agent_specs.json").read_text())
+    with Snapshot(tmp_path / "agent_specs.snap") as snap:
+        assert len(snap) == len(exported) == 6
+        # Sorted by (filepath, qualname); the replaced `close` and `helper` are keyed by their lines
+        assert list(snap.keys()) == [
+            ("auth.py", "Session.close"),
+            ("auth.py", "Session.close@17"),
+            ("auth.py", "Session.refresh"),
+            ("auth.py", "helper"),
+            ("auth.py", "helper@24"),
+            ("other.py", "noop"),
+        ]
+        refresh = snap.get("auth.py", "Session.refresh")
+        assert refresh == next(s for s in exported if s["name"] == "refresh")
+        assert refresh["changelog"] == ["2025-01-02"]
+        assert snap["auth.py", "Session.close"]["what"] == "Closes it. ✓"
+        assert snap.get("auth.py", "helper@24")["what"] == "First."
+        assert snap.get("auth.py", "helper")["what"] == "Second."
+        assert snap.get("auth.py", "Session.close@17")["what"] == "Replaced below."
+        assert ("auth.py", "missing") not in snap
+        assert snap.get("nope.py", "noop") is None
+        assert sorted(snap.in_file("auth.py")) == [
+            "Session.close", "Session.close@17", "Session.refresh", "helper", "helper@24"
+        ]
+    assert sorted(s["name"] for s in load(tmp_path / "agent_specs.snap")) == sorted(s["name"] for s in exported)
+
+
+def test_snapshot_rejects_other_files(tmp_path):
+    (tmp_path / "empty.snap").write_bytes(b"")
+    (tmp_path / "specs.json").write_text("[]" * 40)
+    for name in ("empty.snap", "specs.json"):
+        with pytest.raises(SnapshotError):
+            Snapshot(tmp_path / name)
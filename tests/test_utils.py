@@ -0,0 +1,208 @@
+import os
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from agentspec.utils import collect_python_files, DiscoveryStats, write_if_changed
+
+
+def _git_available() -> bool:
+    try:
+        subprocess.run(["git", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        return True
+    except Exception:
+        return False
+
+
+def _make_repo(root: Path) -> None:
+    """Small repo with excluded, gitignored and .agentspecignored content."""
+    subprocess.run(["git", "init", "-q", str(root)], check=True)
+    (root / ".gitignore").write_text("data/\n*_pb2.py\n")
+    (root / ".agentspecignore").write_text("tests/\n")
+    for rel in [
+        "pkg/a.py",
+        "pkg/sub/b.py",
+        "pkg/gen_pb2.py",
+        "data/raw/c.py",
+        "node_modules/x/d.py",
+        "tests/test_e.py",
+    ]:
+        p = root / rel
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_text("x = 1\n")
+
+
+@pytest.mark.skipif(not _git_available(), reason="git not installed")
+def test_walker_prunes_ignored_directories(tmp_path):
+    """Excluded, gitignored and agentspecignored entries are skipped and counted."""
+    _make_repo(tmp_path)
+    stats = DiscoveryStats()
+    files = collect_python_files(tmp_path, stats=stats, use_git=False)
+    assert [p.relative_to(tmp_path).as_posix() for p in files] == ["pkg/a.py", "pkg/sub/b.py"]
+    assert stats.files == 2
+    # .git, node_modules, data/ and tests/ pruned; gen_pb2.py ignored
+    assert stats.dirs_pruned == 4
+    assert stats.files_ignored == 1
+
+
+@pytest.mark.skipif(not hasattr(os, "symlink"), reason="symlinks unsupported")
+def test_walker_dedupes_symlinks(tmp_path):
+    """A symlinked directory pointing back into the tree is only walked once."""
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "m.py").write_text("x = 1\n")
+    os.symlink(tmp_path / "src", tmp_path / "alias")
+    stats = DiscoveryStats()
+    files = collect_python_files(tmp_path, stats=stats)
+    assert len(files) == 1
+    assert stats.duplicates == 1
+
+
+def test_ignore_matcher_pattern_forms():
+    """Anchored, **/, dir-only and negated patterns match repo-relative POSIX paths."""
+    from agentspec.utils import IgnoreMatcher
+
+    m = IgnoreMatcher(["/setup.py", "**/migrations/*.py", "build/", "*.gen.py", "!keep.gen.py", "# comment", ""])
+    assert m.match("setup.py")
+    assert not m.match("pkg/setup.py")
+    assert m.match("app/migrations/0001.py")
+    assert not m.match("app/migrations/sub/0001.py")
+    assert m.match("build", is_dir=True)
+    assert not m.match("build", is_dir=False)
+    assert m.is_ignored("build/lib/x.py")
+    assert m.match("pkg/a.gen.py")
+    assert not m.match("pkg/keep.gen.py")
+
+
+@pytest.mark.skipif(not _git_available(), reason="git not installed")
+def test_git_ls_files_matches_walker(tmp_path):
+    """The git ls-files fast path returns the same files as the scandir walker."""
+    _make_repo(tmp_path)
+    fast, slow = DiscoveryStats(), DiscoveryStats()
+    via_git = collect_python_files(tmp_path, stats=fast)
+    via_walk = collect_python_files(tmp_path, stats=slow, use_git=False)
+    assert fast.strategy == "git-ls-files"
+    assert slow.strategy == "scandir+cache"
+    assert via_git == via_walk
+
+
+@pytest.mark.skipif(not _git_available(), reason="git not installed")
+def test_check_ignore_coprocess_is_reused(tmp_path):
+    """Repeated single-path queries share one coprocess and honour negation."""
+    from agentspec.utils import _git_ignored_rels, get_check_ignore, close_check_ignore_processes
+
+    subprocess.run(["git", "init", "-q", str(tmp_path)], check=True)
+    (tmp_path / ".gitignore").write_text("*.gen.py\n!keep.gen.py\n")
+    root = tmp_path.resolve()
+    proc = get_check_ignore(root)
+    for _ in range(3):
+        assert _git_ignored_rels(root, ["a.gen.py", "keep.gen.py", "b.py"]) == {"a.gen.py"}
+    assert get_check_ignore(root) is proc
+    close_check_ignore_processes()
+    assert not proc.alive
+
+
+def test_iter_prefetched_preserves_order_and_errors():
+    """Prefetched items arrive in producer order and producer errors reach the consumer."""
+    from agentspec.utils import iter_prefetched
+
+    assert list(iter_prefetched(iter(range(1000)), maxsize=8)) == list(range(1000))
+
+    def boom():
+        yield 1
+        raise RuntimeError("walk failed")
+
+    with pytest.raises(RuntimeError, match="walk failed"):
+        list(iter_prefetched(boom()))
+
+
+def _backdate(root: Path) -> None:
+    """Push directory mtimes out of the cache's racy window."""
+    for dirpath, _, _ in os.walk(root):
+        os.utime(dirpath, ns=(1_000_000_000, 1_000_000_000))
+
+
+@pytest.mark.skipif(not _git_available(), reason="git not installed")
+def test_discovery_cache_reuses_unchanged_directories(tmp_path):
+    """A second walk serves unchanged dirs from the cache and notices new files and ignore edits."""
+    _make_repo(tmp_path)
+    _backdate(tmp_path)
+    first = collect_python_files(tmp_path, stats=DiscoveryStats(), use_git=False)
+    assert (tmp_path / ".agentspec" / "cache").is_dir()
+    _backdate(tmp_path)  # creating the cache dir touched the root
+
+    stats = DiscoveryStats()
+    assert collect_python_files(tmp_path, stats=stats, use_git=False) == first
+    assert stats.strategy == "scandir+cache"
+    assert stats.dirs_scanned == 0 and stats.dirs_cached == 3
+
+    (tmp_path / "pkg" / "sub" / "new.py").write_text("x = 1\n")
+    stats = DiscoveryStats()
+    assert tmp_path / "pkg" / "sub" / "new.py" in collect_python_files(tmp_path, stats=stats, use_git=False)
+    assert stats.dirs_scanned == 1
+
+    (tmp_path / "pkg" / ".gitignore").write_text("sub/\n")
+    assert collect_python_files(tmp_path, use_git=False) == [tmp_path / "pkg" / "a.py"]
+
+    (tmp_path / ".agentspecignore").write_text("tests/\npkg/a.py\n")
+    stats = DiscoveryStats()
+    assert collect_python_files(tmp_path, stats=stats, use_git=False) == []
+    assert stats.dirs_cached == 0
+
+    stats = DiscoveryStats()
+    collect_python_files(tmp_path, stats=stats, use_git=False, use_cache=False)
+    assert stats.strategy == "scandir" and stats.dirs_cached == 0
+
+
+def test_multiple_targets_and_file_lists_are_deduplicated(tmp_path, monkeypatch):
+    """Globs expand, overlapping targets and listed files yield each file once."""
+    from agentspec.utils import expand_targets, iter_target_files, read_files_from
+
+    for rel in ["a/x.py", "a/y.py", "b/z.py", "b/notes.txt"]:
+        (tmp_path / rel).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / rel).write_text("x = 1\n")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("AGENTSPEC_NO_CACHE", "1")
+
+    targets = expand_targets(["a", "a/*.py", "./a"])
+    assert targets == [Path("a"), Path("a/x.py"), Path("a/y.py")]
+
+    listing = tmp_path / "list"
+    listing.write_bytes(b"b/z.py\0b/notes.txt\0a/x.py\0missing.py\0")
+    assert read_files_from(str(listing)) == ["b/z.py", "b/notes.txt", "a/x.py", "missing.py"]
+    listing.write_text("b/z.py\r\n\na/x.py\n")
+    assert read_files_from(str(listing)) == ["b/z.py", "a/x.py"]
+
+    stats = DiscoveryStats()
+    listed = [Path(p) for p in ["b/z.py", "b/notes.txt", "a/x.py", "missing.py"]]
+    found = list(iter_target_files(targets, files=listed, stats=stats, use_git=False))
+    assert sorted(p.as_posix() for p in found) == ["a/x.py", "a/y.py", "b/z.py"]
+    assert stats.files == 3
+    assert stats.duplicates == 3
+    assert stats.files_ignored == 2
+    assert stats.strategy.endswith("files-from")
+
+
+def test_write_if_changed_skips_identical_and_keeps_mode(tmp_path):
+    out = tmp_path / "nested" / "out.md"
+    assert write_if_changed(out, b"one\n") is True
+    out.chmod(0o640)
+    os.utime(out, ns=(1_000_000_000, 1_000_000_000))
+
+    assert write_if_changed(out, b"one\n") is False
+    assert out.stat().st_mtime_ns == 1_000_000_000
+
+    assert write_if_changed(out, b"two\n") is True
+    assert out.read_bytes() == b"two\n"
+    assert out.stat().st_mode & 0o777 == 0o640
+    assert [p.name for p in out.parent.iterdir()] == ["out.md"]
+
+
+def test_write_if_changed_new_file_follows_umask(tmp_path):
+    previous = os.umask(0o027)
+    try:
+        assert write_if_changed(tmp_path / "new.md", b"one\n") is True
+        assert os.umask(0o027) == 0o027
+    finally:
+        os.umask(previous)
+    assert (tmp_path / "new.md").stat().st_mode & 0o777 == 0o640
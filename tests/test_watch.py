@@ -0,0 +1,107 @@
+"""Watch mode: only new or modified files are redone; the export is rewritten in place."""
+import json
+
+from agentspec import lint
+from agentspec.watch import Watcher
+
+
+def _spec(name: str, what: str) -> str:
+    return f'''def {name}():
+    """
+    ---agentspec
+    what: |
+      {what}
+    ---/agentspec
+    """
+    return 1
+'''
+
+
+def test_scan_reprocesses_only_changed_files(tmp_path, monkeypatch):
+    monkeypatch.setenv("AGENTSPEC_NO_CACHE", "1")
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "a.py").write_text(_spec("alpha", "First version."))
+    (tmp_path / "b.py").write_text(_spec("beta", "Untouched."))
+
+    calls = []
+    real = lint.check_file_cached
+    monkeypatch.setattr("agentspec.watch.check_file_cached", lambda path, **kw: calls.append(path.name) or real(path, **kw))
+    watcher = Watcher("lint", [tmp_path], use_git=False, use_cache=False)
+    changed, removed = watcher.scan()
+    assert sorted(p.name for p in changed) == ["a.py", "b.py"] and removed == []
+
+    calls.clear()
+    assert watcher.scan() == ([], [])
+    assert calls == []
+
+    (tmp_path / "a.py").write_text(_spec("alpha", "Second, longer version."))
+    (tmp_path / "b.py").unlink()
+    (tmp_path / "c.py").write_text("def gamma():\n    pass\n")
+    changed, removed = watcher.scan()
+    assert sorted(p.name for p in changed) == ["a.py", "c.py"]
+    assert [p.name for p in removed] == ["b.py"]
+    assert sorted(calls) == ["a.py", "c.py"]
+    watcher.close()
+
+
+def test_extract_mode_rewrites_export(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("AGENTSPEC_NO_CACHE", "1")
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "a.py").write_text(_spec("alpha", "First version."))
+    (tmp_path / "b.py").write_text(_spec("beta", "Untouched."))
+
+    watcher = Watcher("extract", [tmp_path], fmt="json", use_git=False, use_cache=False)
+    watcher.report(watcher.scan()[0])
+    first = json.loads((tmp_path / "agent_specs.json").read_text())
+    assert [s["name"] for s in first] == ["alpha", "beta"]
+
+    (tmp_path / "a.py").write_text(_spec("alpha", "Second, longer version."))
+    watcher.report(watcher.scan()[0])
+    second = json.loads((tmp_path / "agent_specs.json").read_text())
+    assert [s["name"] for s in second] == ["alpha", "beta"]
+    assert "Second" in second[0]["what"] and second[1] == first[1]
+    watcher.close()
+
+
+def test_scan_reloads_edited_ignore_files(tmp_path, monkeypatch):
+    monkeypatch.setenv("AGENTSPEC_NO_CACHE", "1")
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / ".git").mkdir()
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "a.py").write_text(_spec("alpha", "Kept."))
+    (tmp_path / "pkg" / "b.py").write_text(_spec("beta", "Ignored later."))
+
+    watcher = Watcher("lint", [tmp_path], use_git=False, ignore_engine="native", use_cache=False)
+    assert sorted(p.name for p in watcher.scan()[0]) == ["a.py", "b.py"]
+
+    (tmp_path / "pkg" / ".gitignore").write_text("b.py\n")
+    changed, removed = watcher.scan()
+    assert changed == [] and [p.name for p in removed] == ["b.py"]
+
+    (tmp_path / ".agentspecignore").write_text("pkg/a.py\n")
+    (tmp_path / "pkg" / ".gitignore").write_text("# nothing ignored\n")
+    changed, removed = watcher.scan()
+    assert [p.name for p in changed] == ["b.py"] and [p.name for p in removed] == ["a.py"]
+    watcher.close()
+
+
+def test_repository_root_is_looked_up_once_per_directory(tmp_path, monkeypatch):
+    monkeypatch.setenv("AGENTSPEC_NO_CACHE", "1")
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / ".git").mkdir()
+    for package in ("pkg", "other"):
+        (tmp_path / package).mkdir()
+        for i in range(5):
+            (tmp_path / package / f"m{i}.py").write_text(_spec(f"f{i}", "Doc."))
+    lookups = []
+    from agentspec import watch
+
+    real = watch._find_git_root
+    monkeypatch.setattr(watch, "_find_git_root", lambda start: lookups.append(start) or real(start))
+
+    watcher = Watcher("lint", [tmp_path], use_git=False, ignore_engine="native", use_cache=False)
+    watcher.scan()
+    watcher.scan()
+    assert sorted(p.name for p in lookups) == sorted([tmp_path.name, "other", "pkg"])
+    assert tmp_path / "pkg" / ".gitignore" in watcher.ignore_files
+    watcher.close()
@@ -0,0 +1,93 @@
+"""libyaml and pure-Python YAML paths agree on every spec block in this repository."""
+import ast
+from pathlib import Path
+
+import pytest
+import yaml
+
+from agentspec import yamlio
+from agentspec.extract import _extract_block
+
+REPO = Path(__file__).resolve().parent.parent
+libyaml = pytest.mark.skipif(getattr(yaml, "CSafeLoader", None) is None, reason="PyYAML built without libyaml")
+
+
+def _spec_blocks():
+    blocks = []
+    for path in sorted((REPO / "agentspec").glob("*.py")):
+        tree = ast.parse(path.read_text(encoding="utf-8"))
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                block = _extract_block(ast.get_docstring(node) or "")
+                if block:
+                    blocks.append(block)
+    return blocks
+
+
+def _load(text, loader):
+    try:
+        return True, yaml.load(text, Loader=loader)
+    except yaml.YAMLError as e:
+        return False, str(e)
+
+
+@libyaml
+def test_loaders_agree_on_repo_specs():
+    """CSafeLoader and SafeLoader give the same data (and both fail on the same blocks)."""
+    blocks = _spec_blocks()
+    assert len(blocks) > 20
+    for block in blocks:
+        fast_ok, fast = _load(block, yaml.CSafeLoader)
+        slow_ok, slow = _load(block, yaml.SafeLoader)
+        assert fast_ok == slow_ok
+        if fast_ok:
+            assert fast == slow
+
+
+def test_load_block_matches_safe_load_and_memoises(monkeypatch):
+    """load_block is yaml.safe_load, errors included, and repeats are served from the memo."""
+    yamlio.clear_yaml_memo()
+    parses = []
+    real_parse = yamlio._parse
+    monkeypatch.setattr(yamlio, "_parse", lambda text: parses.append(text) or real_parse(text))
+    for block in _spec_blocks():
+        ok, expected = _load(block, yaml.SafeLoader)
+        if ok:
+            assert yamlio.load_block(block) == expected
+            assert yamlio.load_block(block) == yamlio.load_block(block)
+        else:
+            with pytest.raises(yaml.YAMLError):
+                yamlio.load_block(block, exact_errors=False)
+            with pytest.raises(yaml.YAMLError) as info:
+                yamlio.load_block(block)
+            assert str(info.value) == expected
+    assert len(parses) == len(set(parses))
+
+
+def test_memo_hands_out_independent_copies(tmp_path):
+    """Changing one caller's spec (as fill_called_by does) does not leak into later parses."""
+    from agentspec.extract import extract_from_file
+
+    yamlio.clear_yaml_memo()
+    block = "what: x\ndeps:\n  calls: [a]\nguardrails: [keep]\n"
+    first = yamlio.load_block(block)
+    first["deps"]["calls"].append("b")
+    first["guardrails"].clear()
+    assert yamlio.load_block(block) == {"what": "x", "deps": {"calls": ["a"]}, "guardrails": ["keep"]}
+
+    path = tmp_path / "m.py"
+    path.write_text('def f():\n    """\n    ---agentspec\n    what: x\n    deps:\n      calls: [a]\n    ---/agentspec\n    """\n')
+    spec = extract_from_file(path)[0]
+    spec.deps["called_by"] = ["g"]
+    assert "called_by" not in extract_from_file(path)[0].deps
+
+
+@libyaml
+def test_dumpers_agree_on_repo_specs():
+    """CSafeDumper output matches the default yaml.dump used before for every parsed spec."""
+    for block in _spec_blocks():
+        ok, data = _load(block, yaml.SafeLoader)
+        if ok and data is not None:
+            assert yaml.dump(data, Dumper=yaml.CSafeDumper, default_flow_style=False) == yaml.dump(
+                data, default_flow_style=False
+            )